@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+
+# Fields copied into tokens and kept per user in the in-process cache
+USER_STATE_FIELDS = ('username', 'role', 'is_active')
+
+
+class UserStateCache:
+    """
+    Bounded LRU of {user_id: state} with a TTL. The TTL bounds how long a
+    change made through another process can go unnoticed here; changes made
+    in this process are invalidated immediately by accounts.signals.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, state = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return state
+
+    def set(self, user_id, state):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, state)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserStateCache(
+    max_size=getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+)
+
+
+def tokens_for_user(user):
+    """Refresh/access pair carrying the claims CachedJWTAuthentication needs."""
+    refresh = RefreshToken.for_user(user)
+    refresh['username'] = user.username
+    refresh['role'] = user.role
+    return refresh
+
+
+def _load_state(user_id):
+    state = user_cache.get(user_id)
+    if state is None:
+        state = User.objects.filter(pk=user_id).values(*USER_STATE_FIELDS).first()
+        if state is not None:
+            user_cache.set(user_id, state)
+    return state
+
+
+async def _aload_state(user_id):
+    state = user_cache.get(user_id)
+    if state is None:
+        state = await User.objects.filter(pk=user_id).values(*USER_STATE_FIELDS).afirst()
+        if state is not None:
+            user_cache.set(user_id, state)
+    return state
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that resolves request.user without a SELECT per request.
+
+    The user is rebuilt from token claims plus a cached (username, role,
+    is_active) row. request.user is a User instance holding only those
+    fields: enough for permission checks, FK assignment and comparisons.
+    Views that edit the user's own row must load it first.
+    A token whose role claim no longer matches the user is rejected.
+
+    aauthenticate() is the same for async views (lms.async_api); only a
+    cache miss touches the database.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        return self._user_from_state(user_id, _load_state(user_id), validated_token)
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        # Signature and expiry checks are CPU only
+        validated_token = self.get_validated_token(raw_token)
+        user_id = self._user_id(validated_token)
+        state = await _aload_state(user_id)
+        return self._user_from_state(user_id, state, validated_token), validated_token
+
+    def _user_id(self, validated_token):
+        try:
+            # Tokens carry the id as a string; cache keys use the pk's own type
+            return User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, ValidationError):
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+    def _user_from_state(self, user_id, state, validated_token):
+        if state is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not state['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if validated_token.get('role', state['role']) != state['role']:
+            raise AuthenticationFailed(_('User role has changed, please log in again'), code='role_changed')
+
+        user = User(pk=user_id, **state)
+        user._state.adding = False
+        user._state.db = 'default'
+        return user
@@ -0,0 +1,81 @@
+"""
+Password hashers whose cost comes from settings.PASSWORD_HASHER_COSTS.
+
+Django rehashes a password on the next successful login when the stored hash
+uses a hasher other than the first entry of PASSWORD_HASHERS, or the same
+hasher with different cost parameters (must_update). Changing the preferred
+hasher or its cost therefore migrates users one login at a time; the old
+hashers only have to stay in the list to verify not-yet-migrated hashes.
+Argon2 needs the optional argon2-cffi package.
+"""
+import base64
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+# Key in PASSWORD_HASHER_COSTS / --hashers of bench_hashers -> cost attributes
+COST_PARAMS = {
+    'pbkdf2': ('iterations',),
+    'argon2': ('time_cost', 'memory_cost', 'parallelism'),
+    'scrypt': ('work_factor', 'block_size', 'parallelism'),
+}
+
+
+class TunableCostMixin:
+    """Read cost attributes from settings; unset keys keep Django's defaults."""
+    cost_key = None
+
+    def __init__(self, **costs):
+        configured = getattr(settings, 'PASSWORD_HASHER_COSTS', {}).get(self.cost_key, {})
+        for name, value in {**configured, **costs}.items():
+            if name not in COST_PARAMS[self.cost_key]:
+                raise ValueError(f'Unknown {self.cost_key} cost parameter: {name}')
+            setattr(self, name, int(value))
+
+    @property
+    def costs(self):
+        return {name: getattr(self, name) for name in COST_PARAMS[self.cost_key]}
+
+
+class PBKDF2PasswordHasher(TunableCostMixin, hashers.PBKDF2PasswordHasher):
+    cost_key = 'pbkdf2'
+
+
+class Argon2PasswordHasher(TunableCostMixin, hashers.Argon2PasswordHasher):
+    cost_key = 'argon2'
+
+
+class ScryptPasswordHasher(TunableCostMixin, hashers.ScryptPasswordHasher):
+    cost_key = 'scrypt'
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        # Same format as Django's, but OpenSSL's 32 MiB default memory cap is
+        # sized to the parameters in use (including older, costlier hashes)
+        self._check_encode_args(password, salt)
+        n, r, p = n or self.work_factor, r or self.block_size, p or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+            maxmem=self.maxmem or 128 * r * (n + p + 2) + 2 ** 20, dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
+
+
+HASHERS = {
+    'pbkdf2': PBKDF2PasswordHasher,
+    'argon2': Argon2PasswordHasher,
+    'scrypt': ScryptPasswordHasher,
+}
+
+
+def is_available(name):
+    """False when the hasher's optional library is missing (argon2-cffi)."""
+    hasher = HASHERS[name]()
+    if hasher.library is None:
+        return True
+    try:
+        hasher._load_library()
+    except ValueError:
+        return False
+    return True
@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.hashers import COST_PARAMS, HASHERS, is_available
+
+
+def parse_cost(text):
+    """'time_cost=3,memory_cost=65536' -> {'time_cost': 3, 'memory_cost': 65536}"""
+    costs = {}
+    for pair in filter(None, text.split(',')):
+        name, _, value = pair.partition('=')
+        costs[name.strip()] = int(value)
+    return costs
+
+
+class Command(BaseCommand):
+    help = (
+        'Time password verification for each hasher/cost on one core and report '
+        'logins/sec per core, to pick a PASSWORD_HASHER_COSTS that fits the latency budget'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hashers', default=','.join(HASHERS),
+                            help='Comma-separated hashers to measure at their configured cost')
+        parser.add_argument('--cost', action='append', default=[], metavar='HASHER:NAME=VALUE[,NAME=VALUE]',
+                            help='Extra cost setting to measure, e.g. scrypt:work_factor=32768 (repeatable)')
+        parser.add_argument('--iterations', type=int, default=20, help='Verifications per setting')
+        parser.add_argument('--budget-ms', type=float, default=100.0,
+                            help='Per-login hashing budget; settings above it are flagged')
+
+    def settings_to_measure(self, options):
+        candidates = [(name, {}) for name in filter(None, options['hashers'].split(','))]
+        for spec in options['cost']:
+            name, _, costs = spec.partition(':')
+            try:
+                candidates.append((name, parse_cost(costs)))
+            except ValueError:
+                raise CommandError(f'Bad --cost value: {spec}')
+        for name, costs in candidates:
+            if name not in HASHERS:
+                raise CommandError(f'Unknown hasher {name!r}; choose from {", ".join(HASHERS)}')
+            unknown = set(costs) - set(COST_PARAMS[name])
+            if unknown:
+                raise CommandError(f'Unknown {name} cost parameter(s): {", ".join(sorted(unknown))}')
+        return candidates
+
+    def handle(self, *args, **options):
+        iterations = max(options['iterations'], 1)
+        password = 'bench-password-123'
+
+        for name, costs in self.settings_to_measure(options):
+            if not is_available(name):
+                self.stdout.write(self.style.WARNING(f'{name}: skipped, library not installed'))
+                continue
+            hasher = HASHERS[name](**costs)
+            encoded = hasher.encode(password, hasher.salt())
+
+            # Login cost is one verify(); time it single-threaded so the rate is per core
+            start = time.process_time()
+            for _ in range(iterations):
+                hasher.verify(password, encoded)
+            per_login_ms = (time.process_time() - start) / iterations * 1000
+
+            params = ', '.join(f'{key}={value}' for key, value in hasher.costs.items())
+            line = f'{name:<7} {params:<50} {per_login_ms:>9.2f}ms  {1000 / per_login_ms:>8.1f} logins/s/core'
+            if per_login_ms > options['budget_ms']:
+                self.stdout.write(self.style.WARNING(f'{line}  over budget'))
+            else:
+                self.stdout.write(line)
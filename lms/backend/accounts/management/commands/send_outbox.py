@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued mail from the outbox (runs until stopped unless --once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Deliver what is due now and exit')
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages per connection')
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent connections')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when idle')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                sent, failed = outbox.deliver_pending(options['batch_size'], options['workers'])
+            except KeyboardInterrupt:
+                break
+            if sent or failed:
+                self.stdout.write(f'sent {sent}, failed {failed}')
+                continue
+            if options['once']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
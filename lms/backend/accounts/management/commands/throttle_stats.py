@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from accounts import throttling
+
+
+class Command(BaseCommand):
+    help = 'Show how many credential attempts each rate limit has rejected'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them')
+
+    def handle(self, *args, **options):
+        for name, count in throttling.rejection_counts().items():
+            self.stdout.write(f'{name:<24} {count:>8} rejected')
+        if options['reset']:
+            throttling.reset_rejection_counts()
+            self.stdout.write('Counters reset')
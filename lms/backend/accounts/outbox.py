@@ -0,0 +1,110 @@
+"""
+Transactional outbox for mail.
+
+Views call queue_mail(), which only inserts a row. `manage.py send_outbox`
+claims due rows in batches, sends each batch over one reused connection of
+the configured EMAIL_BACKEND (a thread per batch), and records the outcome:
+sent, retried later with exponential backoff, or failed after
+OUTBOX_MAX_ATTEMPTS.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+# A claimed row is invisible to other workers for this long; a worker that
+# dies mid-batch therefore only delays its rows
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def queue_mail(subject, message, recipient_list, from_email=None):
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=','.join(recipient_list),
+        next_attempt_at=timezone.now(),
+    )
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'OUTBOX_RETRY_BASE', 30)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 3600))
+
+
+def claim(limit):
+    """Lease up to `limit` due rows to this worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:limit]
+        )
+        OutboundEmail.objects.filter(pk__in=[row.pk for row in rows]).update(next_attempt_at=now + CLAIM_LEASE)
+    return rows
+
+
+def send_batch(rows):
+    """Send rows over a single backend connection; returns [(row, error or None)]."""
+    results = []
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        return [(row, e) for row in rows]
+    try:
+        for row in rows:
+            message = EmailMessage(
+                subject=row.subject, body=row.body, from_email=row.from_email,
+                to=row.to.split(','), connection=connection,
+            )
+            try:
+                message.send()
+                results.append((row, None))
+            except Exception as e:
+                results.append((row, e))
+    finally:
+        connection.close()
+    return results
+
+
+def record(results):
+    now = timezone.now()
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+    sent = [row.pk for row, error in results if error is None]
+    if sent:
+        OutboundEmail.objects.filter(pk__in=sent).update(status='sent', sent_at=now, last_error='')
+
+    failed = [(row, error) for row, error in results if error is not None]
+    for row, error in failed:
+        row.attempts += 1
+        row.last_error = str(error)[:1000]
+        if row.attempts >= max_attempts:
+            row.status = 'failed'
+        else:
+            row.next_attempt_at = now + retry_delay(row.attempts)
+    OutboundEmail.objects.bulk_update(
+        [row for row, _ in failed], ['attempts', 'last_error', 'status', 'next_attempt_at']
+    )
+    return len(sent), len(failed)
+
+
+def deliver_pending(batch_size=50, workers=1):
+    """One delivery round. Returns (sent, failed) counts; (0, 0) when idle."""
+    rows = claim(batch_size * workers)
+    if not rows:
+        return 0, 0
+    batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    if len(batches) == 1:
+        results = send_batch(batches[0])
+    else:
+        # Threads only talk to the mail server; all DB writes stay on this thread
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = [result for batch in pool.map(send_batch, batches) for result in batch]
+    return record(results)
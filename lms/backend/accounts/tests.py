@@ -1,3 +1,236 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends import locmem
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import outbox, throttling
+from .authentication import UserStateCache, tokens_for_user, user_cache
+from .models import OutboundEmail, User
+
+
+class UserListTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create(username='admin', role='admin')
+        User.objects.bulk_create([
+            User(username=f'user{i}', role='teacher' if i % 3 == 0 else 'student') for i in range(120)
+        ])
+        self.client.force_authenticate(user=self.admin)
+
+    def test_paginated_and_filtered_by_role(self):
+        response = self.client.get('/api/auth/users/')
+        self.assertEqual(response.data['count'], 121)
+        self.assertEqual(len(response.data['results']), 50)
+
+        response = self.client.get('/api/auth/users/', {'role': 'teacher', 'page_size': 500})
+        self.assertEqual(response.data['count'], 40)
+        self.assertTrue(all(u['role'] == 'teacher' for u in response.data['results']))
+
+    def test_stream_export(self):
+        response = self.client.get('/api/auth/users/', {'export': 'stream'})
+        self.assertTrue(response.streaming)
+        users = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(users), 121)
+        self.assertEqual(users[0]['username'], 'admin')
+
+    def test_non_admin_forbidden(self):
+        self.client.force_authenticate(user=User.objects.get(username='user1'))
+        response = self.client.get('/api/auth/users/')
+        self.assertEqual(response.status_code, 403)
+
+
+FAST_HASHERS = {
+    'scrypt': {'work_factor': 2 ** 10, 'block_size': 8, 'parallelism': 1},
+    'pbkdf2': {'iterations': 1000},
+}
+
+
+def hashing_settings(**costs):
+    # Re-setting PASSWORD_HASHERS makes Django rebuild its cached hasher instances
+    return override_settings(
+        PASSWORD_HASHERS=['accounts.hashers.ScryptPasswordHasher', 'accounts.hashers.PBKDF2PasswordHasher'],
+        PASSWORD_HASHER_COSTS={**FAST_HASHERS, **costs},
+    )
+
+
+@hashing_settings()
+class PasswordHashingTests(TestCase):
+
+    def login(self, password):
+        return APIClient().post('/api/auth/login/', {'username': 'student', 'password': password}, format='json')
+
+    def test_login_upgrades_pbkdf2_hash(self):
+        user = User.objects.create(username='student', password=make_password('pass-123', hasher='pbkdf2_sha256'))
+
+        self.assertEqual(self.login('wrong').status_code, 401)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+
+        self.assertEqual(self.login('pass-123').status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$1024$'))
+        self.assertEqual(self.login('pass-123').status_code, 200)
+
+    def test_login_rehashes_when_cost_changes(self):
+        user = User.objects.create(username='student', password=make_password('pass-123'))
+        with hashing_settings(scrypt={**FAST_HASHERS['scrypt'], 'work_factor': 2 ** 11}):
+            self.assertEqual(self.login('pass-123').status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$2048$'))
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='student', email='s@example.com', role='student')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens_for_user(self.user).access_token}')
+
+    def test_token_carries_role_and_user_is_cached(self):
+        token = tokens_for_user(self.user).access_token
+        self.assertEqual(token['role'], 'student')
+
+        self.client.get('/api/lms/categories/')
+        with self.assertNumQueries(1):
+            # Only the category query itself; no user lookup
+            response = self.client.get('/api/lms/categories/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_role_change_or_deactivation_rejects_token(self):
+        self.client.get('/api/lms/categories/')
+        self.user.role = 'teacher'
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+        self.user.role = 'student'
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    def test_profile_update_keeps_unsent_fields(self):
+        response = self.client.put('/api/auth/profile/', {'first_name': 'Ada'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.first_name, self.user.email), ('Ada', 's@example.com'))
+
+    def test_cache_is_bounded(self):
+        cache = UserStateCache(max_size=2, ttl=60)
+        for user_id in (1, 2, 3):
+            cache.set(user_id, {'role': 'student'})
+        self.assertIsNone(cache.get(1))
+        self.assertIsNotNone(cache.get(3))
+
+
+class MailOutboxTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='student', email='s@example.com', role='student')
+
+    def test_forgot_password_only_queues(self):
+        response = APIClient().post('/api/auth/forgot-password/', {'email': 's@example.com'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboundEmail.objects.get()
+        self.assertEqual((queued.to, queued.status), ('s@example.com', 'pending'))
+        self.assertIn('/reset-password/', queued.body)
+
+        self.assertEqual(outbox.deliver_pending(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['s@example.com'])
+        self.assertEqual(OutboundEmail.objects.get().status, 'sent')
+        self.assertEqual(outbox.deliver_pending(), (0, 0))
+
+    def test_batches_share_one_connection_across_workers(self):
+        for i in range(7):
+            outbox.queue_mail('Hi', 'Body', [f'user{i}@example.com'])
+        with mock.patch('accounts.outbox.get_connection', wraps=outbox.get_connection) as get_connection:
+            self.assertEqual(outbox.deliver_pending(batch_size=3, workers=3), (7, 0))
+        self.assertEqual(get_connection.call_count, 3)
+        self.assertEqual(len(mail.outbox), 7)
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2)
+    def test_failures_back_off_then_give_up(self):
+        queued = outbox.queue_mail('Hi', 'Body', ['user@example.com'])
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', side_effect=OSError('relay down')):
+            self.assertEqual(outbox.deliver_pending(), (0, 1))
+            queued.refresh_from_db()
+            self.assertEqual((queued.status, queued.attempts), ('pending', 1))
+            self.assertGreater(queued.next_attempt_at, timezone.now())
+            self.assertEqual(outbox.deliver_pending(), (0, 0))
+
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(outbox.deliver_pending(), (0, 1))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.last_error), ('failed', 'relay down'))
+
+
+@override_settings(AUTH_THROTTLE_RATES={
+    'login': {'ip': '5/min', 'username': '3/min'},
+    'forgot_password': {'ip': '5/hour', 'email': '2/hour'},
+})
+class AuthThrottlingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        User.objects.create(username='student', email='s@example.com', password=make_password('pass-123'))
+
+    def login(self, username, password='wrong', ip='10.0.0.1'):
+        return self.client.post('/api/auth/login/', {'username': username, 'password': password},
+                                format='json', REMOTE_ADDR=ip)
+
+    def test_username_limit_rejects_before_authenticate(self):
+        for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+            self.assertEqual(self.login('Student', ip=ip).status_code, 401)
+
+        with mock.patch('accounts.views.authenticate') as authenticate, \
+                self.assertLogs('accounts.throttling', 'WARNING'):
+            response = self.login('student', 'pass-123', ip='10.0.0.4')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        authenticate.assert_not_called()
+
+        self.assertEqual(self.login('other', ip='10.0.0.4').status_code, 401)
+        self.assertEqual(throttling.rejection_counts()['login:username'], 1)
+
+    def test_ip_limit(self):
+        for i in range(5):
+            self.assertEqual(self.login(f'user{i}').status_code, 401)
+        with self.assertLogs('accounts.throttling', 'WARNING'):
+            self.assertEqual(self.login('user5').status_code, 429)
+        self.assertEqual(self.login('user5', ip='10.0.0.2').status_code, 401)
+        self.assertEqual(throttling.rejection_counts()['login:ip'], 1)
+
+    def test_forgot_password_limit_per_email(self):
+        for _ in range(2):
+            response = self.client.post('/api/auth/forgot-password/', {'email': 's@example.com'}, format='json')
+            self.assertEqual(response.status_code, 200)
+        with self.assertLogs('accounts.throttling', 'WARNING'):
+            response = self.client.post('/api/auth/forgot-password/', {'email': 'S@example.com'}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+    def test_sliding_window_weights_previous_window(self):
+        counter = throttling.SlidingWindowCounter('throttle:test', limit=4, window=60)
+        for _ in range(4):
+            self.assertTrue(counter.hit(now=600)[0])
+        self.assertEqual(counter.hit(now=630), (False, 30))
+        # Halfway into the next window the old hits count for half: 4 * 0.5 = 2
+        self.assertEqual(counter.hit(now=690), (True, 0))
+        self.assertEqual(counter.hit(now=690), (True, 0))
+        self.assertFalse(counter.hit(now=690)[0])
+        self.assertTrue(counter.hit(now=740)[0])
+
+    def test_rejection_survives_an_expired_window(self):
+        counter = throttling.SlidingWindowCounter('throttle:test', limit=1, window=60)
+        self.assertTrue(counter.hit(now=600)[0])
+        with mock.patch.object(throttling.cache, 'decr', side_effect=ValueError):
+            self.assertFalse(counter.hit(now=610)[0])
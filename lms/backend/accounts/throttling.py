@@ -0,0 +1,170 @@
+"""
+Rate limiting for the unauthenticated credential endpoints.
+
+Each limit is a sliding-window counter kept in the Django cache: one counter
+per fixed window, with the previous window's count weighted by how much of
+it still overlaps the sliding window. Two small integers per identity, and
+increments are atomic cache.incr() calls, so every worker sharing the cache
+(Redis via CACHE_REDIS_URL) sees the same counts.
+
+The throttles run in DRF's initial(), i.e. before the view and therefore
+before authenticate() spends CPU on password hashing. Rejected attempts are
+not counted against the window; they are counted in the rejection metrics.
+"""
+import abc
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+METRICS_KEY = 'throttle:rejected:{scope}:{kind}'
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60); same format as DRF's DEFAULT_THROTTLE_RATES."""
+    limit, period = rate.split('/')
+    return int(limit), PERIODS[period[0]]
+
+
+class SlidingWindowCounter:
+
+    def __init__(self, key, limit, window):
+        self.key = key
+        self.limit = limit
+        self.window = window
+
+    def hit(self, now=None):
+        """Count one attempt if allowed; returns (allowed, seconds until retry)."""
+        now = time.time() if now is None else now
+        index, elapsed = divmod(now, self.window)
+        current_key = f'{self.key}:{int(index)}'
+        previous_key = f'{self.key}:{int(index) - 1}'
+
+        previous = cache.get(previous_key, 0)
+        # Count first, then check, so concurrent attempts cannot all slip under
+        # the limit. Kept for two windows: while current and while previous.
+        cache.add(current_key, 0, timeout=self.window * 2)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.set(current_key, 1, timeout=self.window * 2)
+            current = 1
+
+        if previous * (1 - elapsed / self.window) + current > self.limit:
+            try:
+                cache.decr(current_key)
+            except ValueError:
+                # Expired since incr(); nothing left to take back
+                pass
+            return False, self._retry_after(current - 1, previous, elapsed)
+        return True, 0
+
+    def _retry_after(self, current, previous, elapsed):
+        if current >= self.limit:
+            # Wait for the next window, then for this one's weight to decay
+            wait = self.window - elapsed + self.window * max(0.0, 1 - self.limit / current)
+        else:
+            wait = self.window * (1 - (self.limit - current) / previous) - elapsed
+        return max(1, math.ceil(wait))
+
+
+def record_rejection(scope, kind, ident):
+    key = METRICS_KEY.format(scope=scope, kind=kind)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+    logger.warning('Throttled %s attempt by %s %s', scope, kind, ident)
+
+
+def _metric_keys():
+    rates = getattr(settings, 'AUTH_THROTTLE_RATES', {})
+    return {
+        f'{scope}:{kind}': METRICS_KEY.format(scope=scope, kind=kind)
+        for scope, kinds in rates.items() for kind in kinds
+    }
+
+
+def rejection_counts():
+    """{'login:ip': n, ...} for every configured limit."""
+    keys = _metric_keys()
+    stored = cache.get_many(keys.values())
+    return {name: stored.get(key, 0) for name, key in keys.items()}
+
+
+def reset_rejection_counts():
+    cache.delete_many(_metric_keys().values())
+
+
+class AuthAttemptThrottle(BaseThrottle, metaclass=abc.ABCMeta):
+    """
+    Limit attempts per `kind` of identity for `scope`, using the rate in
+    settings.AUTH_THROTTLE_RATES[scope][kind]. Subclasses pick the identity.
+    """
+    scope = None
+    kind = None
+
+    @abc.abstractmethod
+    def get_identity(self, request):
+        """The value attempts are counted by, or None to not limit this request."""
+
+    def allow_request(self, request, view):
+        rate = getattr(settings, 'AUTH_THROTTLE_RATES', {}).get(self.scope, {}).get(self.kind)
+        ident = self.get_identity(request)
+        if not rate or not ident:
+            return True
+        limit, window = parse_rate(rate)
+        counter = SlidingWindowCounter(f'throttle:{self.scope}:{self.kind}:{ident}', limit, window)
+        allowed, self.retry_after = counter.hit()
+        if not allowed:
+            record_rejection(self.scope, self.kind, ident)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class IPThrottle(AuthAttemptThrottle):
+    kind = 'ip'
+
+    def get_identity(self, request):
+        # Honors REST_FRAMEWORK['NUM_PROXIES'] behind a reverse proxy
+        return self.get_ident(request)
+
+
+class RequestFieldThrottle(AuthAttemptThrottle):
+    """Identity is a submitted field (username/email), case-insensitive."""
+
+    def get_identity(self, request):
+        value = request.data.get(self.kind)
+        if not isinstance(value, str) or not value.strip():
+            return None
+        # Hashed so cache keys stay short and printable whatever the client sends
+        return hashlib.sha256(value.strip().lower().encode()).hexdigest()[:32]
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login'
+
+
+class LoginUsernameThrottle(RequestFieldThrottle):
+    scope = 'login'
+    kind = 'username'
+
+
+class ForgotPasswordIPThrottle(IPThrottle):
+    scope = 'forgot_password'
+
+
+class ForgotPasswordEmailThrottle(RequestFieldThrottle):
+    scope = 'forgot_password'
+    kind = 'email'
@@ -1,19 +1,23 @@
 from django.shortcuts import render
 
 # Create your views here.
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import tokens_for_user
 from django.contrib.auth import authenticate
 from .models import User
 from .serializers import UserSerializer, UserProfileSerializer
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
+from .outbox import queue_mail
+from .throttling import (
+    ForgotPasswordEmailThrottle, ForgotPasswordIPThrottle, LoginIPThrottle, LoginUsernameThrottle,
+)
 from django.conf import settings
+from lms.pagination import ListPagination, stream_json
 
 # Register 
 @api_view(['POST'])
@@ -22,7 +26,7 @@ def register(request):
     serializer = UserSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         return Response({
             "user": serializer.data,
             "refresh": str(refresh),
@@ -33,12 +37,13 @@ def register(request):
 # Login 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginIPThrottle, LoginUsernameThrottle])
 def login(request):
     username = request.data.get('username')
     password = request.data.get('password')
     user = authenticate(username=username, password=password)
     if user:
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         serializer = UserProfileSerializer(user)
         return Response({
             "user": serializer.data,
@@ -53,7 +58,8 @@ def login(request):
 @api_view(['GET', 'PUT'])
 @permission_classes([IsAuthenticated])
 def profile(request):
-    user = request.user
+    # request.user only carries token fields; load the full row
+    user = User.objects.get(pk=request.user.pk)
     if request.method == 'GET':
         serializer = UserProfileSerializer(user)
         return Response(serializer.data)
@@ -70,9 +76,19 @@ def profile(request):
 def user_list(request):
     
     if request.user.role == 'admin':
-        users = User.objects.all()
-        serializer = UserProfileSerializer(users, many=True)
-        return Response(serializer.data)
+        users = User.objects.all().order_by('id')
+        role = request.query_params.get('role')
+        if role:
+            users = users.filter(role=role)
+
+        # ?export=stream returns every user as one chunked JSON array
+        if request.query_params.get('export') == 'stream':
+            return stream_json(users, UserProfileSerializer)
+
+        paginator = ListPagination()
+        page = paginator.paginate_queryset(users, request)
+        serializer = UserProfileSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     else:
         return Response(
             {'detail': 'Only admins can view user list'},
@@ -82,6 +98,7 @@ def user_list(request):
 # Forgot Password - Request Reset
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([ForgotPasswordIPThrottle, ForgotPasswordEmailThrottle])
 def forgot_password(request):
     email = request.data.get('email')
     
@@ -106,11 +123,10 @@ def forgot_password(request):
     # For development, using localhost.
     reset_link = f"http://localhost:5173/reset-password/{uid}/{token}"
     
-    # Send email
-    try:
-        send_mail(
-            subject='Password Reset Request - LMS',
-            message=f'''
+    # Queue the email; `manage.py send_outbox` delivers it outside the request
+    queue_mail(
+        subject='Password Reset Request - LMS',
+        message=f'''
                         Hello {user.username},
 
                         You requested to reset your password. Click the link below to reset it:
@@ -123,18 +139,10 @@ def forgot_password(request):
 
                         Best regards,
                         LMS Team
-            ''',
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=False,
-        )
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        # For development, return the link if email fails
-        return Response({
-            'detail': 'Password reset email sent successfully',
-            'reset_link': reset_link  # Remove this in production!
-        })
+        ''',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[email],
+    )
     
     return Response({
         'detail': 'If an account exists with this email, you will receive a password reset link.'
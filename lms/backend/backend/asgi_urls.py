@@ -0,0 +1,19 @@
+"""
+URL configuration for requests served over ASGI (see
+backend.middleware.AsgiURLConfMiddleware): the read-heavy routes go to
+their async views, which hand other methods to the DRF views; everything
+else is routed as in backend.urls.
+"""
+from django.urls import path
+
+from dashboard.views import dashboard_summary_async
+from lms.views import course_list_create_async, lesson_list_create_async
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path('api/lms/courses/', course_list_create_async, name='course-list-create'),
+    path('api/lms/courses/<int:course_id>/lessons/', lesson_list_create_async, name='lesson-list-create'),
+    path('api/dashboard/summary/', dashboard_summary_async, name='dashboard-summary'),
+    *wsgi_urlpatterns,
+]
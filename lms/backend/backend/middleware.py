@@ -0,0 +1,69 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import routers
+
+
+class AsgiURLConfMiddleware:
+    """
+    Resolve requests served over ASGI with settings.ASGI_URLCONF, if set, which
+    maps the read-heavy routes to async views (lms.async_api). Under WSGI the
+    middleware chain is synchronous and this is a no-op.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if settings.ASGI_URLCONF:
+            request.urlconf = settings.ASGI_URLCONF
+        return await self.get_response(request)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Scope backend.routers' replica choice to each request and pin clients to
+    the primary after their writes. A no-op without DATABASE_REPLICAS.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not routers.replicas():
+            return self.get_response(request)
+        token = routers.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end(token)
+        routers.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not routers.replicas():
+            return await self.get_response(request)
+        token = routers.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end(token)
+        routers.pin(request, response)
+        return response
@@ -0,0 +1,119 @@
+"""
+Read-replica routing (settings.DATABASE_REPLICAS).
+
+ReplicaRoutingMiddleware picks one replica per safe request (GET, HEAD,
+OPTIONS), round-robin, and ReplicaRouter sends that request's reads there,
+so they all see the same snapshot. Everything else uses 'default': writes,
+reads of unsafe requests, reads inside an atomic block on 'default' and
+code running outside a request (commands, background threads).
+
+Read-your-writes: a successful unsafe request pins its user (anonymous
+clients: their address) to 'default' for DATABASE_REPLICA_PIN_SECONDS,
+which should exceed the replication lag. Pins live in the shared cache, so
+they hold across workers when CACHE_REDIS_URL is set.
+"""
+import itertools
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.state import token_backend
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Alias the current request reads from, None to read from 'default'
+_read_alias = ContextVar('read_alias', default=None)
+_turns = itertools.count()
+
+
+def replicas():
+    return settings.DATABASE_REPLICAS
+
+
+def _client_key(request):
+    # The client address as DRF's throttles see it (honours NUM_PROXIES)
+    return f'replica-pin:ip:{BaseThrottle().get_ident(request)}'
+
+
+def _user_key(user_id):
+    return f'replica-pin:user:{user_id}'
+
+
+def _token_user_id(request):
+    """
+    User id claimed by the request's bearer token, unverified: it only decides
+    where this request reads from (authentication verifies the token anyway).
+    """
+    header = request.META.get(jwt_settings.AUTH_HEADER_NAME, '').split()
+    if len(header) != 2 or header[0] not in jwt_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return token_backend.decode(header[1], verify=False).get(jwt_settings.USER_ID_CLAIM)
+    except TokenBackendError:
+        return None
+
+
+def choose_replica(request):
+    """The replica alias `request` should read from, or None for 'default'."""
+    aliases = replicas()
+    if not aliases or request.method not in SAFE_METHODS:
+        return None
+    keys = [_client_key(request)]
+    user_id = _token_user_id(request)
+    if user_id is not None:
+        keys.append(_user_key(user_id))
+    if cache.get_many(keys):
+        return None
+    return aliases[next(_turns) % len(aliases)]
+
+
+def pin(request, response):
+    """After a successful unsafe request, read its client's next requests from 'default'."""
+    if not replicas() or request.method in SAFE_METHODS or response.status_code >= 400:
+        return
+    # The user resolved by DRF's authentication, which sets it on the Django request too
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        key = _user_key(user.pk)
+    else:
+        key = _client_key(request)
+    cache.set(key, True, settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def current_replica():
+    """Replica the current request reads from, or None when it reads from 'default'."""
+    return _read_alias.get()
+
+
+def start(request):
+    return _read_alias.set(choose_replica(request))
+
+
+def end(token):
+    _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """Routes reads to the replica chosen for the current request; see the module docstring."""
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Explicit: without a router answer, instances read from a replica would be saved there
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as 'default'
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema by replication
+        return db not in replicas()
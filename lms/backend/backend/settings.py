@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,7 +49,7 @@ AUTH_USER_MODEL = 'accounts.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -63,7 +64,15 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# In-process (username, role, is_active) cache used to resolve JWT users
+AUTH_USER_CACHE_SIZE = 10000
+AUTH_USER_CACHE_TTL = 60  # seconds
+
 MIDDLEWARE = [
+    # Async views for ASGI requests; first, so every later lookup uses that URLconf
+    'backend.middleware.AsgiURLConfMiddleware',
+    # Read replica per safe request (backend.routers)
+    'backend.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,11 +93,15 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:5173",
 ]
 
-PASSWORD_HASHERS = [
-    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
-]
-
 ROOT_URLCONF = 'backend.urls'
+# Used instead of ROOT_URLCONF for requests served over ASGI (backend.middleware), to answer
+# the read-heavy routes with async views. Opt-in (ASGI_URLCONF=backend.asgi_urls): on SQLite,
+# `manage.py bench_asgi --size 0.05 --requests 50 --concurrency 10` measured them slower than
+# the DRF views under WSGI, since the async ORM still runs every query in a worker thread:
+#   course list        WSGI  937 req/s, p50 0.9ms   ASGI 558 req/s, p50 16.9ms
+#   dashboard summary  WSGI 1185 req/s, p50 0.7ms   ASGI 672 req/s, p50 14.1ms
+# Re-run bench_asgi on the target database before enabling it.
+ASGI_URLCONF = os.getenv('ASGI_URLCONF') or None
 
 TEMPLATES = [
     {
@@ -155,6 +168,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files (Lesson.video, Material.file, ...)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 
 #------------------------------------------------------------------------------------------------------------------
 from pathlib import Path
@@ -166,7 +183,9 @@ load_dotenv()
 
 # Email settings for reset password:
 PASSWORD_RESET_TIMEOUT = 900  # 15 minutes
-EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend'
+# Override with e.g. django.core.mail.backends.filebased.EmailBackend or .console.EmailBackend locally
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 EMAIL_HOST='smtp.gmail.com'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER') # Hidden for security reason [you can set your own email address to check]
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD') # hidden for security reason [For checking Go to this https://myaccount.google.com/apppasswords and create your App password and paste here]
@@ -174,4 +193,125 @@ EMAIL_PORT=587
 EMAIL_USE_TLS=True
 DEFAULT_FROM_EMAIL = 'LMS System <noreply@yourdomain.com>'
 
+# Password hashing (accounts.hashers). PASSWORD_HASHER picks the hasher for new
+# hashes; the others stay listed so existing hashes still verify and are
+# rehashed with the preferred hasher/cost on the user's next login.
+# Measure candidates with `manage.py bench_hashers` before changing costs.
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'scrypt')  # scrypt | argon2 (needs argon2-cffi) | pbkdf2
+_PASSWORD_HASHERS = {
+    'scrypt': 'accounts.hashers.ScryptPasswordHasher',
+    'argon2': 'accounts.hashers.Argon2PasswordHasher',
+    'pbkdf2': 'accounts.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+]
+# Omitted parameters keep Django's defaults
+PASSWORD_HASHER_COSTS = {
+    'scrypt': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1},
+    'argon2': {'time_cost': 2, 'memory_cost': 65536, 'parallelism': 1},
+    'pbkdf2': {},
+}
+
+# Sliding-window limits for credential endpoints (accounts.throttling), kept in
+# the cache below. Behind a reverse proxy also set REST_FRAMEWORK['NUM_PROXIES']
+# so the client IP comes from X-Forwarded-For.
+AUTH_THROTTLE_RATES = {
+    'login': {'ip': '30/min', 'username': '10/min'},
+    'forgot_password': {'ip': '10/hour', 'email': '3/hour'},
+}
+
+# Course file delivery (lms.media): '' streams from Django; 'x-sendfile' or
+# 'x-accel-redirect' hands the file to the front server after the access check.
+# For nginx, MEDIA_ACCEL_REDIRECT_PREFIX is an `internal` location aliased to MEDIA_ROOT.
+MEDIA_OFFLOAD = os.getenv('MEDIA_OFFLOAD', '')
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Course banner renditions (lms.renditions), rendered by `manage.py render_banners`
+# as WebP and JPEG, cropped to cover each size
+BANNER_RENDITIONS = {
+    'card': {'size': (640, 360)},
+    'thumb': {'size': (320, 180)},
+}
+BANNER_RENDITION_QUALITY = 80
+
+# Resumable uploads (lms.uploads). Partial files live in UPLOAD_TEMP_DIR, which must be
+# on the same filesystem as MEDIA_ROOT (None: MEDIA_ROOT/partial_uploads).
+UPLOAD_TEMP_DIR = None
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # suggested to clients
+UPLOAD_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+UPLOAD_MAX_SIZE = 20 * 1024 ** 3
+UPLOAD_SESSION_TTL = 24 * 3600  # idle seconds before `manage.py purge_uploads` drops a session
+
+# Lesson progress heartbeats (lms.heartbeats): buffered per worker and written in bulk
+# every PROGRESS_FLUSH_INTERVAL seconds (None: only when full, flushed explicitly or at exit)
+PROGRESS_FLUSH_INTERVAL = 30
+PROGRESS_BUFFER_MAX_ENTRIES = 10000
+
+# Mail outbox (accounts.outbox): retries back off from OUTBOX_RETRY_BASE seconds
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BASE = 30
+
+# Cache: in-process locmem by default; set CACHE_REDIS_URL (e.g. redis://127.0.0.1:6379/1)
+# so every worker shares snapshots and invalidations.
+if os.getenv('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'lms-default',
+        }
+    }
+
+# Dashboard summary snapshots (seconds); writes invalidate them earlier via a version bump
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Shared course catalog pages (lms.catalog_cache, seconds). Course/Category writes retire
+# them at once; enrollment counters shown on them may lag by up to this long.
+CATALOG_CACHE_TIMEOUT = 60
+
+# SQLite profile (DATABASE_PROFILE), applied to DATABASES['default']. 'production' is
+# for several workers sharing the file; `manage.py stress_sqlite` compares the profiles.
+#   journal_mode=WAL      readers and the writer no longer block each other
+#   synchronous=NORMAL    fsync at checkpoints only; a power cut may lose the last commits, never corrupts
+#   mmap_size             reads come straight from the mapped file
+#   timeout               seconds to wait for the write lock (busy_timeout) before "database is locked"
+#   transaction_mode      atomic blocks take the write lock at BEGIN, so read-then-write transactions
+#                         queue up instead of failing on the lock upgrade (busy_timeout can't help there)
+#   CONN_MAX_AGE          connections, their pragmas and page cache survive between requests; under
+#                         ASGI set DATABASE_CONN_MAX_AGE=0 (each request runs in a new thread)
+DATABASE_PROFILE = os.getenv('DATABASE_PROFILE', 'development')
+DATABASE_PROFILES = {
+    'development': {},
+    'production': {
+        'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA mmap_size=268435456',
+        },
+    },
+}
+DATABASES['default'].update(DATABASE_PROFILES[DATABASE_PROFILE])
+
+# Read replicas (backend.routers): DATABASE_REPLICAS lists SQLite files kept in sync with
+# the primary by an external replicator (comma-separated; a copy of db.sqlite3 stands in
+# locally). Safe requests read from them round-robin; a client that just wrote reads from
+# 'default' for DATABASE_REPLICA_PIN_SECONDS, which must exceed the replication lag.
+DATABASE_REPLICAS = []
+for _number, _path in enumerate(filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica_{_number}'] = {
+        **DATABASES['default'], 'NAME': _path.strip(), 'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{_number}')
+DATABASE_ROUTERS = ['backend.routers.ReplicaRouter']
+DATABASE_REPLICA_PIN_SECONDS = 5
+
 
@@ -0,0 +1,67 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'dashboard:version'
+
+
+def _fresh_version():
+    # Time based, so a re-created key never reuses the number of an evicted one
+    return int(time.time() * 1000)
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _fresh_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, _fresh_version(), timeout=None)
+
+
+def invalidate():
+    # Bump now for readers inside this transaction and again on commit, so a
+    # snapshot built from pre-commit data is never stored under the live version
+    bump_version()
+    transaction.on_commit(bump_version)
+
+
+def summary_key(user, version):
+    # The admin payload is system-wide, teacher/student payloads are per user
+    if user.role == 'admin':
+        return f'dashboard:summary:v{version}:admin'
+    return f'dashboard:summary:v{version}:{user.role}:{user.pk}'
+
+
+def get_summary(user, version):
+    return cache.get(summary_key(user, version))
+
+
+def set_summary(user, version, data):
+    cache.set(summary_key(user, version), data, timeout=settings.DASHBOARD_CACHE_TIMEOUT)
+
+
+# Async variants for dashboard.views.dashboard_summary_async
+
+async def aget_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, _fresh_version(), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+async def aget_summary(user, version):
+    return await cache.aget(summary_key(user, version))
+
+
+async def aset_summary(user, version, data):
+    await cache.aset(summary_key(user, version), data, timeout=settings.DASHBOARD_CACHE_TIMEOUT)
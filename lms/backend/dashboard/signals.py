@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from lms.models import Category, Course, Enrollment
+from lms.counters import counters_rebuilt
+from lms.progress import progress_rescaled
+from lms.signals import enrollments_bulk_created
+from .cache import invalidate
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Recording a login does not change any dashboard
+    if kwargs.get('update_fields') == frozenset(['last_login']):
+        return
+    invalidate()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+@receiver(enrollments_bulk_created)
+@receiver(progress_rescaled)
+@receiver(counters_rebuilt)
+def catalog_changed(sender, **kwargs):
+    invalidate()
@@ -1,3 +1,122 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from accounts.models import User
+from lms import progress
+from lms.models import Category, Course, Enrollment, Lesson
+
+
+class AdminDashboardSummaryTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create(username='admin', role='admin')
+        self.category = Category.objects.create(title='Programming')
+        self.client.force_authenticate(user=self.admin)
+
+    def add_catalog(self, n):
+        # n teachers, each with one course and two students enrolled
+        start = Course.objects.count()
+        for i in range(start, start + n):
+            teacher = User.objects.create(username=f'teacher{i}', role='teacher')
+            course = Course.objects.create(
+                title=f'Course {i}', description='...', price=10, duration=2,
+                category=self.category, instructor=teacher
+            )
+            for j in range(2):
+                student = User.objects.create(username=f'student{i}_{j}', role='student')
+                Enrollment.objects.create(student=student, course=course, price=10)
+
+    def test_admin_summary_totals(self):
+        self.add_catalog(3)
+        Course.objects.filter(title='Course 0').update(is_active=False)
+
+        response = self.client.get('/api/dashboard/summary/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_users'], 10)
+        self.assertEqual(response.data['total_students'], 6)
+        self.assertEqual(response.data['total_teachers'], 3)
+        self.assertEqual(response.data['total_admins'], 1)
+        self.assertEqual(response.data['total_courses'], 2)
+        self.assertEqual(response.data['total_enrollments'], 6)
+        self.assertEqual(
+            [c['enrolled_students'] for c in response.data['courses']], [2, 2]
+        )
+        self.assertEqual(response.data['courses'][0]['category'], 'Programming')
+        self.assertEqual(
+            [i['total_courses'] for i in response.data['instructors']], [0, 1, 1]
+        )
+
+    def test_admin_summary_query_count_is_constant(self):
+        self.add_catalog(2)
+        with self.assertNumQueries(4):
+            self.client.get('/api/dashboard/summary/')
+
+        self.add_catalog(20)
+        with self.assertNumQueries(4):
+            self.client.get('/api/dashboard/summary/')
+
+    def test_admin_summary_is_cached_until_a_write(self):
+        self.add_catalog(2)
+        self.client.get('/api/dashboard/summary/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/dashboard/summary/')
+        self.assertEqual(response.data['total_courses'], 2)
+
+        self.add_catalog(1)
+        response = self.client.get('/api/dashboard/summary/')
+        self.assertEqual(response.data['total_courses'], 3)
+
+
+class ProgressDashboardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.teacher = User.objects.create(username='teacher', role='teacher')
+        self.student = User.objects.create(username='student', role='student')
+        self.course = Course.objects.create(
+            title='Course', description='...', price=10, duration=2,
+            category=Category.objects.create(title='Programming'), instructor=self.teacher
+        )
+        self.lessons = [self.add_lesson(i) for i in range(2)]
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course, price=10)
+        progress.complete(self.enrollment.pk, self.lessons[0].pk)
+
+    def add_lesson(self, i):
+        return Lesson.objects.create(course=self.course, title=f'Lesson {i}', description='...')
+
+    def summary(self, user):
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/dashboard/summary/').data
+        # Served from the cached snapshot when no query ran
+        return data, len(queries) > 0
+
+    def test_lesson_changes_retire_cached_summaries(self):
+        self.assertEqual(self.summary(self.student)[0]['average_progress'], 50.0)
+        self.summary(self.teacher)
+        self.assertFalse(self.summary(self.student)[1])
+        self.assertFalse(self.summary(self.teacher)[1])
+
+        self.add_lesson(2)
+        data, rebuilt = self.summary(self.student)
+        self.assertTrue(rebuilt)
+        self.assertEqual(data['average_progress'], 33.0)
+        self.assertTrue(self.summary(self.teacher)[1])
+
+        # The completed lesson goes: 0 of 2
+        self.lessons[0].delete()
+        self.assertEqual(self.summary(self.student)[0]['average_progress'], 0.0)
+        self.assertTrue(self.summary(self.teacher)[1])
+
+    def test_rebuilding_progress_retires_cached_summaries(self):
+        Enrollment.objects.update(completed_lessons=0, progress=0)
+        self.assertEqual(self.summary(self.student)[0]['average_progress'], 0.0)
+
+        progress.rebuild_progress()
+        self.assertEqual(self.summary(self.student)[0]['average_progress'], 50.0)
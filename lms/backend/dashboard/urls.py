@@ -1,3 +1,3 @@
 from django.urls import path
 from .views import dashboard_summary
-urlpatterns=[path('summary/', dashboard_summary)]
\ No newline at end of file
+urlpatterns=[path('summary/', dashboard_summary, name='dashboard-summary')]
\ No newline at end of file
@@ -2,144 +2,204 @@ from django.shortcuts import render
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.db.models import Count, Q, Sum
 from accounts.models import User
+from lms import async_api
 from lms.models import Course, Enrollment
 from lms.serializers import CourseSerializer
+from . import cache
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dashboard_summary(request):
-    
     user = request.user
-    
+    if user.role not in ('admin', 'teacher', 'student'):
+        return Response({'detail': 'Invalid role'})
+
+    # Snapshots are keyed by the current data version, so writes retire them
+    version = cache.get_version()
+    data = cache.get_summary(user, version)
+    if data is None:
+        data = build_summary(user)
+        cache.set_summary(user, version, data)
+    return Response(data)
+
+
+# Dashboard summary, async (ASGI)
+@async_api.api_view_async(dashboard_summary)
+async def dashboard_summary_async(request):
+    user = request.user
+    if user.role not in ('admin', 'teacher', 'student'):
+        return async_api.render({'detail': 'Invalid role'})
+
+    version = await cache.aget_version()
+    data = await cache.aget_summary(user, version)
+    if data is None:
+        data = await abuild_summary(user)
+        await cache.aset_summary(user, version, data)
+    return async_api.render(data)
+
+
+# The queries behind each role's summary; build_summary() and abuild_summary()
+# run them through the sync and the async ORM and shape the rows the same way
+
+def _user_totals():
+    # Role totals in one pass over the user table
+    return {
+        'total_users': Count('id'),
+        'total_students': Count('id', filter=Q(role='student')),
+        'total_teachers': Count('id', filter=Q(role='teacher')),
+        'total_admins': Count('id', filter=Q(role='admin')),
+    }
+
+
+def _admin_courses():
+    # Course Instructor mapping with enrollment counts (materialized on Course)
+    return Course.objects.filter(is_active=True).values(
+        'id', 'title', 'instructor_id', 'instructor__username',
+        'enrolled_count', 'price', 'duration', 'category__title'
+    ).order_by('id')
+
+
+def _instructors():
+    # Course totals materialized in InstructorStats (lms.counters); no row: no active course
+    return User.objects.filter(role='teacher').values(
+        'id', 'username', 'email', 'instructor_stats__total_courses'
+    ).order_by('id')
+
+
+def _teacher_courses(user):
+    return Course.objects.filter(
+        instructor=user,
+        is_active=True
+    ).values('id', 'title', 'enrolled_count', 'price', 'duration', 'category__title')
+
+
+def _student_enrollments(user):
+    return Enrollment.objects.filter(
+        student=user,
+        is_active=True
+    ).select_related('course', 'course__instructor')
+
+
+def build_summary(user):
     if user.role == 'admin':
-        # Admin Dashboard - Full system overview
-        total_users = User.objects.count()
-        total_students = User.objects.filter(role='student').count()
-        total_teachers = User.objects.filter(role='teacher').count()
-        total_admins = User.objects.filter(role='admin').count()
-        total_courses = Course.objects.filter(is_active=True).count()
-        total_enrollments = Enrollment.objects.filter(is_active=True).count()
-        
-        # Course Instructor mapping with enrollment counts
-        courses_data = []
-        courses = Course.objects.filter(is_active=True).select_related('instructor')
-        for course in courses:
-            enrollment_count = Enrollment.objects.filter(
-                course=course, 
-                is_active=True
-            ).count()
-            courses_data.append({
-                'id': course.id,
-                'title': course.title,
-                'instructor_name': course.instructor.username,
-                'instructor_id': course.instructor.id,
-                'enrolled_students': enrollment_count,
-                'price': course.price,
-                'duration': course.duration,
-                'category': course.category.title if course.category else None
-            })
-        
-        # Instructor list with course counts
-        instructors_data = []
-        instructors = User.objects.filter(role='teacher')
-        for instructor in instructors:
-            course_count = Course.objects.filter(
-                instructor=instructor, 
-                is_active=True
-            ).count()
-            instructors_data.append({
-                'id': instructor.id,
-                'username': instructor.username,
-                'email': instructor.email,
-                'total_courses': course_count
-            })
-        
-        data = {
-            'role': 'admin',
-            'total_users': total_users,
-            'total_students': total_students,
-            'total_teachers': total_teachers,
-            'total_admins': total_admins,
-            'total_courses': total_courses,
-            'total_enrollments': total_enrollments,
-            'courses': courses_data,
-            'instructors': instructors_data
-        }
-        
+        return _admin_summary(
+            User.objects.aggregate(**_user_totals()),
+            Course.objects.aggregate(total=Sum('enrolled_count'))['total'] or 0,
+            list(_admin_courses()),
+            list(_instructors()),
+        )
     elif user.role == 'teacher':
-        # Instructor Dashboard - Only their courses
-        my_courses = Course.objects.filter(
-            instructor=user, 
-            is_active=True
-        ).select_related('category')
-        
-        total_my_courses = my_courses.count()
-        total_students_enrolled = 0
-        
-        courses_data = []
-        for course in my_courses:
-            enrollment_count = Enrollment.objects.filter(
-                course=course, 
-                is_active=True
-            ).count()
-            total_students_enrolled += enrollment_count
-            
-            courses_data.append({
-                'id': course.id,
-                'title': course.title,
-                'enrolled_students': enrollment_count,
-                'price': course.price,
-                'duration': course.duration,
-                'category': course.category.title if course.category else None
-            })
-        
-        data = {
-            'role': 'teacher',
-            'total_courses': total_my_courses,
-            'total_students_enrolled': total_students_enrolled,
-            'courses': courses_data
-        }
-        
+        return _teacher_summary(list(_teacher_courses(user)))
     elif user.role == 'student':
-        # Student Dashboard - Only their enrollments
-        my_enrollments = Enrollment.objects.filter(
-            student=user,
-            is_active=True
-        ).select_related('course', 'course__instructor')
-        
-        total_enrolled = my_enrollments.count()
-        completed_courses = my_enrollments.filter(is_completed=True).count()
-        in_progress = total_enrolled - completed_courses
-        
-        # Calculating average progress
-        if total_enrolled > 0:
-            avg_progress = sum([e.progress for e in my_enrollments]) / total_enrolled
-        else:
-            avg_progress = 0
-        
-        enrollments_data = []
-        for enrollment in my_enrollments:
-            enrollments_data.append({
-                'id': enrollment.id,
-                'course_id': enrollment.course.id,
-                'course_title': enrollment.course.title,
-                'instructor_name': enrollment.course.instructor.username,
-                'progress': enrollment.progress,
-                'is_completed': enrollment.is_completed,
-                'price': enrollment.price
-            })
-        
-        data = {
-            'role': 'student',
-            'total_enrolled': total_enrolled,
-            'completed_courses': completed_courses,
-            'in_progress': in_progress,
-            'average_progress': round(avg_progress, 2),
-            'enrollments': enrollments_data
-        }
-    
+        return _student_summary(list(_student_enrollments(user)))
+
+
+async def abuild_summary(user):
+    if user.role == 'admin':
+        return _admin_summary(
+            await User.objects.aaggregate(**_user_totals()),
+            (await Course.objects.aaggregate(total=Sum('enrolled_count')))['total'] or 0,
+            [course async for course in _admin_courses()],
+            [instructor async for instructor in _instructors()],
+        )
+    elif user.role == 'teacher':
+        return _teacher_summary([course async for course in _teacher_courses(user)])
+    elif user.role == 'student':
+        return _student_summary([enrollment async for enrollment in _student_enrollments(user)])
+
+
+def _admin_summary(user_totals, total_enrollments, courses, instructors):
+    # Admin Dashboard - Full system overview
+    courses_data = []
+    for course in courses:
+        courses_data.append({
+            'id': course['id'],
+            'title': course['title'],
+            'instructor_name': course['instructor__username'],
+            'instructor_id': course['instructor_id'],
+            'enrolled_students': course['enrolled_count'],
+            'price': course['price'],
+            'duration': course['duration'],
+            'category': course['category__title']
+        })
+
+    instructors_data = []
+    for instructor in instructors:
+        instructors_data.append({
+            'id': instructor['id'],
+            'username': instructor['username'],
+            'email': instructor['email'],
+            'total_courses': instructor['instructor_stats__total_courses'] or 0
+        })
+
+    return {
+        'role': 'admin',
+        'total_users': user_totals['total_users'],
+        'total_students': user_totals['total_students'],
+        'total_teachers': user_totals['total_teachers'],
+        'total_admins': user_totals['total_admins'],
+        'total_courses': len(courses_data),
+        'total_enrollments': total_enrollments,
+        'courses': courses_data,
+        'instructors': instructors_data
+    }
+
+
+def _teacher_summary(courses):
+    # Instructor Dashboard - Only their courses
+    total_students_enrolled = 0
+    courses_data = []
+    for course in courses:
+        total_students_enrolled += course['enrolled_count']
+        courses_data.append({
+            'id': course['id'],
+            'title': course['title'],
+            'enrolled_students': course['enrolled_count'],
+            'price': course['price'],
+            'duration': course['duration'],
+            'category': course['category__title']
+        })
+
+    return {
+        'role': 'teacher',
+        'total_courses': len(courses_data),
+        'total_students_enrolled': total_students_enrolled,
+        'courses': courses_data
+    }
+
+
+def _student_summary(enrollments):
+    # Student Dashboard - Only their enrollments, counted from the one fetched list
+    total_enrolled = len(enrollments)
+    completed_courses = sum(1 for enrollment in enrollments if enrollment.is_completed)
+    in_progress = total_enrolled - completed_courses
+
+    # Calculating average progress
+    if total_enrolled > 0:
+        avg_progress = sum([e.progress for e in enrollments]) / total_enrolled
     else:
-        data = {'detail': 'Invalid role'}
-    
-    return Response(data)
\ No newline at end of file
+        avg_progress = 0
+
+    enrollments_data = []
+    for enrollment in enrollments:
+        enrollments_data.append({
+            'id': enrollment.id,
+            'course_id': enrollment.course.id,
+            'course_title': enrollment.course.title,
+            'instructor_name': enrollment.course.instructor.username,
+            'progress': enrollment.progress,
+            'is_completed': enrollment.is_completed,
+            'price': enrollment.price
+        })
+
+    return {
+        'role': 'student',
+        'total_enrolled': total_enrolled,
+        'completed_courses': completed_courses,
+        'in_progress': in_progress,
+        'average_progress': round(avg_progress, 2),
+        'enrollments': enrollments_data
+    }
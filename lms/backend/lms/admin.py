@@ -41,11 +41,19 @@ class MaterialAdmin(admin.ModelAdmin):
 # Enrollment
 @admin.register(Enrollment)
 class EnrollmentAdmin(admin.ModelAdmin):
-    list_display = ('student', 'course', 'is_active', 'progress', 'is_completed', 'price')
+    list_display = ('student', 'course', 'is_active', 'progress', 'completed_lessons', 'is_completed', 'price')
     list_filter = ('is_active', 'is_completed', 'course')
     search_fields = ('student__username', 'course__title')
     raw_id_fields = ('student', 'course')
 
+# LessonProgress
+@admin.register(LessonProgress)
+class LessonProgressAdmin(admin.ModelAdmin):
+    list_display = ('student', 'lesson', 'position', 'completed', 'updated_at')
+    list_filter = ('completed',)
+    search_fields = ('student__username', 'lesson__title')
+    raw_id_fields = ('student', 'lesson')
+
 # QuestionAnswer 
 @admin.register(QuestionAnswer)
 class QuestionAnswerAdmin(admin.ModelAdmin):
@@ -53,3 +61,24 @@ class QuestionAnswerAdmin(admin.ModelAdmin):
     list_filter = ('is_active', 'created_at')
     search_fields = ('user__username', 'lesson__title', 'description')
     raw_id_fields = ('user', 'lesson')
+
+# InstructorStats
+@admin.register(InstructorStats)
+class InstructorStatsAdmin(admin.ModelAdmin):
+    list_display = ('instructor', 'total_courses', 'total_students')
+    search_fields = ('instructor__username',)
+    raw_id_fields = ('instructor',)
+
+# UploadSession
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'owner', 'target', 'object_id', 'received', 'size', 'status', 'updated_at')
+    list_filter = ('status', 'target')
+    search_fields = ('filename', 'owner__username')
+    raw_id_fields = ('owner',)
+
+# StoredBlob
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'ref_count', 'updated_at')
+    search_fields = ('name',)
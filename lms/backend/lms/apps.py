@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class LmsConfig(AppConfig):
     name = 'lms'
+
+    def ready(self):
+        from . import search, signals  # noqa: F401
+        # Migrations that rebuild lms_course on SQLite drop the search triggers
+        post_migrate.connect(search.repair_after_migrate, sender=self)
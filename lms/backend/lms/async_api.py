@@ -0,0 +1,87 @@
+"""
+Async counterparts of the DRF pieces the ASGI read views need.
+
+DRF's APIView is synchronous, so under ASGI every DRF request is handed to
+a worker thread. Views built with api_view_async() answer their read
+methods in the event loop instead, with the async ORM: they authenticate
+through the configured classes' aauthenticate() (see
+accounts.authentication), render JSON with DRF's renderer and report
+APIExceptions in DRF's format. Other methods on the same route are passed
+to its DRF view unchanged.
+
+Requests served over ASGI are routed to these views by
+backend.middleware.AsgiURLConfMiddleware when settings.ASGI_URLCONF is set
+(opt-in: see the measurements next to it); WSGI keeps the DRF views.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+def render(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def error_response(exc, request, authenticators):
+    """An APIException as DRF's exception handler would answer it."""
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = render(data, exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        header = authenticators[0].authenticate_header(request) if authenticators else None
+        if header:
+            response['WWW-Authenticate'] = header
+        else:
+            response.status_code = 403
+    return response
+
+
+async def authenticate(request, authenticators):
+    """(user, auth) from the first authenticator that recognizes the request, or (None, None)."""
+    for authenticator in authenticators:
+        if hasattr(authenticator, 'aauthenticate'):
+            result = await authenticator.aauthenticate(request)
+        else:
+            result = await sync_to_async(authenticator.authenticate)(request)
+        if result is not None:
+            return result
+    return None, None
+
+
+async def run_sync(sync_view, request, *args, **kwargs):
+    """Answer with the DRF view after all (e.g. for a variant the async view doesn't cover)."""
+    return await sync_to_async(sync_view)(request._request, *args, **kwargs)
+
+
+def api_view_async(sync_view, methods=('GET',)):
+    """
+    Serve `methods` of a route with the decorated coroutine and every other
+    method with `sync_view`, the route's DRF view. The coroutine receives a
+    DRF Request of an authenticated user and returns a response (see
+    render()) or raises an APIException.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method not in methods:
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+            authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+            drf_request = Request(request, authenticators=authenticators)
+            try:
+                user, auth = await authenticate(drf_request, authenticators)
+                if user is None:
+                    raise exceptions.NotAuthenticated()
+                drf_request.user, drf_request.auth = user, auth
+                return await handler(drf_request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return error_response(exc, drf_request, authenticators)
+
+        # Like APIView: CSRF only applies to session authentication, which DRF checks itself
+        view.csrf_exempt = True
+        return view
+    return decorator
@@ -0,0 +1,398 @@
+"""
+API benchmark harness used by `manage.py bench_api`.
+
+Seeds a synthetic dataset (lms.seeding), drives every /api/ route through the DRF test
+client with real JWT auth and records per-endpoint latency (p50/p95) and
+SQL query counts. Each request runs in a rolled-back transaction so write
+endpoints can be repeated against the same data.
+
+throughput() compares concurrent-request throughput of the read paths that
+have async views (backend.asgi_urls) under WSGI and ASGI, for
+`manage.py bench_asgi`.
+"""
+import asyncio
+import hashlib
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable
+
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.test import AsyncClient, Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+
+from accounts.authentication import tokens_for_user
+from accounts.models import User
+from . import heartbeats, seeding, uploads
+from .models import Course, Lesson, Material
+
+MEDIA_FILE_SIZE = 4 * 1024 * 1024
+UPLOAD_CHUNK = bytes(1024 * 1024)
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    path: str
+    role: str = None
+    data: dict = field(default_factory=dict)
+    headers: dict = field(default_factory=dict)
+    content_type: str = None
+    # Runs inside each iteration's rolled-back transaction, before the timed request
+    prepare: Callable = None
+    # Tells apart endpoints that only differ in their body
+    variant: str = None
+
+    @property
+    def label(self):
+        query = self.path.partition('?')[2]
+        label = f'{self.method} {self.name}' + (f'?{query}' if query else '')
+        if 'HTTP_RANGE' in self.headers:
+            label += ' (range)'
+        if self.variant:
+            label += f' ({self.variant})'
+        return label + (f' [{self.role}]' if self.role else '')
+
+
+@contextmanager
+def isolated_environment(**overrides):
+    """
+    Run the bench_* commands against a fresh test database and a throwaway
+    MEDIA_ROOT, never the real ones, with mail kept in memory and heartbeats
+    buffered (no flush thread writing outside the rolled-back transactions).
+    """
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0)
+    old_config = runner.setup_databases()
+    media_root = tempfile.mkdtemp(prefix='bench-media-')
+    try:
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                               MEDIA_ROOT=media_root, PROGRESS_FLUSH_INTERVAL=None, **overrides):
+            yield
+    finally:
+        heartbeats.buffer.drain()
+        runner.teardown_databases(old_config)
+        shutil.rmtree(media_root, ignore_errors=True)
+        teardown_test_environment()
+
+
+def seed(plan):
+    """Seed the dataset described by a SeedPlan and pick the rows the endpoints use."""
+    seeding.seed(plan)
+
+    course = Course.objects.filter(
+        enrollments__isnull=False, lessons__isnull=False, materials__isnull=False
+    ).order_by('id').first()
+    if course is None:
+        # bench_api turns this into a CommandError
+        raise ValueError('The dataset has no course with enrollments, lessons and materials; seed more data')
+    student = User.objects.filter(enrollments__course=course).order_by('id').first()
+    lesson = Lesson.objects.filter(course=course).order_by('id').first()
+    material = Material.objects.filter(course=course).order_by('id').first()
+    # Files for the media endpoints; run with MEDIA_ROOT pointing somewhere disposable
+    lesson.video.save('bench.mp4', ContentFile(bytes(MEDIA_FILE_SIZE)))
+    material.file.save('bench.pdf', ContentFile(bytes(MEDIA_FILE_SIZE)))
+    other_course = Course.objects.exclude(enrollments__student=student).order_by('id').first()
+    if other_course is None:
+        # Small datasets enroll every student in every course; enroll endpoints need one more
+        other_course = Course.objects.create(
+            title='Benchmark course', description='Not enrolled by the benchmark student', price=course.price,
+            duration=course.duration, category=course.category, instructor=course.instructor,
+        )
+    return {
+        'admin': User.objects.filter(role='admin').order_by('id').first(),
+        'teacher': course.instructor,
+        'student': student,
+        'course': course,
+        'other_course': other_course,
+        'lesson': lesson,
+        'material': material,
+        'password': plan.password,
+        'upload': uploads.create_session(course.instructor, 'lesson', lesson.id, 'upload.mp4', len(UPLOAD_CHUNK) * 2),
+        'finished_upload': uploads.create_session(course.instructor, 'material', material.id, 'done.pdf',
+                                                  len(UPLOAD_CHUNK)),
+        'cohort': list(User.objects.filter(role='student').order_by('id').values_list('id', flat=True)[:500]),
+    }
+
+
+def _fill_upload(session):
+    def prepare():
+        uploads.part_path(session).write_bytes(UPLOAD_CHUNK)
+        type(session).objects.filter(pk=session.pk).update(received=session.size)
+    return prepare
+
+
+def _warm(path, user):
+    # Leaves `path` as `user` sees it in the shared caches (lms.catalog_cache)
+    def prepare():
+        client = APIClient()
+        client.force_authenticate(user=user)
+        client.get(path)
+    return prepare
+
+
+def endpoints(fx):
+    course, lesson, material = fx['course'], fx['lesson'], fx['material']
+    upload, finished_upload = fx['upload'], fx['finished_upload']
+    student, password = fx['student'], fx['password']
+    uid = urlsafe_base64_encode(force_bytes(student.pk))
+    token = default_token_generator.make_token(student)
+    return [
+        # accounts
+        Endpoint('register', 'post', '/api/auth/register/',
+                 data={'username': 'bench-new', 'email': 'new@bench.test', 'password': password, 'role': 'student'}),
+        Endpoint('login', 'post', '/api/auth/login/', data={'username': student.username, 'password': password}),
+        Endpoint('profile', 'get', '/api/auth/profile/', 'student'),
+        Endpoint('profile', 'put', '/api/auth/profile/', 'student', {'first_name': 'Bench'}),
+        Endpoint('user-list', 'get', '/api/auth/users/', 'admin'),
+        Endpoint('forgot-password', 'post', '/api/auth/forgot-password/', data={'email': student.email}),
+        Endpoint('reset-password', 'post', f'/api/auth/reset-password/{uid}/{token}/', data={'password': password}),
+        Endpoint('verify-reset-token', 'get', f'/api/auth/verify-reset-token/{uid}/{token}/'),
+        # lms
+        Endpoint('category-list-create', 'get', '/api/lms/categories/', 'student'),
+        Endpoint('category-list-create', 'post', '/api/lms/categories/', 'admin', {'title': 'Bench'}),
+        Endpoint('course-list-create', 'get', '/api/lms/courses/', 'student'),
+        Endpoint('course-list-create', 'get', '/api/lms/courses/', 'student',
+                 headers={'HTTP_IF_NONE_MATCH': '*'}, variant='not modified'),
+        Endpoint('course-list-create', 'get', '/api/lms/courses/', 'student',
+                 prepare=_warm('/api/lms/courses/', fx['admin']), variant='cached'),
+        Endpoint('course-list-create', 'get', '/api/lms/courses/?search=synthetic+topic', 'student'),
+        Endpoint('course-list-create', 'get', '/api/lms/courses/?pagination=cursor', 'student'),
+        Endpoint('course-list-create', 'get', '/api/lms/courses/', 'teacher'),
+        Endpoint('course-list-create', 'post', '/api/lms/courses/', 'admin', {
+            'title': 'Bench', 'description': '...', 'price': 1, 'duration': 1,
+            'category': course.category_id, 'instructor': course.instructor_id,
+        }),
+        Endpoint('course-detail', 'get', f'/api/lms/courses/{course.id}/', 'student'),
+        Endpoint('course-detail', 'put', f'/api/lms/courses/{course.id}/', 'admin', {'price': 5}),
+        Endpoint('course-detail', 'delete', f'/api/lms/courses/{course.id}/', 'admin'),
+        Endpoint('course-students', 'get', f'/api/lms/courses/{course.id}/students/', 'teacher'),
+        Endpoint('lesson-list-create', 'get', f'/api/lms/courses/{course.id}/lessons/', 'student'),
+        Endpoint('lesson-list-create', 'get', f'/api/lms/courses/{course.id}/lessons/', 'student',
+                 headers={'HTTP_IF_NONE_MATCH': '*'}, variant='not modified'),
+        Endpoint('lesson-list-create', 'post', f'/api/lms/courses/{course.id}/lessons/', 'teacher',
+                 {'title': 'Bench', 'description': '...'}),
+        Endpoint('lesson-detail', 'get', f'/api/lms/courses/{course.id}/lessons/{lesson.id}/', 'student'),
+        Endpoint('lesson-detail', 'put', f'/api/lms/courses/{course.id}/lessons/{lesson.id}/', 'teacher',
+                 {'title': 'Bench'}),
+        Endpoint('lesson-detail', 'delete', f'/api/lms/courses/{course.id}/lessons/{lesson.id}/', 'teacher'),
+        Endpoint('lesson-video', 'get', f'/api/lms/courses/{course.id}/lessons/{lesson.id}/video/', 'student'),
+        Endpoint('lesson-video', 'get', f'/api/lms/courses/{course.id}/lessons/{lesson.id}/video/', 'student',
+                 headers={'HTTP_RANGE': 'bytes=1048576-2097151'}),
+        Endpoint('lesson-progress', 'get', f'/api/lms/courses/{course.id}/lessons/{lesson.id}/progress/', 'student'),
+        Endpoint('lesson-progress', 'post', f'/api/lms/courses/{course.id}/lessons/{lesson.id}/progress/', 'student',
+                 {'position': 120}, variant='heartbeat'),
+        Endpoint('lesson-progress', 'post', f'/api/lms/courses/{course.id}/lessons/{lesson.id}/progress/', 'student',
+                 {'completed': True, 'position': 600}, variant='complete'),
+        Endpoint('material-list-create', 'get', f'/api/lms/courses/{course.id}/materials/', 'student'),
+        Endpoint('material-list-create', 'get', f'/api/lms/courses/{course.id}/materials/', 'student',
+                 headers={'HTTP_IF_NONE_MATCH': '*'}, variant='not modified'),
+        Endpoint('material-list-create', 'post', f'/api/lms/courses/{course.id}/materials/', 'teacher',
+                 {'title': 'Bench', 'description': '...'}),
+        Endpoint('material-detail', 'get', f'/api/lms/courses/{course.id}/materials/{material.id}/', 'student'),
+        Endpoint('material-detail', 'put', f'/api/lms/courses/{course.id}/materials/{material.id}/', 'teacher',
+                 {'title': 'Bench'}),
+        Endpoint('material-detail', 'delete', f'/api/lms/courses/{course.id}/materials/{material.id}/', 'teacher'),
+        Endpoint('material-file', 'get', f'/api/lms/courses/{course.id}/materials/{material.id}/file/', 'student'),
+        Endpoint('upload-create', 'post', '/api/lms/uploads/', 'teacher',
+                 {'target': 'lesson', 'object_id': lesson.id, 'filename': 'lecture.mp4', 'size': 10 ** 9}),
+        Endpoint('upload-detail', 'get', f'/api/lms/uploads/{upload.id}/', 'teacher'),
+        Endpoint('upload-detail', 'put', f'/api/lms/uploads/{upload.id}/', 'teacher', UPLOAD_CHUNK,
+                 headers={'HTTP_UPLOAD_OFFSET': '0',
+                          'HTTP_X_CHUNK_SHA256': hashlib.sha256(UPLOAD_CHUNK).hexdigest()},
+                 content_type='application/octet-stream'),
+        Endpoint('upload-detail', 'delete', f'/api/lms/uploads/{upload.id}/', 'teacher'),
+        Endpoint('upload-complete', 'post', f'/api/lms/uploads/{finished_upload.id}/complete/', 'teacher',
+                 prepare=_fill_upload(finished_upload)),
+        Endpoint('enrollment-list-create', 'get', '/api/lms/enrollments/', 'student'),
+        Endpoint('enrollment-list-create', 'post', '/api/lms/enrollments/', 'student',
+                 {'course': fx['other_course'].id, 'price': 10}),
+        Endpoint('enrollment-bulk-create', 'post', '/api/lms/enrollments/bulk/', 'admin',
+                 {'course': fx['other_course'].id, 'students': fx['cohort']}),
+        Endpoint('enrollment-bulk-create', 'post', '/api/lms/enrollments/bulk/', 'student',
+                 {'courses': [fx['other_course'].id, course.id]}),
+        Endpoint('question-answer-list-create', 'get', f'/api/lms/lessons/{lesson.id}/questions/', 'student'),
+        Endpoint('question-answer-list-create', 'post', f'/api/lms/lessons/{lesson.id}/questions/', 'student',
+                 {'description': 'Bench question', 'lesson': lesson.id}),
+        # dashboard
+        Endpoint('dashboard-summary', 'get', '/api/dashboard/summary/', 'admin'),
+        Endpoint('dashboard-summary', 'get', '/api/dashboard/summary/', 'teacher'),
+        Endpoint('dashboard-summary', 'get', '/api/dashboard/summary/', 'student'),
+    ]
+
+
+def api_route_names():
+    names = set()
+
+    def walk(patterns, prefix=''):
+        for pattern in patterns:
+            route = prefix + str(pattern.pattern)
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns, route)
+            elif isinstance(pattern, URLPattern) and route.startswith('api/'):
+                names.add(pattern.name or route)
+
+    walk(get_resolver().url_patterns)
+    return names
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run(fx, iterations=20, warmup=2):
+    """Return {label: {p50_ms, p95_ms, queries}} for every endpoint."""
+    specs = endpoints(fx)
+    missing = api_route_names() - {spec.name for spec in specs}
+    if missing:
+        raise ValueError(f'No benchmark endpoint for routes: {", ".join(sorted(missing))}')
+
+    tokens = {
+        role: str(tokens_for_user(fx[role]).access_token)
+        for role in ('admin', 'teacher', 'student')
+    }
+    results = {}
+    for spec in specs:
+        client = APIClient()
+        if spec.role:
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens[spec.role]}')
+        timings, queries = [], 0
+        for i in range(warmup + iterations):
+            # Measure the uncached path; response caches would hide regressions
+            cache.clear()
+            encoding = {'content_type': spec.content_type} if spec.content_type else {'format': 'json'}
+            with transaction.atomic():
+                if spec.prepare:
+                    spec.prepare()
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = getattr(client, spec.method)(spec.path, spec.data, **encoding, **spec.headers)
+                if response.streaming:
+                    # Time the full body, not just the headers
+                    b''.join(response.streaming_content)
+                    response.close()
+                elapsed = time.perf_counter() - start
+                transaction.set_rollback(True)
+            if response.status_code >= 400:
+                raise ValueError(f'{spec.label} returned {response.status_code}: {getattr(response, "data", "")}')
+            if i >= warmup:
+                timings.append(elapsed * 1000)
+                queries = max(queries, len(ctx.captured_queries))
+        results[spec.label] = {
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'queries': queries,
+        }
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms=1.0):
+    """
+    List regressions: any extra query, or a p95 slower than baseline by more
+    than `threshold` (a fraction) and at least `min_delta_ms` (timer noise).
+    """
+    regressions = []
+    for label, current in results.items():
+        previous = baseline.get(label)
+        if not previous:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{label}: {previous['queries']} -> {current['queries']} queries")
+        slower = current['p95_ms'] - previous['p95_ms']
+        if slower > previous['p95_ms'] * threshold and slower >= min_delta_ms:
+            regressions.append(f"{label}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+    return regressions
+
+
+def concurrent_paths(fx):
+    """The read endpoints served by async views under ASGI."""
+    course = fx['course']
+    return [
+        Endpoint('course-list-create', 'get', '/api/lms/courses/', 'student'),
+        Endpoint('course-list-create', 'get', f'/api/lms/courses/?category={course.category_id}', 'student'),
+        Endpoint('lesson-list-create', 'get', f'/api/lms/courses/{course.id}/lessons/', 'student'),
+        Endpoint('dashboard-summary', 'get', '/api/dashboard/summary/', 'student'),
+        Endpoint('dashboard-summary', 'get', '/api/dashboard/summary/', 'admin'),
+    ]
+
+
+def _summarize(timings, elapsed):
+    return {
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+    }
+
+
+def _wsgi_run(spec, headers, requests, concurrency):
+    def one(_):
+        start = time.perf_counter()
+        response = Client().get(spec.path, headers=headers)
+        if response.status_code >= 400:
+            raise ValueError(f'{spec.label} returned {response.status_code} under WSGI')
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        timings = list(pool.map(one, range(requests)))
+    return _summarize(timings, time.perf_counter() - start)
+
+
+async def _asgi_run(spec, headers, requests, concurrency):
+    client = AsyncClient()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with slots:
+            start = time.perf_counter()
+            response = await client.get(spec.path, headers=headers)
+            if response.status_code >= 400:
+                raise ValueError(f'{spec.label} returned {response.status_code} under ASGI')
+            return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    timings = await asyncio.gather(*(one() for _ in range(requests)))
+    return _summarize(timings, time.perf_counter() - start)
+
+
+def throughput(fx, requests=200, concurrency=20, warmup=5):
+    """
+    Return {label: {'wsgi': {rps, p50_ms, p95_ms}, 'asgi': {...}}}: `requests`
+    GETs per path with `concurrency` in flight, through Django's WSGI handler
+    on a thread pool and through its ASGI handler on one event loop.
+    """
+    tokens = {
+        role: str(tokens_for_user(fx[role]).access_token)
+        for role in ('admin', 'teacher', 'student')
+    }
+    results = {}
+    for spec in concurrent_paths(fx):
+        headers = {'Authorization': f'Bearer {tokens[spec.role]}'}
+        row = {}
+        for mode in ('wsgi', 'asgi'):
+            # Same starting point for both: cold response caches, then a warmup
+            cache.clear()
+            if mode == 'wsgi':
+                _wsgi_run(spec, headers, warmup, 1)
+                row[mode] = _wsgi_run(spec, headers, requests, concurrency)
+            else:
+                asyncio.run(_asgi_run(spec, headers, warmup, 1))
+                row[mode] = asyncio.run(_asgi_run(spec, headers, requests, concurrency))
+        results[spec.label] = row
+    return results
@@ -0,0 +1,140 @@
+"""
+Reference counts for the content-addressed file store (lms.storage).
+
+lms.signals calls retain()/release() when a Lesson.video or Material.file
+starts or stops pointing at a blob. Counts move through F() updates like
+the course counters; the blob file is deleted once the transaction that
+dropped the last reference commits. rebuild_refcounts() and
+collect_garbage() (`manage.py gc_blobs`) repair drift and remove orphans.
+
+A save that deduplicates against an existing blob touches its row first
+(touch()), before its own reference is counted in post_save. A release
+only deletes a blob nobody touched since, and deletes the file while it
+holds the row, so the blob cannot vanish between the two.
+"""
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Lesson, Material, StoredBlob
+from .storage import BLOB_PREFIX, blob_storage, is_blob
+
+# Models whose BLOB_FIELD points into the store
+BLOB_MODELS = (Lesson, Material)
+
+
+def retain(name):
+    if not is_blob(name):
+        return
+    blob, created = StoredBlob.objects.get_or_create(
+        name=name, defaults={'size': blob_storage.size(name), 'ref_count': 1}
+    )
+    if not created:
+        StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1, updated_at=timezone.now())
+
+
+def touch(name):
+    """Mark a blob as about to gain a reference; False if it has no row."""
+    return bool(StoredBlob.objects.filter(name=name).update(updated_at=timezone.now()))
+
+
+def release(name):
+    if not is_blob(name):
+        return
+    released_at = timezone.now()
+    StoredBlob.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1, updated_at=released_at
+    )
+    transaction.on_commit(lambda: delete_if_unused(name, released_at))
+
+
+def delete_if_unused(name, touched_before=None):
+    """
+    Remove the blob's row and file if nothing references it any more (and,
+    given `touched_before`, nothing retained or touched it after that).
+    """
+    unused = StoredBlob.objects.filter(name=name, ref_count=0)
+    if touched_before is not None:
+        unused = unused.filter(updated_at__lte=touched_before)
+    with transaction.atomic():
+        deleted, _ = unused.delete()
+        if deleted:
+            # Before the row lock is released: a concurrent touch() then finds no row
+            blob_storage.delete(name)
+    return bool(deleted)
+
+
+def referenced_names():
+    """Counter of blob names over every BLOB_MODELS row."""
+    counts = Counter()
+    for model in BLOB_MODELS:
+        field = model.BLOB_FIELD
+        names = model.objects.filter(**{f'{field}__startswith': f'{BLOB_PREFIX}/'}).values_list(field, flat=True)
+        counts.update(names.iterator())
+    return counts
+
+
+def rebuild_refcounts():
+    """Recount references from the tables; returns the number of rows changed."""
+    counts = referenced_names()
+    changed = 0
+    with transaction.atomic():
+        for blob in StoredBlob.objects.select_for_update().only('name', 'ref_count'):
+            actual = counts.pop(blob.name, 0)
+            if blob.ref_count != actual:
+                StoredBlob.objects.filter(pk=blob.pk).update(ref_count=actual, updated_at=timezone.now())
+                changed += 1
+        # Referenced blobs without a row (e.g. written before this store existed)
+        StoredBlob.objects.bulk_create([
+            StoredBlob(name=name, ref_count=count, size=_size(name))
+            for name, count in counts.items()
+        ])
+    return changed + len(counts)
+
+
+def _size(name):
+    try:
+        return blob_storage.size(name)
+    except OSError:
+        return 0
+
+
+def collect_garbage(grace=timedelta(hours=1), dry_run=False):
+    """
+    Recount, then delete unreferenced blobs and stray files in the store
+    untouched for longer than `grace` (in-flight uploads are younger).
+    Returns {'recounted', 'blobs', 'files', 'bytes'}.
+    """
+    recounted = 0 if dry_run else rebuild_refcounts()
+    cutoff = timezone.now() - grace
+    unused = StoredBlob.objects.filter(ref_count=0, updated_at__lt=cutoff)
+    if dry_run:
+        unused_names = set(unused.values_list('name', flat=True))
+    else:
+        unused_names = {
+            name for name in unused.values_list('name', flat=True) if delete_if_unused(name, cutoff)
+        }
+
+    known = set(StoredBlob.objects.values_list('name', flat=True)) | set(referenced_names())
+    root = blob_storage.path(BLOB_PREFIX)
+    stray, freed = 0, 0
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, blob_storage.location).replace(os.sep, '/')
+            if name in known or name in unused_names:
+                continue
+            stat = os.stat(path)
+            if stat.st_mtime >= time.time() - grace.total_seconds():
+                continue
+            # Scratch files of crashed uploads, or blobs whose row was never committed
+            stray += 1
+            freed += stat.st_size
+            if not dry_run:
+                os.remove(path)
+    return {'recounted': recounted, 'blobs': len(unused_names), 'files': stray, 'bytes': freed}
@@ -0,0 +1,106 @@
+"""
+Shared cache of course catalog pages (GET courses/) for every role but
+teachers, whose catalog is filtered down to their own courses.
+
+A page is keyed by the catalog generation and its category, search and
+page parameters (plus the site URL, which the pagination and banner links
+carry). Course and Category writes bump the generation (lms.signals), which
+retires every cached page at once. Enrollments only move course counters
+and do not bump it, so enrolled/completed/lesson counts in cached pages can
+lag by up to CATALOG_CACHE_TIMEOUT seconds.
+
+An entry keeps the aggregate its page was built from, so a hit also answers
+If-None-Match (lms.etags) without touching the database.
+
+With read replicas (backend.routers), a page read from a replica right
+after a bump may predate the write, so such pages are not stored for
+DATABASE_REPLICA_PIN_SECONDS (the assumed replication lag) after one.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from backend import routers
+
+GENERATION_KEY = 'catalog:generation'
+SETTLING_KEY = 'catalog:settling'
+# The only query parameters a shared page may depend on
+PARAMS = ('category', 'search', 'page')
+
+
+def _fresh_generation():
+    # Time based, so a re-created key never reuses the number of an evicted one
+    return int(time.time() * 1000)
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, _fresh_generation(), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, _fresh_generation(), timeout=None)
+    if routers.replicas():
+        cache.set(SETTLING_KEY, True, settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def invalidate():
+    # Bump now for readers inside this transaction and again on commit, so a
+    # page built from pre-commit data is never stored under the live generation
+    bump_generation()
+    transaction.on_commit(bump_generation)
+
+
+def cacheable(request):
+    """Whether this catalog request may be answered from the shared cache."""
+    return request.user.role != 'teacher' and set(request.query_params) <= set(PARAMS)
+
+
+def page_key(request, generation):
+    params = urlencode([(name, request.query_params.get(name, '')) for name in PARAMS])
+    site = request.build_absolute_uri('/')
+    digest = hashlib.md5(f'{site}?{params}'.encode(), usedforsecurity=False).hexdigest()
+    return f'catalog:page:g{generation}:{digest}'
+
+
+def get_page(request, generation):
+    """{'stats', 'data'} stored by set_page(), or None."""
+    return cache.get(page_key(request, generation))
+
+
+def set_page(request, generation, stats, data):
+    if routers.current_replica() and cache.get(SETTLING_KEY):
+        return
+    cache.set(page_key(request, generation), {'stats': stats, 'data': data},
+              timeout=settings.CATALOG_CACHE_TIMEOUT)
+
+
+# Async variants for lms.views.course_list_create_async
+
+async def aget_generation():
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, _fresh_generation(), timeout=None)
+        generation = await cache.aget(GENERATION_KEY)
+    return generation
+
+
+async def aget_page(request, generation):
+    return await cache.aget(page_key(request, generation))
+
+
+async def aset_page(request, generation, stats, data):
+    if routers.current_replica() and await cache.aget(SETTLING_KEY):
+        return
+    await cache.aset(page_key(request, generation), {'stats': stats, 'data': data},
+                     timeout=settings.CATALOG_CACHE_TIMEOUT)
@@ -0,0 +1,134 @@
+"""
+Lock-contention stress test for the SQLite profiles (settings.DATABASE_PROFILES),
+used by `manage.py stress_sqlite`.
+
+Writer threads run enrollment-shaped transactions (read the course, insert
+an enrollment, bump the course's counter) while reader threads keep listing
+courses. Every thread opens its own Django connection to a scratch database
+file, as separate workers would, so the profile's init commands, timeout and
+transaction mode all apply.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import DatabaseError
+from django.db.utils import ConnectionHandler
+
+SCHEMA = (
+    'CREATE TABLE course (id INTEGER PRIMARY KEY, title TEXT NOT NULL, total_students INTEGER NOT NULL)',
+    'CREATE TABLE enrollment (id INTEGER PRIMARY KEY, course_id INTEGER NOT NULL REFERENCES course, '
+    'student_id INTEGER NOT NULL)',
+)
+COURSES = 20
+# Alias of the scratch database in the handler from connections_for(); never one of DATABASES
+ALIAS = 'stress'
+
+
+def connections_for(path, profile):
+    """A ConnectionHandler whose ALIAS is the SQLite file at `path`, configured by `profile`."""
+    return ConnectionHandler({
+        # Required by ConnectionHandler; the dummy backend, never connected
+        'default': {},
+        ALIAS: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(path), **profile},
+    })
+
+
+@contextmanager
+def atomic(connection):
+    """What an outermost transaction.atomic() does, for a connection outside django.db.connections."""
+    connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+    try:
+        yield
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        connection.set_autocommit(True)
+
+
+def stress(path, profile, writers=4, readers=4, transactions=50):
+    """
+    Run `writers` threads of `transactions` enrollments each against readers
+    listing courses until the writers are done. Returns {'writes',
+    'write_errors', 'reads', 'read_errors', 'max_write_ms', 'max_read_ms',
+    'seconds', 'consistent'}; errors are "database is locked" failures.
+    """
+    handler = connections_for(path, profile)
+    connection = handler[ALIAS]
+    with connection.cursor() as cursor:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+        cursor.executemany('INSERT INTO course (id, title, total_students) VALUES (%s, %s, 0)',
+                           [(i, f'Course {i}') for i in range(1, COURSES + 1)])
+
+    start_line = threading.Barrier(writers + readers)
+    writers_done = threading.Event()
+    stats = []
+
+    def write(worker):
+        writes, errors, slowest = 0, 0, 0.0
+        conn = handler[ALIAS]
+        start_line.wait()
+        for i in range(transactions):
+            course_id = (worker * transactions + i) % COURSES + 1
+            start = time.perf_counter()
+            try:
+                with atomic(conn), conn.cursor() as cursor:
+                    cursor.execute('SELECT total_students FROM course WHERE id = %s', [course_id])
+                    cursor.fetchone()
+                    cursor.execute('INSERT INTO enrollment (course_id, student_id) VALUES (%s, %s)',
+                                   [course_id, worker * transactions + i])
+                    cursor.execute('UPDATE course SET total_students = total_students + 1 WHERE id = %s',
+                                   [course_id])
+                writes += 1
+            except DatabaseError:
+                errors += 1
+            slowest = max(slowest, time.perf_counter() - start)
+        conn.close()
+        stats.append({'writes': writes, 'write_errors': errors, 'max_write_ms': slowest * 1000})
+
+    def read():
+        reads, errors, slowest = 0, 0, 0.0
+        conn = handler[ALIAS]
+        start_line.wait()
+        while not writers_done.is_set():
+            start = time.perf_counter()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute('SELECT id, title, total_students FROM course ORDER BY id')
+                    cursor.fetchall()
+                    cursor.execute('SELECT COUNT(*) FROM enrollment')
+                    cursor.fetchone()
+                reads += 1
+            except DatabaseError:
+                errors += 1
+            slowest = max(slowest, time.perf_counter() - start)
+        conn.close()
+        stats.append({'reads': reads, 'read_errors': errors, 'max_read_ms': slowest * 1000})
+
+    write_threads = [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+    read_threads = [threading.Thread(target=read) for _ in range(readers)]
+    started = time.perf_counter()
+    for thread in write_threads + read_threads:
+        thread.start()
+    for thread in write_threads:
+        thread.join()
+    writers_done.set()
+    for thread in read_threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    result = {'writes': 0, 'write_errors': 0, 'reads': 0, 'read_errors': 0, 'max_write_ms': 0.0, 'max_read_ms': 0.0}
+    for row in stats:
+        for key, value in row.items():
+            result[key] = max(result[key], value) if key.startswith('max_') else result[key] + value
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT (SELECT COUNT(*) FROM enrollment), (SELECT SUM(total_students) FROM course)')
+        enrolled, counted = cursor.fetchone()
+    connection.close()
+    result['seconds'] = seconds
+    # Every committed enrollment was counted once, and failed ones left nothing behind
+    result['consistent'] = enrolled == counted == result['writes']
+    return result
@@ -0,0 +1,149 @@
+"""
+Materialized enrollment counters: Course.enrolled_count/completed_count/
+lesson_count and InstructorStats.
+
+They follow model saves and deletes through lms.signals. Queryset
+.update() sends no signals: the Course and Enrollment querysets recount the
+rows a bulk edit of the counted fields touched instead (recount()). Raw SQL
+leaves them stale until rebuild_counters() (`manage.py rebuild_counters`)
+recomputes everything. Both send counters_rebuilt.
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Course, Enrollment, InstructorStats, Lesson
+
+# Sent after recount()/rebuild_counters() rewrote counters with queryset updates
+counters_rebuilt = Signal()
+
+
+def enrollment_weight(is_active, is_completed):
+    # (enrolled, completed) contribution of one enrollment row to its course
+    if not is_active:
+        return 0, 0
+    return 1, 1 if is_completed else 0
+
+
+def bump_course(course_id, enrolled=0, completed=0):
+    if not enrolled and not completed:
+        return
+    # Counters show in course lists: move updated_at too (lms.etags)
+    Course.objects.filter(pk=course_id).update(
+        enrolled_count=F('enrolled_count') + enrolled,
+        completed_count=F('completed_count') + completed,
+        updated_at=timezone.now(),
+    )
+
+
+def bump_instructor(instructor_id, courses=0, students=0):
+    if not courses and not students:
+        return
+    stats = InstructorStats.objects.filter(instructor_id=instructor_id)
+    changes = {
+        'total_courses': F('total_courses') + courses,
+        'total_students': F('total_students') + students,
+    }
+    if not stats.update(**changes) and (courses > 0 or students > 0):
+        # First course or student: a concurrent first bump may create the row too
+        InstructorStats.objects.get_or_create(instructor_id=instructor_id)
+        stats.update(**changes)
+
+
+def apply_enrollment_change(course_id, old_state, new_state):
+    """
+    Move the counters of one enrollment from old_state to new_state, each an
+    (is_active, is_completed) pair or None when the row does not exist.
+    """
+    old_enrolled, old_completed = enrollment_weight(*old_state) if old_state else (0, 0)
+    new_enrolled, new_completed = enrollment_weight(*new_state) if new_state else (0, 0)
+    enrolled = new_enrolled - old_enrolled
+    completed = new_completed - old_completed
+    if not enrolled and not completed:
+        return
+
+    bump_course(course_id, enrolled, completed)
+    course = Course.objects.filter(pk=course_id).values('instructor_id', 'is_active').first()
+    if course and course['is_active']:
+        bump_instructor(course['instructor_id'], students=enrolled)
+
+
+def add_enrollments(course_counts):
+    """Account for new active enrollments inserted in bulk ({course_id: n})."""
+    if not course_counts:
+        return
+    for course_id, n in course_counts.items():
+        bump_course(course_id, enrolled=n)
+    courses = Course.objects.filter(pk__in=course_counts, is_active=True).values_list('pk', 'instructor_id')
+    per_instructor = {}
+    for course_id, instructor_id in courses:
+        per_instructor[instructor_id] = per_instructor.get(instructor_id, 0) + course_counts[course_id]
+    for instructor_id, n in per_instructor.items():
+        bump_instructor(instructor_id, students=n)
+
+
+def _count_courses(courses):
+    # One UPDATE with correlated counts, instead of loading every course
+    active = Enrollment.objects.filter(course=OuterRef('pk'), is_active=True)
+    return courses.update(
+        enrolled_count=Coalesce(Subquery(
+            active.values('course').annotate(n=Count('id')).values('n')
+        ), 0),
+        completed_count=Coalesce(Subquery(
+            active.filter(is_completed=True).values('course').annotate(n=Count('id')).values('n')
+        ), 0),
+        lesson_count=Coalesce(Subquery(
+            Lesson.objects.filter(course=OuterRef('pk')).values('course').annotate(n=Count('id')).values('n')
+        ), 0),
+        updated_at=timezone.now(),
+    )
+
+
+def _count_instructors(instructor_ids=None):
+    # Instructors without an active course keep no row
+    courses = Course.objects.filter(is_active=True)
+    rows = InstructorStats.objects.all()
+    if instructor_ids is not None:
+        courses = courses.filter(instructor_id__in=instructor_ids)
+        rows = rows.filter(instructor_id__in=instructor_ids)
+    instructors = courses.values('instructor_id').annotate(
+        courses=Count('id'),
+        students=Sum('enrolled_count'),
+    ).values_list('instructor_id', 'courses', 'students').order_by()
+    stats = [
+        InstructorStats(instructor_id=pk, total_courses=total_courses, total_students=total_students or 0)
+        for pk, total_courses, total_students in instructors
+    ]
+    rows.delete()
+    InstructorStats.objects.bulk_create(stats, batch_size=1000)
+    return len(stats)
+
+
+def recount(course_ids=(), instructor_ids=()):
+    """
+    Recompute the counters of the given courses, then the stats of the given
+    instructors and of those courses' instructors.
+    """
+    with transaction.atomic():
+        instructor_ids = set(instructor_ids)
+        if course_ids:
+            courses = Course.objects.filter(pk__in=course_ids)
+            _count_courses(courses)
+            instructor_ids.update(courses.values_list('instructor_id', flat=True))
+        if instructor_ids:
+            _count_instructors(instructor_ids)
+        counters_rebuilt.send(sender=Course)
+
+
+def rebuild_counters():
+    """
+    Recompute every course counter and instructor stats row from the
+    Enrollment and Lesson tables. Returns (courses, instructors) rows written.
+    """
+    with transaction.atomic():
+        courses = _count_courses(Course.objects.all())
+        instructors = _count_instructors()
+        counters_rebuilt.send(sender=Course)
+    return courses, instructors
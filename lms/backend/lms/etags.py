@@ -0,0 +1,62 @@
+"""
+Conditional GET for the list endpoints (courses, lessons, materials).
+
+A list's ETag comes from one aggregate over the queryset, its row count
+and latest updated_at, plus the query string (page, filters) and the
+response format; no row is fetched or serialized to compute it. A client
+sending a matching If-None-Match gets 304 Not Modified. The count doubles
+as the paginator's COUNT (lms.pagination), so a 200 costs no extra query.
+
+Anything a list shows about a row must therefore move the row's
+updated_at: course counters, banner renditions, category titles and
+instructor names do (lms.counters, lms.progress, lms.renditions,
+lms.signals).
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+
+# Bump when a list's representation changes, so clients drop copies made before
+REPRESENTATION_VERSION = 1
+
+
+def list_stats(queryset):
+    """{'count', 'latest'} of `queryset`: its row count and latest updated_at, in one query."""
+    return queryset.order_by().aggregate(count=Count('pk'), latest=Max('updated_at'))
+
+
+async def alist_stats(queryset):
+    return await queryset.order_by().aaggregate(count=Count('pk'), latest=Max('updated_at'))
+
+
+def etag(stats, request):
+    """ETag of the list described by `stats` (see list_stats()) as `request` asks for it."""
+    renderer = getattr(request, 'accepted_renderer', None)
+    key = '|'.join([
+        str(REPRESENTATION_VERSION),
+        str(stats['count']),
+        stats['latest'].isoformat() if stats['latest'] else '',
+        request.query_params.urlencode(),
+        renderer.format if renderer else 'json',
+    ])
+    return f'W/"{hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()}"'
+
+
+def list_etag(queryset, request):
+    """(ETag, row count) of a list of `queryset`, from one aggregate query."""
+    stats = list_stats(queryset)
+    return etag(stats, request), stats['count']
+
+
+async def alist_etag(queryset, request):
+    stats = await alist_stats(queryset)
+    return etag(stats, request), stats['count']
+
+
+def not_modified(request, current):
+    """A 304 response if the client's copy carries the `current` ETag, else None."""
+    response = get_conditional_response(request, etag=current)
+    if response is not None:
+        response['ETag'] = current
+    return response
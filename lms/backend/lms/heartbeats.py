@@ -0,0 +1,172 @@
+"""
+Write-behind buffer for watch-position heartbeats.
+
+Video players report their position every few seconds. Each worker process
+keeps only the newest position per (student, lesson) in memory and a
+background thread writes the buffer every PROGRESS_FLUSH_INTERVAL seconds
+with one bulk_update (plus one bulk_create for first positions) per batch,
+so a student watching for a minute costs one write instead of one per
+ping. The buffer is also flushed inline once it holds
+PROGRESS_BUFFER_MAX_ENTRIES keys (a failure is logged, not raised to the
+request that filled it), and a final time when the process exits normally
+(gunicorn/uvicorn workers on SIGTERM, runserver on Ctrl-C), with or
+without the flush thread.
+
+Positions are best effort: a killed worker loses at most one interval,
+and another worker's buffer is only visible after its next flush.
+Positions of lessons or students deleted meanwhile are dropped, and a
+position whose write fails FLUSH_ATTEMPTS times in a row is given up.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from .models import Lesson, LessonProgress
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+FLUSH_ATTEMPTS = 3
+
+
+def write_positions(positions):
+    """Write {(student_id, lesson_id): position} in bulk; returns the number of keys."""
+    keys = list(positions)
+    now = timezone.now()
+    for start in range(0, len(keys), BATCH_SIZE):
+        batch = set(keys[start:start + BATCH_SIZE])
+        with transaction.atomic():
+            existing = LessonProgress.objects.filter(
+                student_id__in={student_id for student_id, _ in batch},
+                lesson_id__in={lesson_id for _, lesson_id in batch},
+            ).only('id', 'student_id', 'lesson_id')
+            rows = []
+            for record in existing:
+                key = (record.student_id, record.lesson_id)
+                if key in batch:
+                    record.position, record.updated_at = positions[key], now
+                    rows.append(record)
+                    batch.discard(key)
+            LessonProgress.objects.bulk_update(rows, ['position', 'updated_at'])
+            if batch:
+                # ignore_conflicts does not cover foreign keys: skip lessons and
+                # students deleted while their positions were buffered
+                lesson_ids = set(Lesson.objects.filter(
+                    id__in={lesson_id for _, lesson_id in batch}).values_list('id', flat=True))
+                student_ids = set(User.objects.filter(
+                    id__in={student_id for student_id, _ in batch}).values_list('id', flat=True))
+                batch = {key for key in batch if key[0] in student_ids and key[1] in lesson_ids}
+            # A completion may have created the row meanwhile; ignore_conflicts keeps it
+            LessonProgress.objects.bulk_create([
+                LessonProgress(student_id=student_id, lesson_id=lesson_id, position=positions[student_id, lesson_id])
+                for student_id, lesson_id in batch
+            ], ignore_conflicts=True)
+    return len(keys)
+
+
+class HeartbeatBuffer:
+    """Newest position per (student_id, lesson_id), written behind by a flush thread."""
+
+    def __init__(self):
+        self._positions = {}
+        # Failed writes per key, to give up on positions that never go through
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._registered = False
+
+    def add(self, student_id, lesson_id, position):
+        with self._lock:
+            self._positions[student_id, lesson_id] = position
+            size = len(self._positions)
+        if size >= settings.PROGRESS_BUFFER_MAX_ENTRIES:
+            try:
+                self.flush()
+            except Exception:
+                # Kept for the next flush; not this request's failure
+                logger.exception('Flushing the full progress heartbeat buffer failed')
+        self._start()
+
+    def pending(self, student_id, lesson_id):
+        with self._lock:
+            return self._positions.get((student_id, lesson_id))
+
+    def pop(self, student_id, lesson_id):
+        with self._lock:
+            return self._positions.pop((student_id, lesson_id), None)
+
+    def drain(self):
+        with self._lock:
+            positions, self._positions = self._positions, {}
+        return positions
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of positions written."""
+        positions = self.drain()
+        if not positions:
+            return 0
+        try:
+            written = write_positions(positions)
+        except Exception:
+            # Keep them for the next flush, unless newer positions arrived meanwhile
+            with self._lock:
+                for key, position in positions.items():
+                    attempts = self._attempts.get(key, 0) + 1
+                    if attempts >= FLUSH_ATTEMPTS:
+                        self._attempts.pop(key, None)
+                        logger.warning('Dropping progress heartbeat %s after %s failed writes', key, attempts)
+                        continue
+                    self._attempts[key] = attempts
+                    self._positions.setdefault(key, position)
+            raise
+        if self._attempts:
+            with self._lock:
+                for key in positions:
+                    self._attempts.pop(key, None)
+        return written
+
+    def _start(self):
+        if not self._registered:
+            with self._lock:
+                registered, self._registered = self._registered, True
+            if not registered:
+                # Also without a flush thread: the final flush writes what is left
+                atexit.register(self.stop)
+        interval = settings.PROGRESS_FLUSH_INTERVAL
+        if not interval or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, args=(interval,), name='progress-heartbeat-flush', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self, interval):
+        while not self._stopped.wait(interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Flushing progress heartbeats failed; retrying in %ss', interval)
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        """Stop the flush thread and write what is left (registered with atexit)."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=settings.PROGRESS_FLUSH_INTERVAL)
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Final flush of progress heartbeats failed')
+
+
+buffer = HeartbeatBuffer()
@@ -0,0 +1,63 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from lms import benchmark, seeding
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every API endpoint against a seeded throwaway database, '
+        'record p50/p95 latency and query counts, and fail on regressions'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=float, default=0.2,
+                            help='Dataset scale, as for seed_lms (0.2 = 200 students, 2k enrollments)')
+        # Overrides on top of --size
+        parser.add_argument('--users', type=int, help='Students')
+        parser.add_argument('--courses', type=int)
+        parser.add_argument('--lessons', type=int, help='Lessons per course')
+        parser.add_argument('--enrollments', type=int, help='Enrollments per student')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--baseline', default=str(Path(settings.BASE_DIR) / 'bench_baseline.json'))
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed p95 slowdown as a fraction of the baseline')
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='Write the results as the new baseline instead of comparing')
+
+    def handle(self, *args, **options):
+        plan = seeding.SeedPlan.for_size(
+            options['size'], seed=options['seed'],
+            students=options['users'], courses=options['courses'],
+            lessons_per_course=options['lessons'], enrollments_per_student=options['enrollments'],
+        )
+
+        try:
+            with benchmark.isolated_environment():
+                fixtures = benchmark.seed(plan)
+                results = benchmark.run(fixtures, options['iterations'], options['warmup'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        width = max(len(label) for label in results)
+        for label, row in results.items():
+            self.stdout.write(
+                f"{label:<{width}}  p50 {row['p50_ms']:>9.3f}ms  p95 {row['p95_ms']:>9.3f}ms  {row['queries']:>3} queries"
+            )
+
+        baseline_path = Path(options['baseline'])
+        if options['update_baseline'] or not baseline_path.exists():
+            baseline_path.write_text(json.dumps(results, indent=2, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline_path}'))
+            return
+
+        baseline = json.loads(baseline_path.read_text())
+        regressions = benchmark.compare(results, baseline, options['threshold'])
+        if regressions:
+            raise CommandError('Regressions against baseline:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from lms import benchmark, seeding
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent-request throughput of the async read views under ASGI '
+        'with the DRF views under WSGI, against a seeded throwaway database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=float, default=0.2,
+                            help='Dataset scale, as for seed_lms (0.2 = 200 students, 2k enrollments)')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per path and handler')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at once')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive')
+        plan = seeding.SeedPlan.for_size(options['size'], seed=options['seed'])
+
+        try:
+            # The async views are opt-in (settings.ASGI_URLCONF): measure them whatever the setting
+            with benchmark.isolated_environment(ASGI_URLCONF='backend.asgi_urls'):
+                fixtures = benchmark.seed(plan)
+                results = benchmark.throughput(fixtures, options['requests'], options['concurrency'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        width = max(len(label) for label in results)
+        for label, row in results.items():
+            for mode, stats in row.items():
+                self.stdout.write(
+                    f"{label:<{width}}  {mode}  {stats['rps']:>8.1f} req/s  "
+                    f"p50 {stats['p50_ms']:>9.3f}ms  p95 {stats['p95_ms']:>9.3f}ms"
+                )
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from lms import blobs
+
+
+class Command(BaseCommand):
+    help = 'Recount references to stored course files and delete unreferenced blobs and stray files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-minutes', type=float, default=60,
+                            help='Leave anything touched more recently alone (uploads in flight)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be removed')
+
+    def handle(self, *args, **options):
+        result = blobs.collect_garbage(timedelta(minutes=options['grace_minutes']), options['dry_run'])
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f"Recounted {result['recounted']} blobs. {verb} {result['blobs']} unreferenced blobs "
+            f"and {result['files']} stray files ({result['bytes']} bytes)"
+        ))
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from lms import uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete idle upload sessions, their partial files and leftover chunk scratch files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=float, default=None,
+                            help='Idle hours before a session is dropped (default: UPLOAD_SESSION_TTL)')
+
+    def handle(self, *args, **options):
+        max_age = timedelta(hours=options['max_age']) if options['max_age'] is not None else None
+        sessions, files = uploads.purge(max_age)
+        self.stdout.write(self.style.SUCCESS(f'Removed {sessions} sessions and {files} files'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from lms.counters import rebuild_counters
+from lms.progress import rebuild_progress
+
+
+class Command(BaseCommand):
+    help = 'Rebuild Course enrollment/lesson counters and InstructorStats from the Enrollment and Lesson tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--progress', action='store_true',
+                            help='Also recompute enrollment progress from LessonProgress')
+
+    def handle(self, *args, **options):
+        courses, instructors = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt counters for {courses} courses and {instructors} instructors'
+        ))
+        if options['progress']:
+            enrollments = rebuild_progress()
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt progress for {enrollments} enrollments'))
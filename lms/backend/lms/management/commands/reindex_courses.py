@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from lms import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the course full-text search index (FTS5 on SQLite, tsvector on PostgreSQL)'
+
+    def handle(self, *args, **options):
+        search.reindex()
+        self.stdout.write(self.style.SUCCESS(f'Reindexed course search ({connection.vendor})'))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from lms import renditions
+from lms.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Generate course banner renditions for changed banners (runs until stopped unless --once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Render what is pending now and exit')
+        parser.add_argument('--all', action='store_true',
+                            help='Re-render every banner first, e.g. after changing BANNER_RENDITIONS')
+        parser.add_argument('--batch-size', type=int, default=20, help='Courses claimed per pass')
+        parser.add_argument('--workers', type=int, default=2, help='Concurrent render threads')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when idle')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            flagged = Course.objects.exclude(banner='').exclude(banner__isnull=True).update(banner_pending=True)
+            self.stdout.write(f'{flagged} banners queued')
+
+        while True:
+            try:
+                processed, attached = renditions.render_pending(options['batch_size'], options['workers'])
+            except KeyboardInterrupt:
+                break
+            if processed:
+                self.stdout.write(f'rendered {attached} of {processed} banners')
+                continue
+            if options['once']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from lms import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-load synthetic categories, users, courses, lessons, materials, '
+        'enrollments and Q&A for load testing'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=float, default=1,
+                            help='Scale factor; 1 = 1k students and 10k enrollments, 100 = 1M enrollments')
+        parser.add_argument('--seed', type=int, default=1, help='RNG seed (same seed, same data)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='seed', help='Username/email prefix, to seed more than once')
+        parser.add_argument('--password', default=seeding.DEFAULT_PASSWORD, help='Password for every seeded user')
+        parser.add_argument('--fast', action='store_true',
+                            help='SQLite only: disable fsync while loading (unsafe if the machine crashes)')
+        for key in seeding.SIZES:
+            parser.add_argument(f'--{key.replace("_", "-")}', type=int, dest=key, default=None)
+
+    def handle(self, *args, **options):
+        plan = seeding.SeedPlan.for_size(
+            options['size'],
+            seed=options['seed'], batch_size=options['batch_size'],
+            prefix=options['prefix'], password=options['password'],
+            **{key: options[key] for key in seeding.SIZES},
+        )
+        if options['fast']:
+            seeding.fast_sqlite()
+
+        started = time.perf_counter()
+        counts = seeding.seed(plan, log=lambda message: self.stdout.write(f'  {message}'))
+        elapsed = time.perf_counter() - started
+
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Inserted {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)'
+        ))
@@ -0,0 +1,38 @@
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lms import contention
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent enrollment writers and course-list readers against a scratch '
+        'SQLite file under each database profile and report throughput and lock errors'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', choices=sorted(settings.DATABASE_PROFILES),
+                            help='Profile to run (repeatable; default: all)')
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--transactions', type=int, default=100, help='Enrollments per writer')
+
+    def handle(self, *args, **options):
+        profiles = options['profile'] or sorted(settings.DATABASE_PROFILES)
+        width = max(len(name) for name in profiles)
+        for name in profiles:
+            with tempfile.TemporaryDirectory(prefix='stress-sqlite-') as directory:
+                row = contention.stress(
+                    Path(directory) / 'stress.sqlite3', settings.DATABASE_PROFILES[name],
+                    options['writers'], options['readers'], options['transactions'],
+                )
+            line = (
+                f"{name:<{width}}  {row['writes']:>5} writes ({row['write_errors']} locked, "
+                f"max {row['max_write_ms']:.1f}ms)  {row['reads']:>6} reads ({row['read_errors']} locked, "
+                f"max {row['max_read_ms']:.1f}ms)  {row['writes'] / row['seconds']:>7.1f} writes/s"
+            )
+            clean = row['consistent'] and not row['write_errors'] and not row['read_errors']
+            self.stdout.write(line if clean else self.style.WARNING(line))
@@ -0,0 +1,149 @@
+"""
+Authorized delivery of uploaded course files (Lesson.video, Material.file).
+
+serve() answers conditional requests (ETag/Last-Modified -> 304) and single
+byte ranges (206), so players can seek without re-downloading from the
+start. With settings.MEDIA_OFFLOAD the bytes are left to the front server:
+'x-sendfile' (Apache/lighttpd) or 'x-accel-redirect' (nginx, internal
+location at MEDIA_ACCEL_REDIRECT_PREFIX aliased to MEDIA_ROOT); Django then
+only does the authorization check.
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+BLOCK_SIZE = 64 * 1024
+
+
+def etag_for(size, modified):
+    return f'"{size:x}-{int(modified.timestamp() * 1000):x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single satisfiable range, None to ignore the
+    header (absent, malformed or multi-range: send the whole file), or False
+    when it cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+        if int(last) == 0:
+            return False
+    if start >= size:
+        return False
+    return start, end
+
+
+class RangeReader:
+    """File-like view of `length` bytes of `file` starting at `start`."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+        self.name = file.name
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _range_applies(request, etag, last_modified):
+    """If-Range: honour Range only while the client's copy is still current."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _offload(fieldfile, mode):
+    response = HttpResponse()
+    # The front server sets Content-Type from the file; clear Django's default
+    del response['Content-Type']
+    if mode == 'x-sendfile':
+        response['X-Sendfile'] = fieldfile.path
+    else:
+        prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/')
+        response['X-Accel-Redirect'] = f'{prefix}/{quote(fieldfile.name)}'
+    return response
+
+
+def serve(request, fieldfile, as_attachment=False, filename=None):
+    """
+    Stream `fieldfile` honouring conditional and Range headers; `filename`
+    overrides the name offered to the client.
+    """
+    storage, name = fieldfile.storage, fieldfile.name
+    filename = filename or os.path.basename(name)
+
+    mode = getattr(settings, 'MEDIA_OFFLOAD', '')
+    if mode in ('x-sendfile', 'x-accel-redirect'):
+        # The front server handles Range and conditional headers itself
+        response = _offload(fieldfile, mode)
+        if as_attachment:
+            response['Content-Disposition'] = f"attachment; filename*=utf-8''{quote(filename)}"
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    size = storage.size(name)
+    modified = storage.get_modified_time(name)
+    etag = etag_for(size, modified)
+    # HTTP dates have whole-second resolution
+    last_modified = int(modified.timestamp())
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+
+    byte_range = None
+    if _range_applies(request, etag, last_modified):
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    file = storage.open(name, 'rb')
+    if byte_range:
+        start, end = byte_range
+        response = FileResponse(
+            RangeReader(file, start, end - start + 1), status=206,
+            as_attachment=as_attachment, filename=filename,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        response = FileResponse(file, as_attachment=as_attachment, filename=filename)
+    response.block_size = BLOCK_SIZE
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Access is per user: shared caches must not keep it, browsers revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
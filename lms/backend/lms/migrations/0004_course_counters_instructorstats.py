@@ -0,0 +1,61 @@
+# Generated by Django 6.0 on 2026-10-18 18:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_counters(apps, schema_editor):
+    Course = apps.get_model('lms', 'Course')
+    InstructorStats = apps.get_model('lms', 'InstructorStats')
+
+    courses = list(
+        Course.objects.annotate(
+            active=Count('enrollments', filter=Q(enrollments__is_active=True)),
+            completed=Count('enrollments', filter=Q(enrollments__is_active=True, enrollments__is_completed=True)),
+        ).only('id')
+    )
+    for course in courses:
+        course.enrolled_count = course.active
+        course.completed_count = course.completed
+    Course.objects.bulk_update(courses, ['enrolled_count', 'completed_count'], batch_size=1000)
+
+    instructors = Course.objects.filter(is_active=True).values('instructor_id').annotate(
+        courses=Count('id'),
+        students=Sum('enrolled_count'),
+    ).values_list('instructor_id', 'courses', 'students').order_by()
+    InstructorStats.objects.bulk_create([
+        InstructorStats(instructor_id=pk, total_courses=total_courses, total_students=total_students or 0)
+        for pk, total_courses, total_students in instructors
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0003_alter_enrollment_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstructorStats',
+            fields=[
+                ('instructor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='instructor_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_courses', models.PositiveIntegerField(default=0, help_text='Active courses taught')),
+                ('total_students', models.PositiveIntegerField(default=0, help_text='Active enrollments across active courses')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0, help_text='Active, completed enrollments'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='enrolled_count',
+            field=models.PositiveIntegerField(default=0, help_text='Active enrollments'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
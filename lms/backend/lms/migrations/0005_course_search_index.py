@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-18 18:40
+
+from django.db import migrations
+
+from lms import search
+
+
+def install_search_index(apps, schema_editor):
+    search.install(schema_editor.connection)
+    search.reindex(schema_editor.connection)
+
+
+def uninstall_search_index(apps, schema_editor):
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0004_course_counters_instructorstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 18:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+from lms import search
+
+
+def reinstall_search_index(apps, schema_editor):
+    # SQLite rebuilds lms_course for these fields, dropping the FTS triggers with it
+    search.reindex(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0007_uploadsession'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Reverse order: runs after the fields are removed again
+        migrations.RunPython(migrations.RunPython.noop, reinstall_search_index),
+        migrations.AddField(
+            model_name='course',
+            name='banner_pending',
+            field=models.BooleanField(default=False, help_text='Banner changed; renditions not generated yet'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='banner_renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(condition=models.Q(('banner_pending', True)), fields=['id'], name='course_banner_pending_idx'),
+        ),
+        migrations.RunPython(reinstall_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0010_lesson_progress'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('completing', 'Completing'), ('complete', 'Complete')], default='active', max_length=10),
+        ),
+    ]
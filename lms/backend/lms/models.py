@@ -1,5 +1,8 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
 from accounts.models import User
+from .storage import get_blob_storage
 
 
 class Category(models.Model):
@@ -7,10 +10,33 @@ class Category(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(is_active=True), name='category_active_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
 
+class CourseQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        # Bulk edits send no signals: recount the instructor stats they move
+        if not {'is_active', 'instructor', 'instructor_id'} & kwargs.keys():
+            return super().update(**kwargs)
+        from . import counters
+        with transaction.atomic():
+            courses = list(self.values_list('pk', 'instructor_id'))
+            rows = super().update(**kwargs)
+            counters.recount(
+                course_ids=[pk for pk, _ in courses],
+                instructor_ids={instructor_id for _, instructor_id in courses},
+            )
+        return rows
+
+
 class Course(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField()
@@ -20,21 +46,106 @@ class Course(models.Model):
     is_active = models.BooleanField(default=True)
     category = models.ForeignKey(Category,on_delete=models.CASCADE,related_name='courses')
     instructor = models.ForeignKey(User,on_delete=models.CASCADE,related_name='teaching_courses')
+    # Denormalized counters, maintained by lms.signals (rebuild with `manage.py rebuild_counters`)
+    enrolled_count = models.PositiveIntegerField(default=0, help_text="Active enrollments")
+    completed_count = models.PositiveIntegerField(default=0, help_text="Active, completed enrollments")
+    lesson_count = models.PositiveIntegerField(default=0, help_text="Lessons in the course")
+    # Resized banners written by `manage.py render_banners` (lms.renditions):
+    # {'source': banner name, '<rendition>': {'<format>': storage name}}
+    banner_renditions = models.JSONField(default=dict, blank=True)
+    banner_pending = models.BooleanField(default=False, help_text="Banner changed; renditions not generated yet")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Catalog ordering and keyset pagination
+            models.Index(fields=['created_at', 'id'], name='course_created_idx'),
+            models.Index(fields=['category', 'created_at'], name='course_category_created_idx'),
+            # Teacher views: their (active) courses
+            models.Index(fields=['instructor', 'is_active'], name='course_instructor_active_idx'),
+            # Dashboards: active courses only
+            models.Index(fields=['id'], condition=models.Q(is_active=True), name='course_active_idx'),
+            # Rendition worker queue
+            models.Index(fields=['id'], condition=models.Q(banner_pending=True), name='course_banner_pending_idx'),
+        ]
+
+    objects = CourseQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Loaded fields only: lms.signals reads deferred ones from the row before saving
+        loaded = instance.__dict__
+        instance._loaded_state = {name: loaded[name] for name in ('is_active', 'instructor_id') if name in loaded}
+        if 'banner' in loaded:
+            instance._loaded_state['banner'] = _file_name(loaded['banner'])
+        return instance
+
+    COUNTER_FIELDS = ('enrolled_count', 'completed_count', 'lesson_count')
+    RENDITION_FIELDS = ('banner_renditions', 'banner_pending')
+
+    def _banner_changed(self):
+        loaded = getattr(self, '_loaded_state', None)
+        if loaded is not None and 'banner' not in loaded:
+            if 'banner' not in self.__dict__:
+                return False  # deferred and never assigned
+            loaded['banner'] = _file_name(
+                Course.objects.filter(pk=self.pk).values_list('banner', flat=True).first()
+            )
+        if not getattr(self.banner, '_committed', True):
+            return True  # new upload
+        return loaded is None or (self.banner.name or '') != loaded['banner']
+
+    def save(self, *args, **kwargs):
+        banner_changed = self._banner_changed()
+        if banner_changed:
+            self.banner_pending = bool(self.banner)
+            if not self.banner:
+                self.banner_renditions = {}
+        # Never write back counters from a possibly stale instance; they only move through F() updates.
+        # Likewise renditions, which the worker writes, unless the banner itself changed.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = self.COUNTER_FIELDS + (() if banner_changed else self.RENDITION_FIELDS)
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in skipped
+            ]
+        # Counter updates in lms.signals run inside the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_state = {
+            'is_active': self.is_active, 'instructor_id': self.instructor_id, 'banner': self.banner.name or '',
+        }
+
     def __str__(self):
         return self.title
 
 
+def _file_name(value):
+    # Raw column value (str) or a FieldFile, depending on whether it was accessed
+    return getattr(value, 'name', value) or ''
+
+
 class Lesson(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField()
-    video = models.FileField(upload_to='lesson_videos/', null=True, blank=True)
+    video = models.FileField(upload_to='lesson_videos/', storage=get_blob_storage, null=True, blank=True)
     course = models.ForeignKey(Course,on_delete=models.CASCADE,related_name='lessons')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # File field whose blob references lms.signals maintains
+    BLOB_FIELD = 'video'
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # When the field is deferred, lms.signals looks the old name up before saving
+        if cls.BLOB_FIELD in instance.__dict__:
+            instance._loaded_blob = _file_name(instance.__dict__[cls.BLOB_FIELD])
+        return instance
+
     def __str__(self):
         return self.title
 
@@ -42,22 +153,53 @@ class Lesson(models.Model):
 class Material(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField()
-    file = models.FileField(upload_to='materials/', null=True, blank=True)
+    file = models.FileField(upload_to='materials/', storage=get_blob_storage, null=True, blank=True)
     course = models.ForeignKey(Course,on_delete=models.CASCADE,related_name='materials')
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    BLOB_FIELD = 'file'
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # When the field is deferred, lms.signals looks the old name up before saving
+        if cls.BLOB_FIELD in instance.__dict__:
+            instance._loaded_blob = _file_name(instance.__dict__[cls.BLOB_FIELD])
+        return instance
+
     def __str__(self):
         return self.title
 
 
+class EnrollmentQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        # Bulk edits send no signals: recount the courses whose counters they move
+        if not {'is_active', 'is_completed', 'course', 'course_id'} & kwargs.keys():
+            return super().update(**kwargs)
+        from . import counters
+        with transaction.atomic():
+            enrollments = list(self.values_list('pk', 'course_id'))
+            rows = super().update(**kwargs)
+            course_ids = {course_id for _, course_id in enrollments}
+            if {'course', 'course_id'} & kwargs.keys():
+                course_ids.update(Enrollment.objects.filter(
+                    pk__in=[pk for pk, _ in enrollments]
+                ).values_list('course_id', flat=True))
+            counters.recount(course_ids=course_ids)
+        return rows
+
+
 class Enrollment(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollments')
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
     is_active = models.BooleanField(default=True)
     price = models.FloatField()
     progress = models.IntegerField(default=0)
+    # Completed lessons, moved by lms.progress; progress is derived from it and Course.lesson_count
+    completed_lessons = models.PositiveIntegerField(default=0)
     is_completed = models.BooleanField(default=False)
     total_mark = models.FloatField(default=0)
     is_certificate_ready = models.BooleanField(default=False)
@@ -65,11 +207,105 @@ class Enrollment(models.Model):
 
     class Meta:
         unique_together = ['student', 'course']
+        indexes = [
+            models.Index(fields=['student', 'is_active'], name='enrollment_student_active_idx'),
+            models.Index(fields=['course', 'is_active'], name='enrollment_course_active_idx'),
+        ]
+
+    objects = EnrollmentQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Loaded fields only: lms.signals reads deferred ones from the row before saving
+        instance._loaded_state = {
+            name: instance.__dict__[name] for name in ('is_active', 'is_completed', 'course_id')
+            if name in instance.__dict__
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Counter updates in lms.signals run inside the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_state = {
+            'is_active': self.is_active,
+            'is_completed': self.is_completed,
+            'course_id': self.course_id,
+        }
 
     def __str__(self):
         return f"{self.student.username} -> {self.course.title}"
 
 
+class LessonProgress(models.Model):
+    """A student's watch position in and completion of one lesson (see lms.progress)."""
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lesson_progress')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='progress_records')
+    position = models.PositiveIntegerField(default=0, help_text="Watch position in seconds")
+    completed = models.BooleanField(default=False)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['student', 'lesson']
+
+    def __str__(self):
+        return f"{self.student.username} @ {self.lesson.title}"
+
+
+class InstructorStats(models.Model):
+    instructor = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='instructor_stats')
+    total_courses = models.PositiveIntegerField(default=0, help_text="Active courses taught")
+    total_students = models.PositiveIntegerField(default=0, help_text="Active enrollments across active courses")
+
+    def __str__(self):
+        return f"{self.instructor.username} stats"
+
+
+class StoredBlob(models.Model):
+    """
+    A file in the content-addressed store (lms.storage) and how many
+    Lesson/Material rows point at it. The file is deleted with the last
+    reference; `manage.py gc_blobs` recounts and removes leftovers.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
+class UploadSession(models.Model):
+    """A resumable chunked upload into Lesson.video or Material.file (see lms.uploads)."""
+    TARGET_CHOICES = (
+        ('lesson', 'Lesson video'),
+        ('material', 'Material file'),
+    )
+    STATUS_CHOICES = (
+        ('active', 'Active'),
+        ('completing', 'Completing'),
+        ('complete', 'Complete'),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    target = models.CharField(max_length=10, choices=TARGET_CHOICES)
+    object_id = models.PositiveIntegerField(help_text="Lesson or Material receiving the file")
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(help_text="Total bytes expected")
+    received = models.PositiveBigIntegerField(default=0, help_text="Bytes stored so far (next chunk offset)")
+    checksum = models.CharField(max_length=64, blank=True, help_text="SHA-256 hex of the whole file, if given")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+
 class QuestionAnswer(models.Model):
     user = models.ForeignKey(User,on_delete=models.CASCADE,related_name='questions')
     lesson = models.ForeignKey(Lesson,on_delete=models.CASCADE,related_name='questions')
@@ -79,5 +315,11 @@ class QuestionAnswer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Visible questions of a lesson, in posting order
+            models.Index(fields=['lesson', 'id'], condition=models.Q(is_active=True), name='question_lesson_active_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} -> {self.lesson.title}"
@@ -0,0 +1,99 @@
+from django.core.paginator import InvalidPage, Paginator
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class CourseCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the course catalog: seeks on (created_at, id) instead
+    of OFFSET and skips the COUNT(*), so page 500 costs the same as page 1.
+    """
+    ordering = ('created_at', 'id')
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KnownCountMixin:
+    """
+    Set `count` before paginate_queryset() when the view already counted the
+    queryset (lms.etags) and the paginator skips its own COUNT.
+    """
+    count = None
+
+    def django_paginator_class(self, object_list, per_page):
+        paginator = Paginator(object_list, per_page)
+        if self.count is not None:
+            paginator.count = self.count
+        return paginator
+
+
+class CoursePagination(KnownCountMixin, PageNumberPagination):
+    """Page numbers for the course catalog."""
+    page_size = 10
+
+
+class ListPagination(KnownCountMixin, PageNumberPagination):
+    """Bounded pages for the per-course and per-user list endpoints."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class AsyncPaginationMixin:
+    """
+    paginate_queryset() for async views (lms.async_api): the COUNT and the
+    page are fetched through the async ORM, the rest is the DRF paginator.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached property: fill it so nothing below queries
+        if self.count is None:
+            self.count = await queryset.acount()
+        paginator.count = self.count
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        return list(self.page)
+
+
+class AsyncCoursePagination(AsyncPaginationMixin, CoursePagination):
+    pass
+
+
+class AsyncListPagination(AsyncPaginationMixin, ListPagination):
+    pass
+
+
+def stream_json(queryset, serializer_class, chunk_size=1000):
+    """
+    Stream a queryset as one JSON array without materializing it: rows are
+    read with a server-side iterator and serialized `chunk_size` at a time.
+    """
+    encoder = JSONEncoder()
+
+    def chunks():
+        yield '['
+        batch = []
+        first = True
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            batch.append(obj)
+            if len(batch) == chunk_size:
+                yield ('' if first else ',') + encoder.encode(serializer_class(batch, many=True).data)[1:-1]
+                batch, first = [], False
+        if batch:
+            yield ('' if first else ',') + encoder.encode(serializer_class(batch, many=True).data)[1:-1]
+        yield ']'
+
+    return StreamingHttpResponse(chunks(), content_type='application/json')
@@ -0,0 +1,114 @@
+"""
+Lesson-level progress and the enrollment progress derived from it.
+
+LessonProgress holds a student's watch position and completion per lesson.
+Completing a lesson for the first time moves Enrollment.completed_lessons
+by one and derives progress from Course.lesson_count (a counter kept by
+lms.signals), so no request ever counts a course's lessons. is_completed
+is set when the last lesson is completed and not revoked by lessons added
+later.
+
+Watch-position heartbeats go through the write-behind buffer in
+lms.heartbeats rather than a write per ping.
+
+Lesson adds and removes rescale a course's enrollments with queryset
+updates, which send no post_save; progress_rescaled is sent instead.
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Least, NullIf
+from django.dispatch import Signal
+from django.utils import timezone
+
+from . import heartbeats
+from .models import Course, Enrollment, LessonProgress
+
+# Sent after Enrollment progress was rewritten in bulk, with course_id (None
+# when every course was rebuilt)
+progress_rescaled = Signal()
+
+
+def percent(completed, total):
+    return min(completed * 100 // total, 100) if total else 0
+
+
+def pending_position(student_id, lesson_id):
+    """The newest buffered heartbeat position not written yet, or None."""
+    return heartbeats.buffer.pending(student_id, lesson_id)
+
+
+def heartbeat(student_id, lesson_id, position):
+    heartbeats.buffer.add(student_id, lesson_id, position)
+
+
+def complete(enrollment_id, lesson_id, position=None):
+    """
+    Mark a lesson completed for the enrollment's student. Only the first
+    completion moves the enrollment; returns the enrollment.
+    """
+    with transaction.atomic():
+        # The enrollment lock serializes completions of the same student in the course
+        enrollment = Enrollment.objects.select_for_update(of=('self',)).annotate(
+            lesson_total=F('course__lesson_count')
+        ).get(pk=enrollment_id)
+        # Written here instead of by the buffer
+        buffered = heartbeats.buffer.pop(enrollment.student_id, lesson_id)
+        if position is None:
+            position = buffered
+        now = timezone.now()
+        record, created = LessonProgress.objects.get_or_create(
+            student_id=enrollment.student_id, lesson_id=lesson_id,
+            defaults={'completed': True, 'completed_at': now, 'position': position or 0},
+        )
+        first = created or not record.completed
+        if not created and (first or position is not None):
+            record.completed, record.completed_at = True, record.completed_at or now
+            if position is not None:
+                record.position = position
+            record.save(update_fields=['completed', 'completed_at', 'position', 'updated_at'])
+
+        if first:
+            enrollment.completed_lessons += 1
+            enrollment.progress = percent(enrollment.completed_lessons, enrollment.lesson_total)
+            enrollment.is_completed = enrollment.is_completed or enrollment.completed_lessons >= enrollment.lesson_total
+            # Completion counters follow through the Enrollment signals
+            enrollment.save(update_fields=['completed_lessons', 'progress', 'is_completed'])
+    return enrollment
+
+
+def _progress_expression():
+    # completed_lessons as a percentage of the course's lesson count, 0 for empty courses
+    total = Course.objects.filter(pk=OuterRef('course_id')).values('lesson_count')
+    return Coalesce(Least(F('completed_lessons') * 100 / NullIf(Subquery(total), 0), 100), 0)
+
+
+def lessons_changed(course_id, delta):
+    """Move the course's lesson count and rescale its enrollments' progress."""
+    Course.objects.filter(pk=course_id).update(lesson_count=F('lesson_count') + delta, updated_at=timezone.now())
+    Enrollment.objects.filter(course_id=course_id).update(progress=_progress_expression())
+    progress_rescaled.send(sender=Enrollment, course_id=course_id)
+
+
+def lesson_removed(lesson):
+    """Forget a lesson about to be deleted (its LessonProgress rows go with it)."""
+    completed_by = LessonProgress.objects.filter(lesson_id=lesson.pk, completed=True).values('student_id')
+    Enrollment.objects.filter(
+        course_id=lesson.course_id, student_id__in=completed_by, completed_lessons__gt=0
+    ).update(completed_lessons=F('completed_lessons') - 1)
+    lessons_changed(lesson.course_id, -1)
+
+
+def rebuild_progress():
+    """
+    Recompute Enrollment.completed_lessons and progress from LessonProgress
+    (run after rebuild_counters, which recounts Course.lesson_count).
+    Returns the number of enrollments updated.
+    """
+    completed = LessonProgress.objects.filter(
+        student_id=OuterRef('student_id'), lesson__course_id=OuterRef('course_id'), completed=True
+    ).values('student_id').annotate(n=Count('id')).values('n')
+    with transaction.atomic():
+        updated = Enrollment.objects.update(completed_lessons=Coalesce(Subquery(completed), 0))
+        Enrollment.objects.update(progress=_progress_expression())
+        progress_rescaled.send(sender=Enrollment, course_id=None)
+    return updated
@@ -0,0 +1,149 @@
+"""
+Pre-generated course banner renditions.
+
+Saving a course with a new banner only flags it (Course.banner_pending).
+`manage.py render_banners` picks flagged courses up, renders every size in
+settings.BANNER_RENDITIONS as WebP and JPEG with Pillow, stores them next
+to the original (course_banners/<name>.<rendition>.<ext>) and records their
+names in Course.banner_renditions. Catalog cards then load a few KB
+thumbnail instead of the uploaded original.
+"""
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from . import catalog_cache
+from .models import Course
+
+logger = logging.getLogger(__name__)
+
+# format key -> (Pillow format, file extension)
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+
+def _encode(image, fmt):
+    pillow_format, _ = FORMATS[fmt]
+    if pillow_format == 'JPEG' and image.mode != 'RGB':
+        # JPEG has no alpha: flatten onto white
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, pillow_format, quality=settings.BANNER_RENDITION_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def render(source):
+    """{rendition: {format: bytes}} for an open image file."""
+    specs = settings.BANNER_RENDITIONS
+    with Image.open(source) as image:
+        # Let the JPEG decoder downscale while decoding when the original is huge
+        largest = max((spec['size'] for spec in specs.values()), key=lambda size: size[0] * size[1])
+        image.draft('RGB', largest)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+        output = {}
+        for name, spec in specs.items():
+            # Cover the target box, cropping around the centre like a CSS background
+            fitted = ImageOps.fit(image, spec['size'], Image.Resampling.LANCZOS)
+            output[name] = {fmt: _encode(fitted, fmt) for fmt in FORMATS}
+        return output
+
+
+def _render_banner(course):
+    """Rendered bytes for the course's banner, or the exception that prevented it."""
+    try:
+        with course.banner.open('rb') as f:
+            return render(f)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+        return e
+
+
+def _attach(course, rendered):
+    """Store renditions and record them on the course; returns True if attached."""
+    source = course.banner.name
+    if isinstance(rendered, Exception):
+        logger.warning('Cannot render banner %s of course %s: %s', source, course.pk, rendered)
+        Course.objects.filter(pk=course.pk, banner=source).update(
+            banner_pending=False, banner_renditions={'source': source, 'error': str(rendered)},
+            updated_at=timezone.now(),
+        )
+        return False
+
+    storage = course.banner.storage
+    stem = os.path.splitext(source)[0]
+    renditions = {'source': source}
+    for name, formats in rendered.items():
+        renditions[name] = {
+            fmt: storage.save(f'{stem}.{name}.{FORMATS[fmt][1]}', ContentFile(data))
+            for fmt, data in formats.items()
+        }
+
+    # Only attach if the banner was not replaced meanwhile; that banner has its own pass coming
+    attached = Course.objects.filter(pk=course.pk, banner=source).update(
+        banner_renditions=renditions, banner_pending=False, updated_at=timezone.now()
+    )
+    if attached:
+        catalog_cache.invalidate()
+    stale = renditions if not attached else course.banner_renditions
+    for formats in stale.values():
+        if isinstance(formats, dict):
+            for path in formats.values():
+                storage.delete(path)
+    return bool(attached)
+
+
+def render_pending(batch_size=20, workers=2):
+    """Render up to `batch_size` flagged courses; returns (processed, attached)."""
+    courses = list(
+        Course.objects.filter(banner_pending=True).order_by('id')
+        .only('id', 'banner', 'banner_renditions')[:batch_size]
+    )
+    if not courses:
+        return 0, 0
+    without_banner = [course.pk for course in courses if not course.banner]
+    Course.objects.filter(pk__in=without_banner).update(banner_pending=False, updated_at=timezone.now())
+    courses = [course for course in courses if course.banner]
+
+    # Only decoding, resizing and encoding run in the pool (Pillow releases the
+    # GIL there); storage writes and updates stay on this thread's connection
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_banner, courses))
+    else:
+        results = [_render_banner(course) for course in courses]
+    attached = sum(_attach(course, rendered) for course, rendered in zip(courses, results))
+    return len(courses) + len(without_banner), attached
+
+
+def rendition_urls(course, request=None):
+    """
+    {rendition: {'width', 'height', format: url}} for the course's current
+    banner, or None while they are pending (clients fall back to `banner`).
+    """
+    renditions = course.banner_renditions or {}
+    if not course.banner or renditions.get('source') != course.banner.name:
+        return None
+    storage = course.banner.storage
+    urls = {}
+    for name, spec in settings.BANNER_RENDITIONS.items():
+        formats = renditions.get(name)
+        if not formats:
+            continue
+        width, height = spec['size']
+        urls[name] = {'width': width, 'height': height}
+        for fmt, path in formats.items():
+            url = storage.url(path)
+            urls[name][fmt] = request.build_absolute_uri(url) if request else url
+    return urls or None
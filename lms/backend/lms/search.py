@@ -0,0 +1,161 @@
+"""
+Full-text search over the course catalog.
+
+SQLite keeps an FTS5 external-content table (lms_course_fts) in sync with
+lms_course through triggers; PostgreSQL keeps a generated, GIN-indexed
+tsvector column on lms_course. Other backends fall back to icontains.
+SQLite drops the triggers with the old table whenever a migration rebuilds
+lms_course (AddField/AlterField on Course); repair_after_migrate(), run on
+post_migrate (lms.apps), puts back whatever is missing and rebuilds the index.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'lms_course_fts'
+SQLITE_OBJECTS = {FTS_TABLE, f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'}
+POSTGRES_OBJECTS = {'search_vector', 'lms_course_search_vector_idx'}
+# The migration that creates the index; before it (or migrated back past it) there is none to repair
+INSTALLED_BY = ('lms', '0005_course_search_index')
+
+SQLITE_INSTALL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='lms_course', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON lms_course BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON lms_course BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON lms_course BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+SQLITE_UNINSTALL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRES_INSTALL = [
+    """ALTER TABLE lms_course ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED""",
+    "CREATE INDEX IF NOT EXISTS lms_course_search_vector_idx ON lms_course USING GIN (search_vector)",
+]
+
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS lms_course_search_vector_idx",
+    "ALTER TABLE lms_course DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def install(conn=connection):
+    """Create the search index for the current backend (idempotent)."""
+    statements = {'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRES_INSTALL}.get(conn.vendor, [])
+    with conn.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def uninstall(conn=connection):
+    statements = {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL}.get(conn.vendor, [])
+    with conn.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def reindex(conn=connection):
+    """Recreate missing index objects and rebuild the index from lms_course."""
+    install(conn)
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        elif conn.vendor == 'postgresql':
+            cursor.execute("REINDEX INDEX lms_course_search_vector_idx")
+
+
+def missing(conn=connection):
+    """Names of the index objects (table, triggers, column, index) absent from the database."""
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            expected = SQLITE_OBJECTS
+            cursor.execute(
+                f"SELECT name FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(expected))})",
+                sorted(expected),
+            )
+        elif conn.vendor == 'postgresql':
+            expected = POSTGRES_OBJECTS
+            cursor.execute(
+                """SELECT column_name FROM information_schema.columns
+                   WHERE table_schema = current_schema() AND table_name = 'lms_course' AND column_name = %s
+                   UNION SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND indexname = %s""",
+                ['search_vector', 'lms_course_search_vector_idx'],
+            )
+        else:
+            return set()
+        return expected - {name for name, in cursor.fetchall()}
+
+
+def repair_after_migrate(using=DEFAULT_DB_ALIAS, verbosity=1, **kwargs):
+    """
+    post_migrate handler: reinstall and rebuild the index if a migration
+    dropped part of it. Returns the names that were missing.
+    """
+    conn = connections[using]
+    if INSTALLED_BY not in MigrationRecorder(conn).applied_migrations():
+        return set()
+    gone = missing(conn)
+    if gone:
+        reindex(conn)
+        if verbosity >= 1:
+            print(f"Reinstalled the course search index ({', '.join(sorted(gone))} missing)")
+    return gone
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def search_courses(queryset, query):
+    """
+    Filter a Course queryset to rows matching `query`, best match first.
+    Every term must match; the last one also matches as a prefix.
+    """
+    terms = _terms(query)
+    vendor = connection.vendor
+
+    if not terms or vendor not in ('sqlite', 'postgresql'):
+        return queryset.filter(Q(title__icontains=query) | Q(description__icontains=query))
+
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{term}"' for term in terms[:-1])
+        match = f'{match} "{terms[-1]}"*'.strip()
+        matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        # bm25 is lower-is-better; weight title matches over description. Only
+        # computed for matching rows, each a rowid lookup in the index
+        rank = RawSQL(
+            f'SELECT bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = lms_course.id',
+            [match], output_field=FloatField(),
+        )
+        return queryset.filter(id__in=matches).annotate(search_rank=rank).order_by('search_rank', 'id')
+
+    tsquery = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+    return queryset.filter(RawSQL(
+        "lms_course.search_vector @@ to_tsquery('english', %s)", [tsquery], output_field=BooleanField()
+    )).annotate(search_rank=RawSQL(
+        "ts_rank(lms_course.search_vector, to_tsquery('english', %s))", [tsquery], output_field=FloatField()
+    )).order_by('-search_rank', 'id')
@@ -0,0 +1,214 @@
+"""
+Fast synthetic data generation for load testing (`manage.py seed_lms`).
+
+Everything is written with bulk_create in fixed-size batches inside one
+transaction per table, every user shares one pre-computed password hash, and
+all randomness comes from a seeded RNG so runs are reproducible. Enrollments,
+the largest table by far, skip model instances and go in as executemany()
+tuples.
+"""
+import random
+from dataclasses import dataclass
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from .counters import rebuild_counters
+from .models import Category, Course, Enrollment, Lesson, Material, QuestionAnswer
+from .progress import percent
+
+DEFAULT_PASSWORD = 'seed-pass-123'
+
+# Rows per unit of --size: 10k enrollments each, so size 100 = 1M enrollments
+SIZES = {
+    'categories': 10,
+    'admins': 2,
+    'teachers': 20,
+    'students': 1000,
+    'courses': 100,
+    'lessons_per_course': 8,
+    'materials_per_course': 3,
+    'enrollments_per_student': 10,
+    'questions_per_course': 5,
+}
+
+
+@dataclass
+class SeedPlan:
+    categories: int = 10
+    admins: int = 2
+    teachers: int = 20
+    students: int = 1000
+    courses: int = 100
+    lessons_per_course: int = 8
+    materials_per_course: int = 3
+    enrollments_per_student: int = 10
+    questions_per_course: int = 5
+    seed: int = 1
+    batch_size: int = 5000
+    password: str = DEFAULT_PASSWORD
+    prefix: str = 'seed'
+
+    @classmethod
+    def for_size(cls, size, **overrides):
+        """Scale entity counts linearly; per-course and per-student ratios stay fixed."""
+        scaled = {
+            key: value if key.endswith(('_per_course', '_per_student')) else max(int(value * size), 1)
+            for key, value in SIZES.items()
+        }
+        scaled.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**scaled)
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _bulk(model, rows, batch_size):
+    total = 0
+    with transaction.atomic():
+        for batch in _batched(rows, batch_size):
+            model.objects.bulk_create(batch, batch_size=batch_size)
+            total += len(batch)
+    return total
+
+
+def _insert_tuples(model, fields, rows, batch_size):
+    """
+    executemany() plain tuples straight into the table. Used for the largest
+    table, where building a model instance per row costs more than the insert.
+    """
+    opts = model._meta
+    columns = ', '.join(connection.ops.quote_name(opts.get_field(name).column) for name in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    sql = f'INSERT INTO {connection.ops.quote_name(opts.db_table)} ({columns}) VALUES ({placeholders})'
+    total = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for batch in _batched(rows, batch_size):
+            cursor.executemany(sql, batch)
+            total += len(batch)
+    return total
+
+
+def _id_range(model, before):
+    """Ids of the rows inserted after `before` (bulk_create does not return pks everywhere)."""
+    return list(model.objects.filter(pk__gt=before).order_by('pk').values_list('pk', flat=True))
+
+
+def _max_pk(model):
+    return model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def seed(plan, log=None):
+    """Populate the database according to `plan`; returns {table: rows inserted}."""
+    log = log or (lambda message: None)
+    rng = random.Random(plan.seed)
+    size = plan.batch_size
+    counts = {}
+
+    # One hash for every account: hashing per user would dominate the run
+    password = make_password(plan.password)
+    start = _max_pk(User)
+
+    def users(role, n):
+        return (
+            User(username=f'{plan.prefix}-{role}{i}', email=f'{role}{i}@{plan.prefix}.test',
+                 role=role, password=password)
+            for i in range(n)
+        )
+    for role, n in (('admin', plan.admins), ('teacher', plan.teachers), ('student', plan.students)):
+        counts[f'{role}s'] = _bulk(User, users(role, n), size)
+        log(f'{role}s: {n}')
+    user_ids = _id_range(User, start)
+    teacher_ids = user_ids[plan.admins:plan.admins + plan.teachers]
+    student_ids = user_ids[plan.admins + plan.teachers:]
+
+    start = _max_pk(Category)
+    counts['categories'] = _bulk(
+        Category, (Category(title=f'{plan.prefix.title()} category {i}') for i in range(plan.categories)), size
+    )
+    category_ids = _id_range(Category, start)
+
+    start = _max_pk(Course)
+    counts['courses'] = _bulk(Course, (
+        Course(
+            title=f'Course {i}',
+            description=f'Synthetic course {i} on topic {rng.randint(1, 500)} for level {rng.randint(1, 5)}',
+            price=rng.choice([0, 9.99, 19.99, 49.99, 99.99]),
+            duration=rng.randint(1, 60),
+            category_id=category_ids[i % len(category_ids)],
+            instructor_id=teacher_ids[i % len(teacher_ids)],
+        )
+        for i in range(plan.courses)
+    ), size)
+    course_ids = _id_range(Course, start)
+    log(f'courses: {len(course_ids)}')
+
+    start = _max_pk(Lesson)
+    counts['lessons'] = _bulk(Lesson, (
+        Lesson(title=f'Lesson {j + 1}', description='Synthetic lesson', course_id=course_id)
+        for course_id in course_ids for j in range(plan.lessons_per_course)
+    ), size)
+    lesson_ids = _id_range(Lesson, start)
+    counts['materials'] = _bulk(Material, (
+        Material(title=f'Material {j + 1}', description='Synthetic material', course_id=course_id)
+        for course_id in course_ids for j in range(plan.materials_per_course)
+    ), size)
+    log(f'lessons: {counts["lessons"]}, materials: {counts["materials"]}')
+
+    # Distinct courses per student, so (student, course) stays unique
+    per_student = min(plan.enrollments_per_student, len(course_ids))
+
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+
+    def enrollments():
+        for student_id in student_ids:
+            for course_id in rng.sample(course_ids, per_student):
+                completed = rng.random() < 0.2
+                done = lessons if completed else rng.randint(0, max(lessons - 1, 0))
+                yield (student_id, course_id, True, 10.0, percent(done, lessons), done, completed, 0.0, False, now)
+    lessons = plan.lessons_per_course
+    counts['enrollments'] = _insert_tuples(Enrollment, [
+        'student', 'course', 'is_active', 'price', 'progress', 'completed_lessons',
+        'is_completed', 'total_mark', 'is_certificate_ready', 'created_at',
+    ], enrollments(), size)
+    log(f'enrollments: {counts["enrollments"]}')
+
+    lessons_per_course = max(plan.lessons_per_course, 1)
+
+    def questions():
+        if not lesson_ids:
+            return
+        for index in range(len(course_ids) * plan.questions_per_course):
+            course_index = index // max(plan.questions_per_course, 1)
+            lesson_index = course_index * lessons_per_course + rng.randrange(lessons_per_course)
+            yield QuestionAnswer(
+                user_id=rng.choice(student_ids), lesson_id=lesson_ids[min(lesson_index, len(lesson_ids) - 1)],
+                description=f'Synthetic question {index}',
+            )
+    counts['questions'] = _bulk(QuestionAnswer, questions(), size)
+    log(f'questions: {counts["questions"]}')
+
+    # bulk_create skips the counter signals; recompute them once at the end
+    rebuild_counters()
+    log('counters rebuilt')
+    return counts
+
+
+def fast_sqlite(conn=connection):
+    """Trade durability for load speed for the rest of this connection (SQLite only)."""
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous = OFF')
+        cursor.execute('PRAGMA temp_store = MEMORY')
+        cursor.execute('PRAGMA cache_size = -200000')
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import *
+from .renditions import rendition_urls
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -11,10 +12,15 @@ class CategorySerializer(serializers.ModelSerializer):
 class CourseSerializer(serializers.ModelSerializer):
     instructor_name = serializers.CharField(source='instructor.username', read_only=True)
     category_title = serializers.CharField(source='category.title', read_only=True)
+    banner_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Course
         fields = '__all__'
+        read_only_fields = ['enrolled_count', 'completed_count', 'lesson_count', 'banner_pending']
+
+    def get_banner_renditions(self, course):
+        return rendition_urls(course, self.context.get('request'))
 
 class LessonSerializer(serializers.ModelSerializer):
     class Meta:
@@ -37,7 +43,31 @@ class EnrollmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Enrollment
         fields = '__all__'
-        read_only_fields = ['student', 'is_active', 'progress', 'is_completed', 'total_mark', 'is_certificate_ready']
+        read_only_fields = [
+            'student', 'is_active', 'progress', 'completed_lessons', 'is_completed', 'total_mark',
+            'is_certificate_ready',
+        ]
+
+
+class BulkEnrollmentPriceSerializer(serializers.Serializer):
+    # Admin override of the course price for every enrollment of a bulk request
+    price = serializers.FloatField(required=False, allow_null=True)
+
+
+class LessonProgressSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LessonProgress
+        fields = ['lesson', 'position', 'completed', 'completed_at', 'updated_at']
+
+
+class LessonProgressUpdateSerializer(serializers.Serializer):
+    position = serializers.IntegerField(min_value=0, required=False)
+    completed = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, data):
+        if 'position' not in data and not data['completed']:
+            raise serializers.ValidationError('Send a position and/or completed=true')
+        return data
 
 
 class QuestionAnswerSerializer(serializers.ModelSerializer):
@@ -47,4 +77,12 @@ class QuestionAnswerSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuestionAnswer
         fields = '__all__'
-        read_only_fields = ['user']
\ No newline at end of file
+        read_only_fields = ['user']
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    checksum = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False, allow_blank=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'target', 'object_id', 'filename', 'size', 'checksum', 'received', 'status', 'created_at']
+        read_only_fields = ['received', 'status']
@@ -0,0 +1,186 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import blobs, catalog_cache, counters, progress
+from .models import Category, Course, Enrollment, Lesson, Material
+
+# Sent after Enrollment rows are bulk-inserted (no post_save is sent for them),
+# with course_counts={course_id: rows created}. Counters are already updated.
+enrollments_bulk_created = Signal()
+
+
+def _deleting_courses(origin):
+    # The delete started from courses (an instance or a queryset), so every
+    # enrollment it cascades to goes with its course
+    return getattr(origin, 'model', type(origin)) is Course
+
+
+def _load_state(sender, instance, fields):
+    # Read the stored row when from_db() left no complete snapshot: the
+    # instance was built by hand, or loaded with some of these fields deferred
+    loaded = getattr(instance, '_loaded_state', None)
+    if instance.pk and not instance._state.adding and (loaded is None or not set(fields) <= loaded.keys()):
+        instance._loaded_state = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+# Enrollment -> Course / InstructorStats counters
+
+@receiver(pre_save, sender=Enrollment)
+@receiver(pre_delete, sender=Enrollment)
+def enrollment_load_state(sender, instance, **kwargs):
+    _load_state(sender, instance, ('is_active', 'is_completed', 'course_id'))
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, created, **kwargs):
+    old = None if created else getattr(instance, '_loaded_state', None)
+    new_state = (instance.is_active, instance.is_completed)
+
+    if old and old['course_id'] != instance.course_id:
+        counters.apply_enrollment_change(old['course_id'], (old['is_active'], old['is_completed']), None)
+        old = None
+
+    old_state = (old['is_active'], old['is_completed']) if old else None
+    counters.apply_enrollment_change(instance.course_id, old_state, new_state)
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrollment_deleted(sender, instance, origin=None, **kwargs):
+    if _deleting_courses(origin):
+        # Discounted once per course instead (course_deleting)
+        return
+    old = getattr(instance, '_loaded_state', None) or {
+        'is_active': instance.is_active,
+        'is_completed': instance.is_completed,
+        'course_id': instance.course_id,
+    }
+    counters.apply_enrollment_change(old['course_id'], (old['is_active'], old['is_completed']), None)
+
+
+# Course -> InstructorStats
+
+@receiver(pre_save, sender=Course)
+@receiver(pre_delete, sender=Course)
+def course_load_state(sender, instance, **kwargs):
+    _load_state(sender, instance, ('is_active', 'instructor_id'))
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, created, **kwargs):
+    old = None if created else getattr(instance, '_loaded_state', None)
+    old_key = (old['is_active'], old['instructor_id']) if old else (False, None)
+    new_key = (instance.is_active, instance.instructor_id)
+    if old_key == new_key:
+        return
+
+    # The in-memory counter may be stale; read the committed one
+    enrolled = 0
+    if not created:
+        enrolled = Course.objects.filter(pk=instance.pk).values_list('enrolled_count', flat=True).first() or 0
+    if old_key[0]:
+        counters.bump_instructor(old_key[1], courses=-1, students=-enrolled)
+    if new_key[0]:
+        counters.bump_instructor(new_key[1], courses=1, students=enrolled)
+
+
+@receiver(pre_delete, sender=Course)
+def course_deleting(sender, instance, origin=None, **kwargs):
+    if _deleting_courses(origin):
+        # Its enrollments skip their own discount: take the committed total before they go
+        instance._deleted_students = Course.objects.filter(pk=instance.pk).values_list(
+            'enrolled_count', flat=True
+        ).first() or 0
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, **kwargs):
+    # Enrollments are cascaded before the course row goes, and discounted
+    # either one by one or, for course deletes, here
+    old = getattr(instance, '_loaded_state', None) or {
+        'is_active': instance.is_active,
+        'instructor_id': instance.instructor_id,
+    }
+    if old['is_active']:
+        counters.bump_instructor(
+            old['instructor_id'], courses=-1, students=-getattr(instance, '_deleted_students', 0)
+        )
+
+
+# Category title / instructor name -> Course.updated_at: both show in course
+# lists, whose ETags only look at the courses' own rows (lms.etags)
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    if not created:
+        Course.objects.filter(category=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def instructor_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    # Unknown when the instance wasn't loaded with its username: assume renamed
+    loaded = getattr(instance, '_loaded_username', None)
+    if loaded is not None and loaded == instance.username:
+        return
+    if Course.objects.filter(instructor_id=instance.pk).update(updated_at=timezone.now()):
+        catalog_cache.invalidate()
+    instance._loaded_username = instance.username
+
+
+# Course / Category -> shared catalog pages
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def catalog_changed(sender, **kwargs):
+    catalog_cache.invalidate()
+
+
+# Lesson -> Course.lesson_count and enrollment progress
+
+@receiver(post_save, sender=Lesson)
+def lesson_saved(sender, instance, created, **kwargs):
+    if created:
+        progress.lessons_changed(instance.course_id, 1)
+
+
+@receiver(pre_delete, sender=Lesson)
+def lesson_deleting(sender, instance, origin=None, **kwargs):
+    # A delete that started elsewhere reached the lesson through its course
+    # (its only foreign key): the course and its enrollments go too
+    if origin is not None and getattr(origin, 'model', type(origin)) is not Lesson:
+        return
+    # Before the cascade removes the lesson's LessonProgress rows
+    progress.lesson_removed(instance)
+
+
+# Lesson.video / Material.file -> StoredBlob reference counts
+
+@receiver(pre_save, sender=Lesson)
+@receiver(pre_save, sender=Material)
+def blob_load_state(sender, instance, **kwargs):
+    if instance.pk and not instance._state.adding and not hasattr(instance, '_loaded_blob'):
+        instance._loaded_blob = sender.objects.filter(pk=instance.pk).values_list(
+            sender.BLOB_FIELD, flat=True
+        ).first() or ''
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=Material)
+def blob_saved(sender, instance, created, **kwargs):
+    old = '' if created else getattr(instance, '_loaded_blob', '')
+    new = getattr(instance, sender.BLOB_FIELD).name or ''
+    if old != new:
+        blobs.retain(new)
+        blobs.release(old)
+    instance._loaded_blob = new
+
+
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=Material)
+def blob_deleted(sender, instance, **kwargs):
+    blobs.release(getattr(instance, '_loaded_blob', None) or getattr(instance, sender.BLOB_FIELD).name)
@@ -0,0 +1,101 @@
+"""
+Content-addressed, deduplicating storage for course files (Lesson.video,
+Material.file).
+
+Every file is stored once under its SHA-256: blobs/ab/cd/<digest><ext>.
+Uploads are hashed while they are streamed to a scratch file next to the
+blob tree and then renamed into place, or dropped when that digest already
+exists. Many rows can therefore point at one blob; StoredBlob keeps a
+reference count per blob (maintained by lms.signals), the last release
+deletes the file, and `manage.py gc_blobs` recounts and collects orphans.
+A blob file without a row (not yet counted, or being deleted) is written
+again rather than shared.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+BLOB_PREFIX = 'blobs'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(f'{BLOB_PREFIX}/')
+
+
+def blob_name(digest, ext):
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext.lower()}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage whose saved name depends only on the content (and the
+    extension, kept so the type can still be guessed from the name). Files
+    saved before this storage was used keep their names and stay readable.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the digest in _save(); equal names mean equal content
+        return name
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1]
+        scratch_dir = self.path(BLOB_PREFIX)
+        os.makedirs(scratch_dir, exist_ok=True)
+
+        if hasattr(content, 'temporary_file_path'):
+            # Already on disk (large uploads, assembled chunked uploads): hash it
+            # in place, or reuse the digest the caller already computed
+            source = content.temporary_file_path()
+            digest = getattr(content, 'sha256', None) or file_sha256(source)
+        else:
+            digest, source = _spool(content, scratch_dir)
+
+        name = blob_name(digest, ext)
+        full_path = self.path(name)
+        # Imported here: lms.blobs needs the models, which need this module
+        from .blobs import touch
+        # Only a blob with a row is shared; touching it keeps a concurrent
+        # release from deleting it before this reference is counted
+        if touch(name) and os.path.exists(full_path):
+            # Deduplicated: the content is already stored
+            os.remove(source)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            file_move_safe(source, full_path, allow_overwrite=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+
+def _spool(content, directory):
+    """Stream `content` into a scratch file in `directory`, hashing it on the way."""
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as scratch:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                scratch.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return digest.hexdigest(), path
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+blob_storage = ContentAddressedStorage()
+
+
+def get_blob_storage():
+    # Referenced by the model fields (and their migrations) as a callable
+    return blob_storage
@@ -1,3 +1,1557 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import OperationalError, connection, connections, router
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from PIL import Image
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from accounts.authentication import tokens_for_user, user_cache
+from backend.middleware import ReplicaRoutingMiddleware
+from dashboard import views as dashboard_views
+from accounts.models import User
+from . import (
+    benchmark, blobs, catalog_cache, contention, counters, heartbeats, progress, renditions, search, seeding, storage,
+    uploads, views,
+)
+from .counters import rebuild_counters
+from .management.commands import bench_api
+from .pagination import CourseCursorPagination, ListPagination
+from .models import (
+    Category, Course, Enrollment, InstructorStats, Lesson, LessonProgress, Material, QuestionAnswer,
+    StoredBlob, UploadSession,
+)
+
+
+class EnrollmentCounterTests(TestCase):
+
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher', role='teacher')
+        self.category = Category.objects.create(title='Programming')
+        self.course = Course.objects.create(
+            title='Django', description='...', price=10, duration=2,
+            category=self.category, instructor=self.teacher
+        )
+        self.students = [
+            User.objects.create(username=f'student{i}', role='student') for i in range(3)
+        ]
+
+    def enroll(self, student, **kwargs):
+        return Enrollment.objects.create(student=student, course=self.course, price=10, **kwargs)
+
+    def assertCounters(self, enrolled, completed, courses, students):
+        self.course.refresh_from_db()
+        stats = InstructorStats.objects.get(instructor=self.teacher)
+        self.assertEqual(
+            (self.course.enrolled_count, self.course.completed_count, stats.total_courses, stats.total_students),
+            (enrolled, completed, courses, students)
+        )
+
+    def test_counters_follow_enrollment_lifecycle(self):
+        first = self.enroll(self.students[0])
+        second = self.enroll(self.students[1])
+        self.assertCounters(2, 0, 1, 2)
+
+        first.is_completed = True
+        first.save()
+        self.assertCounters(2, 1, 1, 2)
+
+        first.is_active = False
+        first.save()
+        self.assertCounters(1, 0, 1, 1)
+
+        second.delete()
+        self.assertCounters(0, 0, 1, 0)
+
+    def test_course_update_does_not_overwrite_counters(self):
+        stale = Course.objects.get(pk=self.course.pk)
+        self.enroll(self.students[0])
+        stale.title = 'Django 2'
+        stale.save()
+        self.assertCounters(1, 0, 1, 1)
+
+    def test_saving_deferred_instances_keeps_counters(self):
+        self.enroll(self.students[0], is_completed=True)
+        self.enroll(self.students[1])
+
+        for enrollment in Enrollment.objects.only('id', 'progress'):
+            enrollment.progress = 50
+            enrollment.save()
+        course = Course.objects.only('id', 'title').get(pk=self.course.pk)
+        course.title = 'Django 2'
+        course.save()
+        self.assertCounters(2, 1, 1, 2)
+
+        Enrollment.objects.only('id').get(student=self.students[0]).delete()
+        self.assertCounters(1, 0, 1, 1)
+
+    def test_course_deactivation_moves_instructor_totals(self):
+        self.enroll(self.students[0])
+        self.enroll(self.students[1])
+        self.course.is_active = False
+        self.course.save()
+        self.assertCounters(2, 0, 0, 0)
+
+        self.course.is_active = True
+        self.course.save()
+        self.assertCounters(2, 0, 1, 2)
+
+        self.course.delete()
+        self.assertEqual(InstructorStats.objects.get(instructor=self.teacher).total_courses, 0)
+        self.assertEqual(InstructorStats.objects.get(instructor=self.teacher).total_students, 0)
+
+    def test_cascaded_deletes_keep_instructor_totals(self):
+        other = Course.objects.create(
+            title='Flask', description='...', price=10, duration=2, category=self.category, instructor=self.teacher
+        )
+        for student in self.students:
+            self.enroll(student)
+        Enrollment.objects.create(student=self.students[0], course=other, price=10)
+        self.assertCounters(3, 0, 2, 4)
+
+        # A student's enrollments go with them, course by course
+        self.students[2].delete()
+        self.assertCounters(2, 0, 2, 3)
+        # Course deletes discount their enrollments at once, as instances or querysets
+        Course.objects.filter(pk=other.pk).delete()
+        stats = InstructorStats.objects.get(instructor=self.teacher)
+        self.assertEqual((stats.total_courses, stats.total_students), (1, 2))
+        Course.objects.get(pk=self.course.pk).delete()
+        stats.refresh_from_db()
+        self.assertEqual((stats.total_courses, stats.total_students), (0, 0))
+
+    def test_rebuild_counters(self):
+        self.enroll(self.students[0], is_completed=True)
+        self.enroll(self.students[1])
+        Course.objects.filter(pk=self.course.pk).update(enrolled_count=0, completed_count=0)
+        InstructorStats.objects.all().delete()
+
+        rebuild_counters()
+
+        self.assertCounters(2, 1, 1, 2)
+
+    def test_bulk_updates_recount_counters(self):
+        for student in self.students:
+            self.enroll(student)
+        # Queryset updates send no signals; the querysets recount instead
+        Enrollment.objects.filter(student=self.students[0]).update(is_active=False)
+        Enrollment.objects.filter(student=self.students[1]).update(is_completed=True)
+        self.assertCounters(2, 1, 1, 2)
+
+        Course.objects.filter(pk=self.course.pk).update(is_active=False)
+        self.assertFalse(InstructorStats.objects.filter(instructor=self.teacher).exists())
+        Course.objects.filter(pk=self.course.pk).update(is_active=True)
+        self.assertCounters(2, 1, 1, 2)
+
+        other = User.objects.create(username='other', role='teacher')
+        Course.objects.filter(pk=self.course.pk).update(instructor=other)
+        self.assertFalse(InstructorStats.objects.filter(instructor=self.teacher).exists())
+        stats = InstructorStats.objects.get(instructor=other)
+        self.assertEqual((stats.total_courses, stats.total_students), (1, 2))
+
+    def test_first_bump_tolerates_a_concurrent_first_bump(self):
+        InstructorStats.objects.all().delete()
+        other = User.objects.create(username='other', role='teacher')
+        real_update = QuerySet.update
+
+        def racing_update(queryset, **kwargs):
+            # Another worker creates the row between the UPDATE and the INSERT
+            rows = real_update(queryset, **kwargs)
+            if queryset.model is InstructorStats and not rows:
+                InstructorStats.objects.get_or_create(instructor=other)
+            return rows
+
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            counters.bump_instructor(other.pk, courses=1)
+        self.assertEqual(InstructorStats.objects.get(instructor=other).total_courses, 1)
+
+
+class CourseSearchTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        teacher = User.objects.create(username='teacher', role='teacher')
+        category = Category.objects.create(title='Programming')
+        self.client.force_authenticate(user=User.objects.create(username='student', role='student'))
+
+        def course(title, description):
+            return Course.objects.create(
+                title=title, description=description, price=10, duration=2,
+                category=category, instructor=teacher
+            )
+        self.python = course('Python basics', 'Variables, loops and functions')
+        self.django = course('Web development', 'Build web apps with Django and Python')
+        self.cooking = course('Cooking', 'Pasta and pizza')
+
+    def search(self, query):
+        response = self.client.get('/api/lms/courses/', {'search': query})
+        return [c['id'] for c in response.data['results']]
+
+    def test_ranked_and_prefix_search(self):
+        self.assertEqual(self.search('python'), [self.python.id, self.django.id])
+        self.assertEqual(self.search('djan'), [self.django.id])
+        self.assertEqual(self.search('web pyth'), [self.django.id])
+        self.assertEqual(self.search('rust'), [])
+
+    def test_index_follows_course_writes(self):
+        self.cooking.title = 'Python for chefs'
+        self.cooking.save()
+        self.django.delete()
+        self.assertCountEqual(self.search('python'), [self.cooking.id, self.python.id])
+
+    def test_reindex(self):
+        search.reindex()
+        self.assertEqual(self.search('pizza'), [self.cooking.id])
+
+    def test_migrate_repairs_dropped_triggers(self):
+        self.assertEqual(search.missing(), set())
+        # What SQLite does to them when a migration rebuilds lms_course
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {search.FTS_TABLE}_au')
+        self.assertEqual(search.missing(), {f'{search.FTS_TABLE}_au'})
+
+        emit_post_migrate_signal(verbosity=0, interactive=False, db=connection.alias)
+        self.assertEqual(search.missing(), set())
+        self.cooking.title = 'Rust for chefs'
+        self.cooking.save()
+        self.assertEqual(self.search('rust'), [self.cooking.id])
+
+
+class CourseCursorPaginationTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        teacher = User.objects.create(username='teacher', role='teacher')
+        category = Category.objects.create(title='Programming')
+        self.client.force_authenticate(user=User.objects.create(username='student', role='student'))
+        self.courses = [
+            Course.objects.create(
+                title=f'Course {i}', description='...', price=10, duration=2,
+                category=category, instructor=teacher
+            )
+            for i in range(7)
+        ]
+
+    def test_walks_every_course_once_without_count(self):
+        response = self.client.get('/api/lms/courses/', {'pagination': 'cursor', 'page_size': 3})
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+
+        seen = []
+        while True:
+            seen += [c['id'] for c in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen, [c.id for c in self.courses])
+
+    def test_page_number_mode_is_default(self):
+        response = self.client.get('/api/lms/courses/')
+        self.assertEqual(response.data['count'], 7)
+
+
+class ListPaginationTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        teacher = User.objects.create(username='teacher', role='teacher')
+        student = User.objects.create(username='student', role='student')
+        category = Category.objects.create(title='Programming')
+        courses = [
+            Course.objects.create(
+                title=f'Course {i}', description='...', price=10, duration=2,
+                category=category, instructor=teacher
+            )
+            for i in range(5)
+        ]
+        course = courses[0]
+        lesson = Lesson.objects.create(title='Lesson 0', description='...', course=course)
+        for i in range(1, 5):
+            Lesson.objects.create(title=f'Lesson {i}', description='...', course=course)
+        for i in range(5):
+            Material.objects.create(title=f'Material {i}', description='...', course=course)
+            Enrollment.objects.create(student=student, course=courses[i], price=10)
+            QuestionAnswer.objects.create(user=student, lesson=lesson, description=f'Question {i}')
+        self.client.force_authenticate(user=student)
+        self.paths = {
+            'lessons': f'/api/lms/courses/{course.id}/lessons/',
+            'materials': f'/api/lms/courses/{course.id}/materials/',
+            'enrollments': '/api/lms/enrollments/',
+            'questions': f'/api/lms/lessons/{lesson.id}/questions/',
+        }
+
+    def test_pages_follow_page_and_page_size(self):
+        for name, path in self.paths.items():
+            with self.subTest(name):
+                response = self.client.get(path, {'page_size': 2})
+                self.assertEqual(response.data['count'], 5)
+                self.assertIsNone(response.data['previous'])
+                seen = []
+                while True:
+                    self.assertLessEqual(len(response.data['results']), 2)
+                    seen += [row['id'] for row in response.data['results']]
+                    if not response.data['next']:
+                        break
+                    response = self.client.get(response.data['next'])
+                self.assertEqual(seen, sorted(seen))
+                self.assertEqual(len(set(seen)), 5)
+
+                response = self.client.get(path, {'page': 3, 'page_size': 2})
+                self.assertEqual(len(response.data['results']), 1)
+                self.assertIsNone(response.data['next'])
+                self.assertEqual(self.client.get(path, {'page': 4, 'page_size': 2}).status_code, 404)
+
+    def test_enrollments_filter_by_course(self):
+        course = Course.objects.get(title='Course 3')
+        response = self.client.get(self.paths['enrollments'], {'course': course.id})
+        self.assertEqual([row['course'] for row in response.data['results']], [course.id])
+        self.assertEqual(self.client.get(self.paths['enrollments'], {'course': 'x'}).data['count'], 5)
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(ListPagination, 'max_page_size', 3):
+            for name, path in self.paths.items():
+                with self.subTest(name):
+                    response = self.client.get(path, {'page_size': 500})
+                    self.assertEqual(len(response.data['results']), 3)
+                    self.assertIsNotNone(response.data['next'])
+
+    def test_pages_of_lessons_and_materials_answer_304(self):
+        for name in ('lessons', 'materials'):
+            with self.subTest(name):
+                path = f"{self.paths[name]}?page=2&page_size=2"
+                response = self.client.get(path)
+                self.assertEqual(len(response.data['results']), 2)
+                self.assertNotEqual(response['ETag'], self.client.get(self.paths[name])['ETag'])
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN the main query of each list/dashboard view and fail when the
+    planner falls back to a full scan of the table being filtered.
+    """
+
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher', role='teacher')
+        self.student = User.objects.create(username='student', role='student')
+        self.category = Category.objects.create(title='Programming')
+        self.course = Course.objects.create(
+            title='Django', description='...', price=10, duration=2,
+            category=self.category, instructor=self.teacher
+        )
+
+    def assertNoFullScan(self, queryset):
+        plan = queryset.explain()
+        # SQLite reports an unindexed full scan as a bare "SCAN <table>"
+        full_scans = [line for line in plan.splitlines() if re.search(r'SCAN \w+\s*$', line)]
+        self.assertEqual(full_scans, [], f'{queryset.query}\n{plan}')
+
+    def catalog(self, user, **params):
+        # The queryset GET courses/ pages through, built by the view's own code
+        request = Request(RequestFactory().get('/api/lms/courses/', params))
+        request.user = user
+        return views._course_catalog(request)
+
+    def test_hot_queries_use_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('plan assertions target the SQLite planner')
+
+        cursor_ordering = CourseCursorPagination.ordering
+        queries = [
+            Category.objects.filter(is_active=True),
+            self.catalog(self.student),
+            self.catalog(self.student, category=self.category.id),
+            self.catalog(self.teacher),
+            self.catalog(self.student).order_by(*cursor_ordering),
+            self.catalog(self.student).filter(created_at__gt=self.course.created_at).order_by(*cursor_ordering),
+            dashboard_views._admin_courses(),
+            dashboard_views._instructors(),
+            dashboard_views._teacher_courses(self.teacher),
+            dashboard_views._student_enrollments(self.student),
+            User.objects.filter(email='student@example.com'),
+            Enrollment.objects.filter(course=self.course, is_active=True).select_related('student'),
+            Lesson.objects.filter(course_id=self.course.id).order_by('id'),
+            Material.objects.filter(course_id=self.course.id).order_by('id'),
+            QuestionAnswer.objects.filter(lesson_id=1, is_active=True).order_by('id'),
+        ]
+        for queryset in queries:
+            with self.subTest(model=queryset.model.__name__, query=str(queryset.query)):
+                self.assertNoFullScan(queryset)
+
+
+class TempMediaMixin:
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class BenchmarkHarnessTests(TempMediaMixin, TestCase):
+
+    def test_every_api_route_has_a_benchmark(self):
+        fixtures = benchmark.seed(seeding.SeedPlan.for_size(0.05, enrollments_per_student=2))
+        names = {endpoint.name for endpoint in benchmark.endpoints(fixtures)}
+        self.assertEqual(benchmark.api_route_names() - names, set())
+
+    def test_small_datasets_still_have_a_course_to_enroll_in(self):
+        # Every student is enrolled in every one of the 5 courses
+        fixtures = benchmark.seed(seeding.SeedPlan.for_size(0.05))
+        self.assertFalse(fixtures['other_course'].enrollments.filter(student=fixtures['student']).exists())
+
+    def test_bench_api_takes_dataset_overrides(self):
+        parser = bench_api.Command().create_parser('manage.py', 'bench_api')
+        options = parser.parse_args(['--users', '30', '--courses', '4', '--lessons', '2', '--enrollments', '1'])
+        self.assertEqual((options.users, options.courses, options.lessons, options.enrollments), (30, 4, 2, 1))
+
+    def test_seeding_without_a_usable_course_is_an_error(self):
+        with self.assertRaisesMessage(ValueError, 'no course with enrollments'):
+            benchmark.seed(seeding.SeedPlan.for_size(0.05, lessons_per_course=0))
+
+    def test_compare_flags_query_and_latency_regressions(self):
+        baseline = {'get x': {'p50_ms': 5, 'p95_ms': 10, 'queries': 3}}
+        self.assertEqual(benchmark.compare({'get x': {'p50_ms': 5, 'p95_ms': 11, 'queries': 3}}, baseline, 0.25), [])
+        self.assertEqual(len(benchmark.compare({'get x': {'p50_ms': 5, 'p95_ms': 20, 'queries': 4}}, baseline, 0.25)), 2)
+
+
+class SeedingTests(TestCase):
+
+    def test_seed_plan_is_loaded_with_consistent_counters(self):
+        plan = seeding.SeedPlan.for_size(0.02, courses=4)
+        counts = seeding.seed(plan)
+
+        self.assertEqual(counts['students'], 20)
+        self.assertEqual(counts['courses'], 4)
+        self.assertEqual(Enrollment.objects.count(), 20 * 4)
+        self.assertEqual(Lesson.objects.count(), 4 * plan.lessons_per_course)
+        for course in Course.objects.all():
+            self.assertEqual(course.enrolled_count, course.enrollments.filter(is_active=True).count())
+
+    def test_same_seed_same_data(self):
+        seeding.seed(seeding.SeedPlan.for_size(0.01, prefix='a'))
+        first = list(Enrollment.objects.order_by('id').values_list('progress', flat=True))
+        Enrollment.objects.all().delete()
+        seeding.seed(seeding.SeedPlan.for_size(0.01, prefix='b'))
+        second = list(Enrollment.objects.order_by('id').values_list('progress', flat=True))
+        self.assertEqual(first, second)
+
+
+class BulkEnrollmentTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create(username='admin', role='admin')
+        self.teacher = User.objects.create(username='teacher', role='teacher')
+        category = Category.objects.create(title='Programming')
+        self.courses = [
+            Course.objects.create(
+                title=f'Course {i}', description='...', price=25, duration=2,
+                category=category, instructor=self.teacher
+            )
+            for i in range(3)
+        ]
+        User.objects.bulk_create([User(username=f'student{i}', role='student') for i in range(30)])
+        self.students = list(User.objects.filter(role='student').order_by('id'))
+        Enrollment.objects.create(student=self.students[0], course=self.courses[0], price=25)
+
+    def test_admin_enrolls_a_cohort_in_constant_queries(self):
+        self.client.force_authenticate(user=self.admin)
+        ids = [s.id for s in self.students] + [self.teacher.id]
+        with self.assertNumQueries(11):
+            response = self.client.post('/api/lms/enrollments/bulk/', {
+                'course': self.courses[0].id, 'students': ids,
+            }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['skipped']), (29, 2))
+        statuses = {r['student']: r['status'] for r in response.data['results']}
+        self.assertEqual(statuses[self.students[0].id], 'already_enrolled')
+        self.assertEqual(statuses[self.teacher.id], 'student_not_found')
+        self.assertEqual(Enrollment.objects.filter(course=self.courses[0]).count(), 30)
+
+        self.courses[0].refresh_from_db()
+        self.assertEqual(self.courses[0].enrolled_count, 30)
+        self.assertEqual(InstructorStats.objects.get(instructor=self.teacher).total_students, 30)
+
+    def test_concurrent_enrollments_are_not_counted_twice(self):
+        racer = self.students[1]
+        lookup = views._enrolled_pairs
+
+        def racing_lookup(*args):
+            pairs = lookup(*args)
+            # Another request enrolls the student between the lookup and the insert
+            if not Enrollment.objects.filter(student=racer).exists():
+                Enrollment.objects.create(student=racer, course=self.courses[0], price=25)
+            return pairs
+
+        self.client.force_authenticate(user=self.admin)
+        with mock.patch.object(views, '_enrolled_pairs', side_effect=racing_lookup):
+            response = self.client.post('/api/lms/enrollments/bulk/', {
+                'course': self.courses[0].id, 'students': [s.id for s in self.students[:5]],
+            }, format='json')
+
+        self.assertEqual((response.data['created'], response.data['skipped']), (3, 2))
+        statuses = {r['student']: r['status'] for r in response.data['results']}
+        self.assertEqual(statuses[racer.id], 'already_enrolled')
+        self.courses[0].refresh_from_db()
+        self.assertEqual(self.courses[0].enrolled_count, 5)
+        self.assertEqual(InstructorStats.objects.get(instructor=self.teacher).total_students, 5)
+
+    def test_student_enrolls_in_many_courses(self):
+        self.client.force_authenticate(user=self.students[0])
+        response = self.client.post('/api/lms/enrollments/bulk/', {
+            'courses': [c.id for c in self.courses] + [999],
+        }, format='json')
+
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(
+            [r['status'] for r in response.data['results']],
+            ['already_enrolled', 'created', 'created', 'course_not_found']
+        )
+        self.assertEqual(Enrollment.objects.get(student=self.students[0], course=self.courses[1]).price, 25)
+
+    def test_rejects_bad_payload_and_roles(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post('/api/lms/enrollments/bulk/', {'course': self.courses[0].id}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/lms/enrollments/bulk/', {
+            'course': self.courses[0].id, 'students': [self.students[1].id], 'price': 'free',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('price', response.data)
+        self.assertFalse(Enrollment.objects.filter(student=self.students[1]).exists())
+
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.post('/api/lms/enrollments/bulk/', {'courses': [1]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class MediaServingTests(TempMediaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.teacher = User.objects.create(username='teacher', role='teacher')
+        self.student = User.objects.create(username='student', role='student')
+        category = Category.objects.create(title='Programming')
+        self.course = Course.objects.create(
+            title='Django', description='...', price=10, duration=2,
+            category=category, instructor=self.teacher
+        )
+        self.content = bytes(range(256)) * 40
+        self.lesson = Lesson.objects.create(title='Intro', description='...', course=self.course)
+        self.lesson.video.save('intro.mp4', ContentFile(self.content))
+        self.url = f'/api/lms/courses/{self.course.id}/lessons/{self.lesson.id}/video/'
+        Enrollment.objects.create(student=self.student, course=self.course, price=10)
+        self.client.force_authenticate(user=self.student)
+
+    def get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_full_and_partial_content(self):
+        with self.assertNumQueries(1):
+            response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual((response['Accept-Ranges'], response['Content-Type']), ('bytes', 'video/mp4'))
+
+        response, body = self.get(HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.content[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '100')
+
+        response, body = self.get(HTTP_RANGE='bytes=-10')
+        self.assertEqual(body, self.content[-10:])
+
+        response, _ = self.get(HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_conditional_requests(self):
+        response, _ = self.get()
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag)[0].status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=last_modified)[0].status_code, 304)
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)[0].status_code, 206)
+        # A stale If-Range gets the whole, current file
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')[0].status_code, 200)
+
+    def test_access_requires_enrollment_or_ownership(self):
+        outsider = User.objects.create(username='outsider', role='student')
+        self.client.force_authenticate(user=outsider)
+        self.assertEqual(self.get()[0].status_code, 403)
+
+        other_teacher = User.objects.create(username='other', role='teacher')
+        self.client.force_authenticate(user=other_teacher)
+        self.assertEqual(self.get()[0].status_code, 403)
+
+        self.client.force_authenticate(user=self.teacher)
+        self.assertEqual(self.get()[0].status_code, 200)
+
+    def test_offload_modes(self):
+        with override_settings(MEDIA_OFFLOAD='x-accel-redirect'):
+            response, body = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.lesson.video.name}')
+        self.assertEqual(body, b'')
+
+        with override_settings(MEDIA_OFFLOAD='x-sendfile'):
+            response, _ = self.get()
+        self.assertEqual(response['X-Sendfile'], self.lesson.video.path)
+
+    def test_material_is_an_attachment(self):
+        material = Material.objects.create(title='Slides', description='...', course=self.course)
+        material.file.save('slides.pdf', ContentFile(b'%PDF-1.4'))
+        response = self.client.get(f'/api/lms/courses/{self.course.id}/materials/{material.id}/file/')
+        # Offered under the material's title, not the stored digest name
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="Slides.pdf"')
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4')
+        response.close()
+
+
+@override_settings(UPLOAD_MAX_CHUNK_SIZE=4096)
+class ChunkedUploadTests(TempMediaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.teacher = User.objects.create(username='teacher', role='teacher')
+        category = Category.objects.create(title='Programming')
+        course = Course.objects.create(
+            title='Django', description='...', price=10, duration=2,
+            category=category, instructor=self.teacher
+        )
+        self.lesson = Lesson.objects.create(title='Intro', description='...', course=course)
+        self.content = bytes(range(256)) * 40
+        self.client.force_authenticate(user=self.teacher)
+
+    def start(self, **overrides):
+        response = self.client.post('/api/lms/uploads/', {
+            'target': 'lesson', 'object_id': self.lesson.id, 'filename': 'intro.mp4',
+            'size': len(self.content), 'checksum': hashlib.sha256(self.content).hexdigest(), **overrides,
+        }, format='json')
+        return response
+
+    def put(self, upload_id, offset, chunk, checksum=None):
+        return self.client.put(
+            f'/api/lms/uploads/{upload_id}/', chunk, content_type='application/octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset), HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(chunk).hexdigest(),
+        )
+
+    def test_resumable_upload_attaches_file(self):
+        response = self.start()
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.data['id']
+
+        self.assertEqual(self.put(upload_id, 0, self.content[:4096]).data['offset'], 4096)
+        # A retried chunk is rejected with the offset to resume from
+        response = self.put(upload_id, 0, self.content[:4096])
+        self.assertEqual((response.status_code, response.data['offset']), (409, 4096))
+        self.assertEqual(self.client.get(f'/api/lms/uploads/{upload_id}/').data['offset'], 4096)
+
+        response = self.put(upload_id, 4096, self.content[4096:8192], checksum='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post(f'/api/lms/uploads/{upload_id}/complete/').status_code, 409)
+
+        self.put(upload_id, 4096, self.content[4096:8192])
+        self.assertEqual(self.put(upload_id, 8192, self.content[8192:]).data['offset'], len(self.content))
+
+        response = self.client.post(f'/api/lms/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, 200)
+        self.lesson.refresh_from_db()
+        with self.lesson.video.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertFalse(uploads.part_path(UploadSession.objects.get()).exists())
+        self.assertEqual(list(uploads.upload_dir().iterdir()), [])
+
+    def test_whole_file_checksum_restarts_upload(self):
+        upload_id = self.start(checksum='a' * 64).data['id']
+        for offset in range(0, len(self.content), 4096):
+            self.put(upload_id, offset, self.content[offset:offset + 4096])
+        response = self.client.post(f'/api/lms/uploads/{upload_id}/complete/')
+        self.assertEqual((response.status_code, response.data['offset']), (400, 0))
+        self.assertEqual(UploadSession.objects.get().received, 0)
+
+    def test_assembled_file_is_hashed_once_without_holding_the_session(self):
+        upload_id = self.start(checksum='').data['id']
+        for offset in range(0, len(self.content), 4096):
+            self.put(upload_id, offset, self.content[offset:offset + 4096])
+        states, sha256 = [], storage.file_sha256
+
+        def hash_file(path):
+            states.append(UploadSession.objects.get().status)
+            # Chunks are refused meanwhile
+            states.append(self.put(upload_id, len(self.content), b'x').status_code)
+            return sha256(path)
+
+        with mock.patch.object(uploads, 'file_sha256', side_effect=hash_file), \
+                mock.patch.object(storage, 'file_sha256', side_effect=AssertionError('hashed twice')):
+            response = self.client.post(f'/api/lms/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(states, ['completing', 409])
+        digest = hashlib.sha256(self.content).hexdigest()
+        self.lesson.refresh_from_db()
+        self.assertIn(digest, self.lesson.video.name)
+        self.assertEqual(UploadSession.objects.get().status, 'complete')
+
+    def test_limits_and_permissions(self):
+        upload_id = self.start().data['id']
+        self.assertEqual(self.put(upload_id, 0, bytes(5000)).status_code, 413)
+        self.assertEqual(self.start(size=0).status_code, 400)
+
+        other = User.objects.create(username='other', role='teacher')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.start().status_code, 403)
+        self.assertEqual(self.client.get(f'/api/lms/uploads/{upload_id}/').status_code, 404)
+
+        self.client.force_authenticate(user=self.teacher)
+        self.assertEqual(self.client.delete(f'/api/lms/uploads/{upload_id}/').status_code, 204)
+        self.assertEqual(list(uploads.upload_dir().iterdir()), [])
+
+
+@override_settings(BANNER_RENDITIONS={'card': {'size': (64, 36)}, 'thumb': {'size': (32, 18)}})
+class BannerRenditionTests(TempMediaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        teacher = User.objects.create(username='teacher', role='teacher')
+        self.client.force_authenticate(user=User.objects.create(username='student', role='student'))
+        self.course = Course.objects.create(
+            title='Django', description='...', price=10, duration=2,
+            category=Category.objects.create(title='Programming'), instructor=teacher,
+            banner=self.image('banner.png', (400, 400)),
+        )
+
+    def image(self, name, size):
+        buffer = io.BytesIO()
+        Image.new('RGBA', size, (200, 30, 30, 128)).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def card(self):
+        return self.client.get('/api/lms/courses/').data['results'][0]
+
+    def test_worker_renders_and_serializer_exposes_renditions(self):
+        self.assertTrue(Course.objects.get().banner_pending)
+        self.assertIsNone(self.card()['banner_renditions'])
+
+        self.assertEqual(renditions.render_pending(workers=1), (1, 1))
+        course = Course.objects.get()
+        self.assertFalse(course.banner_pending)
+        card = self.card()['banner_renditions']['card']
+        self.assertEqual((card['width'], card['height']), (64, 36))
+        self.assertTrue(card['webp'].startswith('http://testserver/media/course_banners/banner.card'))
+
+        with course.banner.storage.open(course.banner_renditions['thumb']['jpeg']) as f, Image.open(f) as thumb:
+            self.assertEqual((thumb.format, thumb.size), ('JPEG', (32, 18)))
+
+    def test_unrelated_save_keeps_renditions_and_new_banner_replaces_them(self):
+        renditions.render_pending(workers=1)
+        old = Course.objects.get().banner_renditions
+
+        # A stale instance must not wipe what the worker wrote
+        self.course.title = 'Django 2'
+        self.course.save()
+        self.assertEqual(Course.objects.get().banner_renditions, old)
+
+        course = Course.objects.get()
+        course.banner = self.image('new.png', (100, 300))
+        course.save()
+        self.assertTrue(Course.objects.get().banner_pending)
+        self.assertIsNone(self.card()['banner_renditions'])
+
+        renditions.render_pending(workers=2)
+        storage = course.banner.storage
+        self.assertFalse(storage.exists(old['card']['webp']))
+        self.assertIn('new.card', self.card()['banner_renditions']['card']['webp'])
+
+    def test_unreadable_banner_is_not_retried(self):
+        Course.objects.filter(pk=self.course.pk).update(banner='course_banners/missing.png', banner_pending=True)
+        with self.assertLogs('lms.renditions', 'WARNING'):
+            self.assertEqual(renditions.render_pending(workers=1), (1, 0))
+        self.assertFalse(Course.objects.get().banner_pending)
+        self.assertIsNone(self.card()['banner_renditions'])
+
+
+class ContentAddressedStorageTests(TempMediaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        teacher = User.objects.create(username='teacher', role='teacher')
+        self.course = Course.objects.create(
+            title='Django', description='...', price=10, duration=2,
+            category=Category.objects.create(title='Programming'), instructor=teacher,
+        )
+
+    def material(self, content, name='notes.pdf'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Material.objects.create(
+                title='Notes', description='...', course=self.course, file=ContentFile(content, name=name)
+            )
+
+    def test_identical_files_share_one_blob(self):
+        first, second = self.material(b'same bytes'), self.material(b'same bytes', 'copy.PDF')
+        digest = hashlib.sha256(b'same bytes').hexdigest()
+        self.assertEqual(first.file.name, f'blobs/{digest[:2]}/{digest[2:4]}/{digest}.pdf')
+        self.assertEqual(second.file.name, first.file.name)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+        # No scratch files are left next to the blob tree
+        self.assertEqual(os.listdir(first.file.storage.path('blobs')), [digest[:2]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(second.file.storage.exists(second.file.name))
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Material.objects.get(pk=second.pk).delete()
+        self.assertFalse(second.file.storage.exists(second.file.name))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_deduplicating_save_keeps_a_blob_being_released(self):
+        first = self.material(b'shared')
+        storage = first.file.storage
+        with self.captureOnCommitCallbacks() as callbacks:
+            first.delete()
+        # The same content is stored again before the release's commit callback runs...
+        name = storage.save('again.pdf', ContentFile(b'shared'))
+        self.assertEqual(name, first.file.name)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(storage.exists(name))
+        # ...and the row counts the reference once the new row is saved
+        with self.captureOnCommitCallbacks(execute=True):
+            second = Material.objects.create(title='Again', description='...', course=self.course, file=name)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(storage.exists(name))
+
+    def test_files_without_a_row_are_written_again(self):
+        material = self.material(b'content')
+        storage = material.file.storage
+        StoredBlob.objects.all().delete()
+        os.remove(storage.path(material.file.name))
+        self.assertEqual(storage.save('notes.pdf', ContentFile(b'content')), material.file.name)
+        self.assertTrue(storage.exists(material.file.name))
+
+    def test_replacing_a_file_releases_the_old_blob(self):
+        material = self.material(b'version 1')
+        old = material.file.name
+        material = Material.objects.defer('file').get(pk=material.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            material.file = ContentFile(b'version 2', name='notes.pdf')
+            material.save()
+        self.assertFalse(material.file.storage.exists(old))
+        self.assertEqual(list(StoredBlob.objects.values_list('name', 'ref_count')), [(material.file.name, 1)])
+
+        # Saves that leave the file alone don't touch the count
+        material.title = 'Notes 2'
+        material.save()
+        Material.objects.defer('file').get(pk=material.pk).save()
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+    def test_gc_repairs_counts_and_removes_orphans(self):
+        material = self.material(b'kept')
+        orphan = self.material(b'orphan')
+        Material.objects.filter(pk=orphan.pk).update(file='')   # no signals: the count drifts
+        StoredBlob.objects.filter(name=material.file.name).update(ref_count=5)
+        storage = material.file.storage
+        stray = storage.path('blobs/crashed.tmp')
+        with open(stray, 'wb') as f:
+            f.write(b'x' * 10)
+
+        # Everything is younger than the grace period
+        self.assertEqual(blobs.collect_garbage()['blobs'], 0)
+        self.assertEqual(StoredBlob.objects.get(name=material.file.name).ref_count, 1)
+
+        out = io.StringIO()
+        call_command('gc_blobs', '--grace-minutes', '-1', stdout=out)
+        self.assertIn('Removed 1 unreferenced blobs and 1 stray files (10 bytes)', out.getvalue())
+        self.assertFalse(storage.exists(orphan.file.name))
+        self.assertFalse(os.path.exists(stray))
+        self.assertTrue(storage.exists(material.file.name))
+        self.assertEqual(list(StoredBlob.objects.values_list('name', flat=True)), [material.file.name])
+
+
+@override_settings(PROGRESS_FLUSH_INTERVAL=None)
+class LessonProgressTests(TestCase):
+
+    def setUp(self):
+        heartbeats.buffer.drain()
+        self.addCleanup(heartbeats.buffer.drain)
+        self.client = APIClient()
+        teacher = User.objects.create(username='teacher', role='teacher')
+        self.student = User.objects.create(username='student', role='student')
+        self.course = Course.objects.create(
+            title='Django', description='...', price=10, duration=2,
+            category=Category.objects.create(title='Programming'), instructor=teacher,
+        )
+        self.lessons = [
+            Lesson.objects.create(title=f'Lesson {i}', description='...', course=self.course) for i in range(4)
+        ]
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course, price=10)
+        self.client.force_authenticate(user=self.student)
+
+    def url(self, lesson):
+        return f'/api/lms/courses/{self.course.id}/lessons/{lesson.id}/progress/'
+
+    def complete(self, lesson):
+        return self.client.post(self.url(lesson), {'completed': True}, format='json')
+
+    def test_completion_updates_enrollment_incrementally(self):
+        self.assertEqual(Course.objects.get().lesson_count, 4)
+        with self.assertNumQueries(11):
+            response = self.complete(self.lessons[0])
+        self.assertEqual((response.data['completed_lessons'], response.data['progress']), (1, 25))
+
+        # Completing the same lesson again changes nothing
+        self.assertEqual(self.complete(self.lessons[0]).data['progress'], 25)
+        for lesson in self.lessons[1:]:
+            response = self.complete(lesson)
+        self.assertEqual((response.data['progress'], response.data['is_completed']), (100, True))
+        self.assertEqual(Course.objects.get().completed_count, 1)
+
+        # Course edits rescale progress; completion sticks
+        Lesson.objects.create(title='Bonus', description='...', course=self.course)
+        self.assertEqual(Enrollment.objects.get().progress, 80)
+        self.lessons[0].delete()
+        enrollment = Enrollment.objects.get()
+        self.assertEqual((enrollment.completed_lessons, enrollment.progress, enrollment.is_completed), (3, 75, True))
+
+        Enrollment.objects.update(completed_lessons=0, progress=0)
+        self.assertEqual(progress.rebuild_progress(), 1)
+        self.assertEqual(Enrollment.objects.values_list('completed_lessons', 'progress').get(), (3, 75))
+
+    def test_deleting_a_course_skips_per_lesson_progress_work(self):
+        for lesson in self.lessons[:2]:
+            self.complete(lesson)
+        # Lesson deletes adjust progress, as instances or querysets
+        Lesson.objects.filter(pk=self.lessons[0].pk).delete()
+        self.assertEqual(Enrollment.objects.values_list('completed_lessons', 'progress').get(), (1, 33))
+
+        def delete_course(lessons):
+            course = Course.objects.create(
+                title='Other', description='...', price=10, duration=2,
+                category=self.course.category, instructor=self.course.instructor,
+            )
+            for i in range(lessons):
+                Lesson.objects.create(title=f'Lesson {i}', description='...', course=course)
+            Enrollment.objects.create(student=self.student, course=course, price=10)
+            with CaptureQueriesContext(connection) as queries:
+                course.delete()
+            return len(queries)
+
+        self.assertEqual(delete_course(2), delete_course(8))
+
+    def test_heartbeats_are_buffered_and_written_in_bulk(self):
+        url = self.url(self.lessons[0])
+        # Only the enrollment check per request, no writes
+        with self.assertNumQueries(3):
+            for position in (10, 15, 20):
+                response = self.client.post(url, {'position': position}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(LessonProgress.objects.exists())
+        # Reads see the buffered position
+        self.assertEqual(self.client.get(url).data['position'], 20)
+
+        self.client.post(self.url(self.lessons[1]), {'position': 5}, format='json')
+        self.assertEqual(heartbeats.buffer.flush(), 2)
+        self.assertEqual(dict(LessonProgress.objects.values_list('lesson_id', 'position')), {
+            self.lessons[0].id: 20, self.lessons[1].id: 5,
+        })
+
+        # Existing rows are updated in one bulk_update
+        self.client.post(url, {'position': 30}, format='json')
+        self.client.post(self.url(self.lessons[1]), {'position': 8}, format='json')
+        with self.assertNumQueries(4):
+            heartbeats.buffer.flush()
+        self.assertEqual(LessonProgress.objects.get(lesson=self.lessons[1]).position, 8)
+
+    def test_deleted_lessons_do_not_block_the_buffer(self):
+        self.client.post(self.url(self.lessons[0]), {'position': 10}, format='json')
+        self.client.post(self.url(self.lessons[1]), {'position': 20}, format='json')
+        self.lessons[1].delete()
+        self.assertEqual(heartbeats.buffer.flush(), 2)
+        self.assertEqual(list(LessonProgress.objects.values_list('lesson_id', 'position')), [
+            (self.lessons[0].id, 10),
+        ])
+        self.assertEqual(heartbeats.buffer.drain(), {})
+
+    def test_failing_positions_are_given_up(self):
+        buffer = heartbeats.HeartbeatBuffer()
+        buffer.add(self.student.pk, self.lessons[0].pk, 7)
+        with mock.patch.object(heartbeats, 'write_positions', side_effect=OperationalError('locked')):
+            for _ in range(heartbeats.FLUSH_ATTEMPTS - 1):
+                with self.assertRaises(OperationalError):
+                    buffer.flush()
+                self.assertEqual(buffer.pending(self.student.pk, self.lessons[0].pk), 7)
+            with self.assertRaises(OperationalError), self.assertLogs(heartbeats.logger, 'WARNING'):
+                buffer.flush()
+        self.assertEqual(buffer.drain(), {})
+
+    def test_completion_takes_the_buffered_position(self):
+        url = self.url(self.lessons[0])
+        self.client.post(url, {'position': 42}, format='json')
+        self.complete(self.lessons[0])
+        self.assertIsNone(heartbeats.buffer.pending(self.student.pk, self.lessons[0].pk))
+        self.assertEqual(LessonProgress.objects.values_list('position', 'completed').get(), (42, True))
+
+    def test_full_buffer_flushes_inline(self):
+        with override_settings(PROGRESS_BUFFER_MAX_ENTRIES=2):
+            self.client.post(self.url(self.lessons[0]), {'position': 1}, format='json')
+            self.assertFalse(LessonProgress.objects.exists())
+            self.client.post(self.url(self.lessons[1]), {'position': 2}, format='json')
+        self.assertEqual(LessonProgress.objects.count(), 2)
+        self.assertEqual(heartbeats.buffer.drain(), {})
+
+    def test_failed_inline_flush_does_not_fail_the_request(self):
+        with override_settings(PROGRESS_BUFFER_MAX_ENTRIES=1), \
+                mock.patch.object(heartbeats, 'write_positions', side_effect=OperationalError('locked')), \
+                self.assertLogs(heartbeats.logger, 'ERROR'):
+            response = self.client.post(self.url(self.lessons[0]), {'position': 3}, format='json')
+        self.assertLess(response.status_code, 300)
+        self.assertEqual(heartbeats.buffer.pending(self.student.pk, self.lessons[0].pk), 3)
+
+    def test_exit_flush_is_registered_without_a_flush_thread(self):
+        buffer = heartbeats.HeartbeatBuffer()
+        with mock.patch.object(heartbeats.atexit, 'register') as register:
+            buffer.add(self.student.pk, self.lessons[0].pk, 7)
+            buffer.add(self.student.pk, self.lessons[1].pk, 8)
+        register.assert_called_once_with(buffer.stop)
+        self.assertIsNone(buffer._thread)
+        buffer.stop()
+
+    def test_stop_writes_what_is_left(self):
+        buffer = heartbeats.HeartbeatBuffer()
+        buffer.add(self.student.pk, self.lessons[0].pk, 7)
+        buffer.stop()
+        self.assertEqual(LessonProgress.objects.get().position, 7)
+
+    def test_requires_enrollment_and_a_report(self):
+        self.assertEqual(self.client.post(self.url(self.lessons[0]), {}, format='json').status_code, 400)
+        Enrollment.objects.filter(pk=self.enrollment.pk).update(is_active=False)
+        self.assertEqual(self.complete(self.lessons[0]).status_code, 403)
+        other = Course.objects.create(
+            title='Other', description='...', price=10, duration=2,
+            category=self.course.category, instructor=self.course.instructor,
+        )
+        response = self.client.get(f'/api/lms/courses/{other.id}/lessons/{self.lessons[0].id}/progress/')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(ASGI_URLCONF='backend.asgi_urls')
+class AsyncReadViewTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.teacher = User.objects.create(username='teacher', role='teacher')
+        self.student = User.objects.create(username='student', role='student')
+        self.admin = User.objects.create(username='admin', role='admin')
+        category = Category.objects.create(title='Programming')
+        other = Category.objects.create(title='Design')
+        courses = [
+            Course.objects.create(
+                title=f'Course {i}', description='...', price=10, duration=2,
+                category=category if i % 3 else other, instructor=self.teacher,
+            )
+            for i in range(12)
+        ]
+        self.course = courses[0]
+        for i in range(3):
+            Lesson.objects.create(title=f'Lesson {i}', description='...', course=self.course)
+        Enrollment.objects.create(student=self.student, course=self.course, price=10)
+        self.other_category = other
+
+    def get_both(self, path, user):
+        headers = {'Authorization': f'Bearer {tokens_for_user(user).access_token}'} if user else {}
+        wsgi = self.client.get(path, headers=headers)
+        asgi = async_to_sync(AsyncClient().get)(path, headers=headers)
+        return wsgi, asgi
+
+    def test_asgi_requests_are_served_by_the_async_views(self):
+        for path, view in (
+            ('/api/lms/courses/', views.course_list_create_async),
+            (f'/api/lms/courses/{self.course.id}/lessons/', views.lesson_list_create_async),
+        ):
+            self.assertIs(resolve(path, urlconf='backend.asgi_urls').func, view)
+            self.assertIsNot(resolve(path).func, view)
+
+    def test_async_views_answer_like_the_drf_views(self):
+        course_id = self.course.id
+        for path, user in (
+            ('/api/lms/courses/', self.student),
+            ('/api/lms/courses/?page=2', self.student),
+            (f'/api/lms/courses/?category={self.other_category.id}', self.admin),
+            ('/api/lms/courses/?search=course', self.teacher),
+            ('/api/lms/courses/?page=9', self.student),
+            ('/api/lms/courses/', None),
+            (f'/api/lms/courses/{course_id}/lessons/?page_size=2', self.student),
+            ('/api/lms/courses/999/lessons/', self.student),
+            ('/api/dashboard/summary/', self.student),
+            ('/api/dashboard/summary/', self.admin),
+            ('/api/dashboard/summary/', self.teacher),
+        ):
+            with self.subTest(path=path, user=user and user.role):
+                wsgi, asgi = self.get_both(path, user)
+                self.assertEqual(asgi.status_code, wsgi.status_code)
+                self.assertEqual(json.loads(asgi.content), json.loads(wsgi.content))
+                self.assertEqual(asgi.get('ETag'), wsgi.get('ETag'))
+                self.assertEqual(asgi.get('WWW-Authenticate'), wsgi.get('WWW-Authenticate'))
+
+    def test_other_methods_and_cursor_pages_fall_through_to_drf(self):
+        headers = {'Authorization': f'Bearer {tokens_for_user(self.admin).access_token}'}
+        client = AsyncClient()
+        response = async_to_sync(client.post)('/api/lms/courses/', {
+            'title': 'New', 'description': '...', 'price': 1, 'duration': 1,
+            'category': self.course.category_id, 'instructor': self.teacher.id,
+        }, content_type='application/json', headers=headers)
+        self.assertEqual(response.status_code, 201)
+
+        response = async_to_sync(client.get)('/api/lms/courses/?pagination=cursor', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('next', json.loads(response.content))
+
+
+class SQLiteProfileTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp(prefix='sqlite-profile-')
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = Path(directory) / 'db.sqlite3'
+
+    def profile(self, name, timeout=None):
+        profile = settings.DATABASE_PROFILES[name]
+        if timeout is not None:
+            profile = {**profile, 'OPTIONS': {**profile.get('OPTIONS', {}), 'timeout': timeout}}
+        return profile
+
+    def query(self, conn, sql):
+        with conn.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()[0]
+
+    def test_production_profile_configures_every_connection(self):
+        conn = contention.connections_for(self.path, self.profile('production'))[contention.ALIAS]
+        self.addCleanup(conn.close)
+        self.assertEqual(self.query(conn, 'PRAGMA journal_mode'), 'wal')
+        self.assertEqual(self.query(conn, 'PRAGMA synchronous'), 1)  # NORMAL
+        self.assertEqual(self.query(conn, 'PRAGMA mmap_size'), 268435456)
+        self.assertEqual(self.query(conn, 'PRAGMA busy_timeout'), 20000)
+        self.assertEqual(conn.transaction_mode, 'IMMEDIATE')
+        self.assertGreater(conn.settings_dict['CONN_MAX_AGE'], 0)
+
+    def commit_during_read(self, profile):
+        """Commit a write from another connection while this one holds a read transaction open."""
+        reader = contention.connections_for(self.path, profile)[contention.ALIAS]
+        self.addCleanup(reader.close)
+        with reader.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+            cursor.execute('INSERT INTO item DEFAULT VALUES')
+            cursor.execute('BEGIN')
+            cursor.execute('SELECT COUNT(*) FROM item')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+        outcome = {}
+
+        def write():
+            writer = contention.connections_for(self.path, profile)[contention.ALIAS]
+            try:
+                with contention.atomic(writer), writer.cursor() as cursor:
+                    cursor.execute('INSERT INTO item DEFAULT VALUES')
+                outcome['committed'] = True
+            except OperationalError as e:
+                outcome['error'] = str(e)
+            finally:
+                writer.close()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        thread.join()
+        # The reader's snapshot is unaffected until it ends its transaction
+        self.assertEqual(self.query(reader, 'SELECT COUNT(*) FROM item'), 1)
+        with reader.cursor() as cursor:
+            cursor.execute('COMMIT')
+        return outcome, self.query(reader, 'SELECT COUNT(*) FROM item')
+
+    def test_writers_commit_while_readers_hold_a_snapshot(self):
+        outcome, count = self.commit_during_read(self.profile('production'))
+        self.assertEqual(outcome, {'committed': True})
+        self.assertEqual(count, 2)
+
+    def test_development_profile_writers_wait_for_readers(self):
+        outcome, count = self.commit_during_read(self.profile('development', timeout=0.1))
+        self.assertIn('locked', outcome['error'])
+        self.assertEqual(count, 1)
+
+    def test_concurrent_enrollments_never_hit_a_locked_database(self):
+        result = contention.stress(self.path, self.profile('production'), writers=4, readers=4, transactions=25)
+        self.assertEqual(result['writes'], 100)
+        self.assertEqual(result['write_errors'], 0)
+        self.assertEqual(result['read_errors'], 0)
+        self.assertGreater(result['reads'], 0)
+        self.assertTrue(result['consistent'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def read_aliases(self, request, status=200):
+        """Aliases the router picks for two reads made while serving `request`."""
+        picked = []
+
+        def view(request):
+            picked.extend([router.db_for_read(Course), router.db_for_read(Lesson)])
+            return HttpResponse(status=status)
+
+        ReplicaRoutingMiddleware(view)(request)
+        return picked
+
+    def test_safe_requests_read_one_replica_each_in_turn(self):
+        first = self.read_aliases(self.factory.get('/api/lms/courses/'))
+        second = self.read_aliases(self.factory.get('/api/lms/courses/'))
+        self.assertEqual(len(set(first)), 1)
+        self.assertEqual(len(set(second)), 1)
+        self.assertEqual({first[0], second[0]}, {'replica_1', 'replica_2'})
+        self.assertEqual(router.db_for_write(Course), 'default')
+
+    def test_everything_else_reads_the_primary(self):
+        self.assertEqual(router.db_for_read(Course), 'default')
+        self.assertEqual(self.read_aliases(self.factory.post('/api/lms/courses/')), ['default', 'default'])
+        self.assertFalse(router.allow_migrate('replica_1', 'lms'))
+        self.assertTrue(router.allow_migrate('default', 'lms'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        self.assertEqual(self.read_aliases(self.factory.get('/api/lms/courses/')), ['default', 'default'])
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        user = User(pk=7, username='student', role='student')
+        token = f'Bearer {tokens_for_user(user).access_token}'
+        request = self.factory.post('/api/lms/enrollments/', HTTP_AUTHORIZATION=token)
+        request.user = user
+
+        failed = self.factory.post('/api/lms/enrollments/', HTTP_AUTHORIZATION=token)
+        failed.user = user
+        self.read_aliases(failed, status=400)
+        self.assertIn('replica', self.read_aliases(self.factory.get('/', HTTP_AUTHORIZATION=token))[0])
+
+        self.read_aliases(request, status=201)
+        self.assertEqual(self.read_aliases(self.factory.get('/', HTTP_AUTHORIZATION=token)), ['default', 'default'])
+        # Other users and addresses keep reading the replicas
+        self.assertIn('replica', self.read_aliases(self.factory.get('/', REMOTE_ADDR='10.0.0.2'))[0])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaReadTests(TransactionTestCase):
+    """A second SQLite file stands in for the replica; replicate() brings it up to date."""
+    # Includes 'replica', which only exists from setUpClass() on
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp(prefix='replica-')
+        connections.settings['replica'] = {
+            **connections['default'].settings_dict,
+            'NAME': os.path.join(cls.directory, 'replica.sqlite3'),
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.client = APIClient()
+        self.teacher = User.objects.create(username='teacher', role='teacher')
+        self.student = User.objects.create(username='student', role='student')
+        self.admin = User.objects.create(username='admin', role='admin')
+        category = Category.objects.create(title='Programming')
+        self.replicate()
+        # Written after the last replication: the replica lags behind
+        self.course = Course.objects.create(
+            title='Django', description='...', price=10, duration=2, category=category, instructor=self.teacher,
+        )
+
+    def replicate(self):
+        connections['replica'].close()
+        target = sqlite3.connect(connections['replica'].settings_dict['NAME'])
+        try:
+            connections['default'].ensure_connection()
+            connections['default'].connection.backup(target)
+        finally:
+            target.close()
+
+    def get_courses(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens_for_user(user).access_token}')
+        return self.client.get('/api/lms/courses/')
+
+    def test_safe_requests_read_the_replica(self):
+        with CaptureQueriesContext(connections['replica']) as replica, \
+                CaptureQueriesContext(connections['default']) as primary:
+            response = self.get_courses(self.student)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 0)
+        self.assertTrue(replica.captured_queries)
+        self.assertFalse(primary.captured_queries)
+
+        # Pages read from a replica right after a catalog write are not shared...
+        self.replicate()
+        self.assertEqual(self.get_courses(self.student).data['count'], 1)
+        # ...until the replication lag has passed
+        cache.delete(catalog_cache.SETTLING_KEY)
+        self.get_courses(self.student)
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.assertEqual(self.get_courses(self.admin).data['count'], 1)
+        self.assertFalse([q for q in replica.captured_queries if 'lms_course' in q['sql']])
+
+    def test_writers_read_their_own_writes(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens_for_user(self.student).access_token}')
+        response = self.client.post('/api/lms/enrollments/', {'course': self.course.id, 'price': 10}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(self.get_courses(self.student).data['count'], 1)
+        # Teachers' catalogs bypass the shared page cache, so this one reads the lagging replica
+        self.assertEqual(self.get_courses(self.teacher).data['count'], 0)
+
+    def test_anonymous_writes_pin_the_client_address(self):
+        response = self.client.post('/api/auth/register/', {
+            'username': 'newcomer', 'email': 'new@example.com', 'password': 'S3cure-pass!', 'role': 'student',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        # Not replicated yet, but this client reads from the primary
+        newcomer = User.objects.get(username='newcomer')
+        self.assertEqual(self.get_courses(newcomer).status_code, 200)
+
+
+class ListETagTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = User.objects.create(username='teacher', role='teacher')
+        self.student = User.objects.create(username='student', role='student')
+        self.category = Category.objects.create(title='Programming')
+        self.course = Course.objects.create(
+            title='Django', description='...', price=10, duration=2,
+            category=self.category, instructor=self.teacher,
+        )
+        self.lesson = Lesson.objects.create(title='Intro', description='...', course=self.course)
+        Material.objects.create(title='Slides', description='...', course=self.course)
+        self.client.force_authenticate(user=self.student)
+        self.paths = [
+            '/api/lms/courses/',
+            f'/api/lms/courses/{self.course.id}/lessons/',
+            f'/api/lms/courses/{self.course.id}/materials/',
+        ]
+
+    def etag(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_unchanged_lists_answer_304_with_one_query(self):
+        for path in self.paths:
+            with self.subTest(path=path):
+                etag = self.etag(path)
+                self.assertTrue(etag.startswith('W/"'))
+                # Lesson and material lists also look the course up; the course
+                # list is answered from the shared catalog cache (lms.catalog_cache)
+                with self.assertNumQueries(0 if path == self.paths[0] else 2):
+                    response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], etag)
+                self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH='W/"stale"').status_code, 200)
+
+    def test_page_and_filters_have_their_own_etags(self):
+        etags = {self.etag(path) for path in (
+            '/api/lms/courses/', '/api/lms/courses/?page=1', f'/api/lms/courses/?category={self.category.id}',
+        )}
+        self.assertEqual(len(etags), 3)
+        self.assertNotIn('ETag', self.client.get('/api/lms/courses/?pagination=cursor'))
+
+    def assertChanges(self, path, change):
+        before = self.etag(path)
+        change()
+        self.assertNotEqual(self.etag(path), before)
+
+    def test_everything_a_course_row_shows_changes_the_etag(self):
+        path = self.paths[0]
+        # The instructor's catalog is never served from the shared page cache,
+        # whose counters may lag (see CatalogCacheTests)
+        self.client.force_authenticate(user=self.teacher)
+        course = Course.objects.get(pk=self.course.pk)
+        self.assertChanges(path, lambda: Course.objects.get(pk=course.pk).save())
+        self.assertChanges(path, lambda: Enrollment.objects.create(student=self.student, course=course, price=10))
+        self.assertChanges(path, lambda: Lesson.objects.create(title='More', description='...', course=course))
+
+        def rename_category():
+            self.category.title = 'Coding'
+            self.category.save()
+        self.assertChanges(path, rename_category)
+
+        def rename_instructor():
+            teacher = User.objects.get(pk=self.teacher.pk)
+            teacher.username = 'professor'
+            teacher.save()
+        self.assertChanges(path, rename_instructor)
+
+        def add_course():
+            Course.objects.create(title='Flask', description='...', price=1, duration=1,
+                                  category=self.category, instructor=self.teacher)
+        self.assertChanges(path, add_course)
+        self.assertChanges(path, lambda: Course.objects.filter(title='Flask').delete())
+
+    def test_lesson_and_material_edits_change_their_etags(self):
+        def edit_lesson():
+            self.lesson.title = 'Welcome'
+            self.lesson.save()
+        self.assertChanges(self.paths[1], edit_lesson)
+        self.assertChanges(self.paths[2], lambda: Material.objects.first().delete())
+
+    def test_saving_a_user_without_renaming_leaves_course_lists_alone(self):
+        before = self.etag(self.paths[0])
+        teacher = User.objects.get(pk=self.teacher.pk)
+        teacher.first_name = 'Ada'
+        with self.assertNumQueries(1):
+            teacher.save()
+        self.assertEqual(self.etag(self.paths[0]), before)
+
+
+class CatalogCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.teacher = User.objects.create(username='teacher', role='teacher')
+        self.student = User.objects.create(username='student', role='student')
+        self.admin = User.objects.create(username='admin', role='admin')
+        self.category = Category.objects.create(title='Programming')
+        self.other = Category.objects.create(title='Design')
+        for i in range(12):
+            Course.objects.create(
+                title=f'Course {i}', description='...', price=10, duration=2,
+                category=self.category if i % 3 else self.other, instructor=self.teacher,
+            )
+        self.course = Course.objects.first()
+
+    def get(self, user, path='/api/lms/courses/', **extra):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(path, **extra)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_students_and_admins_share_cached_pages(self):
+        first = self.get(self.student)
+        with self.assertNumQueries(0):
+            cached = self.get(self.admin)
+        self.assertEqual(cached.data, first.data)
+        self.assertEqual(cached['ETag'], first['ETag'])
+
+        self.client.force_authenticate(user=self.student)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/lms/courses/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_pages_and_filters_are_cached_separately(self):
+        for path in ('/api/lms/courses/?page=2', f'/api/lms/courses/?category={self.other.id}',
+                     '/api/lms/courses/?search=course'):
+            with self.subTest(path=path):
+                uncached = self.get(self.student, path)
+                self.assertNotEqual(uncached.data, self.get(self.student).data)
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.get(self.admin, path).data, uncached.data)
+
+    def test_teachers_and_other_parameters_bypass_the_cache(self):
+        self.get(self.student)
+        with self.assertNumQueries(2):
+            self.get(self.teacher)
+        self.get(self.student, '/api/lms/courses/?page_size=3')
+        with self.assertNumQueries(2):
+            self.get(self.student, '/api/lms/courses/?page_size=3')
+
+    def test_course_and_category_writes_invalidate(self):
+        def edit_course():
+            self.course.title = 'Renamed'
+            self.course.save()
+
+        def rename_category():
+            self.category.title = 'Coding'
+            self.category.save()
+
+        def add_course():
+            Course.objects.create(title='Flask', description='...', price=1, duration=1,
+                                  category=self.category, instructor=self.teacher)
+
+        def rename_instructor():
+            teacher = User.objects.get(pk=self.teacher.pk)
+            teacher.username = 'professor'
+            teacher.save()
+
+        for change in (edit_course, rename_category, add_course, rename_instructor,
+                       lambda: Course.objects.filter(title='Flask').delete()):
+            before = self.get(self.student)
+            change()
+            self.assertNotEqual(self.get(self.student)['ETag'], before['ETag'])
+
+    def test_enrollments_do_not_invalidate(self):
+        before = self.get(self.student)
+        Enrollment.objects.create(student=self.student, course=self.course, price=10)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(self.student).data, before.data)
+        # Counters show up once the page expires
+        cache.clear()
+        self.assertNotEqual(self.get(self.student)['ETag'], before['ETag'])
+
+    @override_settings(ASGI_URLCONF='backend.asgi_urls')
+    def test_async_view_shares_the_cache(self):
+        headers = {'Authorization': f'Bearer {tokens_for_user(self.student).access_token}'}
+        user_cache.clear()
+        asgi = async_to_sync(AsyncClient().get)('/api/lms/courses/?page=2', headers=headers)
+        self.assertEqual(asgi.status_code, 200)
+        with self.assertNumQueries(0):
+            wsgi = self.get(self.admin, '/api/lms/courses/?page=2')
+        self.assertEqual(json.loads(asgi.content), wsgi.data)
+        self.assertEqual(asgi['ETag'], wsgi['ETag'])
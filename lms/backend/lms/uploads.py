@@ -0,0 +1,229 @@
+"""
+Resumable chunked uploads for Lesson.video and Material.file.
+
+A client creates an UploadSession, PUTs the file in chunks (each with its
+offset and SHA-256) and then completes it. Chunks are read from the request
+stream in small buffers, never held in memory as a whole:
+
+1. stage_chunk() spools the body into a scratch file while hashing it,
+   outside any transaction (this is where slow clients spend their time);
+2. append_chunk() locks the session row, checks the offset and copies the
+   scratch file into `<session id>.part` at that offset.
+
+Re-sending a chunk after a lost response is harmless: the offset no longer
+matches and the client is told where to continue. complete() marks the
+session as completing, hashes the assembled file once with no lock held
+(this can take a while for large files), then locks the session again to
+verify the whole-file checksum and move the part file into storage (a
+rename on the same filesystem), passing the digest along.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Lesson, Material, UploadSession
+from .storage import file_sha256
+
+# Read/copy buffer: bounds memory per request regardless of chunk size
+BUFFER_SIZE = 1024 * 1024
+
+TARGETS = {
+    'lesson': (Lesson, 'video'),
+    'material': (Material, 'file'),
+}
+
+
+class UploadError(Exception):
+
+    def __init__(self, detail, status_code=400, **extra):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.extra = extra
+
+
+class AssembledFile(File):
+    """
+    A finished part file; storages move it instead of copying. `sha256`,
+    when known, spares the content-addressed storage a second read.
+    """
+    sha256 = None
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def upload_dir():
+    # Must share a filesystem with MEDIA_ROOT for complete() to be a rename
+    path = Path(getattr(settings, 'UPLOAD_TEMP_DIR', None) or Path(settings.MEDIA_ROOT) / 'partial_uploads')
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def part_path(session):
+    return upload_dir() / f'{session.pk}.part'
+
+
+def create_session(owner, target, object_id, filename, size, checksum=''):
+    max_size = settings.UPLOAD_MAX_SIZE
+    if size <= 0 or size > max_size:
+        raise UploadError(f'size must be between 1 and {max_size} bytes')
+    session = UploadSession.objects.create(
+        owner=owner, target=target, object_id=object_id,
+        filename=os.path.basename(filename), size=size, checksum=checksum.lower(),
+    )
+    part_path(session).touch()
+    return session
+
+
+def stage_chunk(stream, length, sha256):
+    """Spool `length` bytes of `stream` to a scratch file, checking its SHA-256."""
+    if length <= 0:
+        raise UploadError('Empty chunk')
+    if length > settings.UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadError(f'Chunks are limited to {settings.UPLOAD_MAX_CHUNK_SIZE} bytes', 413)
+
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(suffix='.chunk', dir=upload_dir())
+    try:
+        with os.fdopen(fd, 'wb') as scratch:
+            remaining = length
+            while remaining:
+                data = stream.read(min(BUFFER_SIZE, remaining))
+                if not data:
+                    raise UploadError('Chunk body shorter than Content-Length')
+                digest.update(data)
+                scratch.write(data)
+                remaining -= len(data)
+        if sha256 and digest.hexdigest() != sha256.lower():
+            raise UploadError('Chunk checksum mismatch')
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def append_chunk(session_id, owner, offset, staged_path):
+    """Write a staged chunk at `offset`; returns the updated session."""
+    try:
+        length = os.path.getsize(staged_path)
+        with transaction.atomic():
+            session = _locked_session(session_id, owner)
+            if offset != session.received:
+                raise UploadError('Offset mismatch', 409, offset=session.received)
+            if session.received + length > session.size:
+                raise UploadError('Chunk runs past the declared size', 400, offset=session.received)
+
+            # Write at the recorded offset and cut anything after it, so bytes
+            # left by a chunk whose commit failed are simply overwritten
+            with open(part_path(session), 'r+b') as part, open(staged_path, 'rb') as chunk:
+                part.seek(offset)
+                shutil.copyfileobj(chunk, part, BUFFER_SIZE)
+                part.truncate()
+            session.received += length
+            session.save(update_fields=['received', 'updated_at'])
+        return session
+    finally:
+        os.unlink(staged_path)
+
+
+def complete(session_id, owner):
+    """Verify the assembled file and attach it to its lesson/material."""
+    # Claim the session: chunks, aborts and other completions are refused from here on
+    with transaction.atomic():
+        session = _locked_session(session_id, owner)
+        if session.received != session.size:
+            raise UploadError('Upload is incomplete', 409, offset=session.received)
+        session.status = 'completing'
+        session.save(update_fields=['status', 'updated_at'])
+
+    path = part_path(session)
+    try:
+        digest = file_sha256(path)
+    except BaseException:
+        _reopen(session_id)
+        raise
+    if session.checksum and digest != session.checksum:
+        # Some chunk was corrupted past its own checksum; start over
+        with open(path, 'wb'):
+            pass
+        _reopen(session_id, received=0)
+        raise UploadError('File checksum mismatch; upload restarted', 400, offset=0)
+
+    model, field = TARGETS[session.target]
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().filter(
+            pk=session_id, owner=owner, status='completing'
+        ).first()
+        if session is None or session.received != session.size:
+            raise UploadError('Upload changed while completing', 409)
+        obj = model.objects.filter(pk=session.object_id).first()
+        if obj is not None:
+            with open(path, 'rb') as f:
+                assembled = AssembledFile(f)
+                assembled.sha256 = digest
+                getattr(obj, field).save(session.filename, assembled, save=True)
+            session.status = 'complete'
+            session.save(update_fields=['status', 'updated_at'])
+    if obj is None:
+        _reopen(session_id)
+        raise UploadError(f'{model.__name__} not found', 404)
+    return obj
+
+
+def _reopen(session_id, **fields):
+    """Hand a session complete() gave up on back to the client."""
+    UploadSession.objects.filter(pk=session_id, status='completing').update(
+        status='active', updated_at=timezone.now(), **fields
+    )
+
+
+def abort(session_id, owner):
+    with transaction.atomic():
+        session = _locked_session(session_id, owner)
+        path = part_path(session)
+        session.delete()
+    path.unlink(missing_ok=True)
+
+
+def _locked_session(session_id, owner):
+    session = UploadSession.objects.select_for_update().filter(pk=session_id, owner=owner).first()
+    if session is None:
+        raise UploadError('Upload not found', 404)
+    if session.status == 'completing':
+        raise UploadError('Upload is being completed', 409)
+    if session.status != 'active':
+        raise UploadError('Upload already completed', 409)
+    return session
+
+
+def purge(max_age=None):
+    """
+    Drop sessions idle for longer than `max_age` (UPLOAD_SESSION_TTL seconds)
+    with their part files, and scratch files left by crashed requests.
+    Returns (sessions, files) removed.
+    """
+    max_age = max_age or timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    cutoff = timezone.now() - max_age
+    stale = list(UploadSession.objects.filter(updated_at__lt=cutoff).values_list('pk', 'status'))
+    UploadSession.objects.filter(pk__in=[pk for pk, _ in stale]).delete()
+
+    files = 0
+    for pk, status in stale:
+        path = upload_dir() / f'{pk}.part'
+        if status != 'complete' and path.exists():
+            path.unlink()
+            files += 1
+    for path in upload_dir().glob('*.chunk'):
+        if path.stat().st_mtime < cutoff.timestamp():
+            path.unlink(missing_ok=True)
+            files += 1
+    return len(stale), files
@@ -12,11 +12,19 @@ urlpatterns = [
     # Lessons
     path('courses/<int:course_id>/lessons/', views.lesson_list_create, name='lesson-list-create'),
     path('courses/<int:course_id>/lessons/<int:pk>/', views.lesson_detail, name='lesson-detail'), 
+    path('courses/<int:course_id>/lessons/<int:pk>/video/', views.lesson_video, name='lesson-video'),
+    path('courses/<int:course_id>/lessons/<int:pk>/progress/', views.lesson_progress, name='lesson-progress'),
     # Materials
     path('courses/<int:course_id>/materials/', views.material_list_create, name='material-list-create'),
     path('courses/<int:course_id>/materials/<int:pk>/', views.material_detail, name='material-detail'), 
+    path('courses/<int:course_id>/materials/<int:pk>/file/', views.material_file, name='material-file'),
+    # Resumable uploads
+    path('uploads/', views.upload_create, name='upload-create'),
+    path('uploads/<uuid:pk>/', views.upload_detail, name='upload-detail'),
+    path('uploads/<uuid:pk>/complete/', views.upload_complete, name='upload-complete'),
     # Enrollments 
     path('enrollments/', views.enrollment_list_create, name='enrollment-list-create'),
+    path('enrollments/bulk/', views.enrollment_bulk_create, name='enrollment-bulk-create'),
     # Question & Answers 
     path('lessons/<int:lesson_id>/questions/', views.question_answer_list_create, name='question-answer-list-create'),
 ]
\ No newline at end of file
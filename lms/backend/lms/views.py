@@ -4,8 +4,20 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q
-from rest_framework.pagination import PageNumberPagination
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Exists, ExpressionWrapper, OuterRef, Q, Subquery, Value
+from django.utils.text import get_valid_filename
+from rest_framework.exceptions import NotFound
+from . import async_api, catalog_cache, counters, etags, media, progress, signals, uploads
+from .pagination import (
+    AsyncCoursePagination, AsyncListPagination, CourseCursorPagination, CoursePagination, ListPagination,
+)
+from .search import search_courses
 
 # Create your views here.
 
@@ -26,9 +38,17 @@ def lesson_list_create(request, course_id):
         )
     
     if request.method == 'GET':
-        lessons = models.Lesson.objects.filter(course_id=course_id)
-        serializer = serializers.LessonSerializer(lessons, many=True)
-        return Response(serializer.data)
+        lessons = models.Lesson.objects.filter(course_id=course_id).order_by('id')
+        paginator = ListPagination()
+        etag, paginator.count = etags.list_etag(lessons, request)
+        not_modified = etags.not_modified(request, etag)
+        if not_modified:
+            return not_modified
+        page = paginator.paginate_queryset(lessons, request)
+        serializer = serializers.LessonSerializer(page, many=True)
+        response = paginator.get_paginated_response(serializer.data)
+        response['ETag'] = etag
+        return response
 
     elif request.method == 'POST':
         if not request.user.is_authenticated or request.user.role != 'teacher':
@@ -50,6 +70,25 @@ def lesson_list_create(request, course_id):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Lesson list, async (ASGI); POST stays with the DRF view
+@async_api.api_view_async(lesson_list_create)
+async def lesson_list_create_async(request, course_id):
+    if not await models.Course.objects.filter(id=course_id).aexists():
+        raise NotFound('Course not found')
+    lessons = models.Lesson.objects.filter(course_id=course_id).order_by('id')
+    paginator = AsyncListPagination()
+    etag, paginator.count = await etags.alist_etag(lessons, request)
+    not_modified = etags.not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    page = await paginator.apaginate_queryset(lessons, request)
+    serializer = serializers.LessonSerializer(page, many=True)
+    response = async_api.render(paginator.get_paginated_response(serializer.data).data)
+    response['ETag'] = etag
+    return response
+
     
 @api_view(['GET', 'POST'])
 def category_list_create(request):
@@ -67,44 +106,88 @@ def category_list_create(request):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+def _course_catalog(request):
+    """The GET courses/ queryset (shared by the DRF and the async view)."""
+    # category, search
+    category = request.query_params.get('category')
+    search = request.query_params.get('search')
+    queryset = models.Course.objects.all()
+
+    # Filter by category ID instead of name
+    if category:
+        queryset = queryset.filter(category_id=category)
+
+    # Full-text index (FTS5 / tsvector), ranked best match first
+    if search:
+        queryset = search_courses(queryset, search)
+    else:
+        # Newest first, with id breaking ties so pages are stable (course_created_idx)
+        queryset = queryset.order_by('-created_at', '-id')
+
+    # Filter based on user role
+    if request.user.is_authenticated:
+        if request.user.role == 'teacher':
+            # Teachers only see their own courses
+            queryset = queryset.filter(instructor=request.user)
+        # Admin and students see all courses
+
+    return queryset.select_related('instructor', 'category')
+
+
+def _catalog_page(request, queryset, stats):
+    """One page of the catalog, serialized; `stats` is etags.list_stats(queryset)."""
+    paginator = CoursePagination()
+    paginator.count = stats['count']
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = serializers.CourseSerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data).data
+
+
+async def _acatalog_page(request, queryset, stats):
+    paginator = AsyncCoursePagination()
+    paginator.count = stats['count']
+    page = await paginator.apaginate_queryset(queryset, request)
+    serializer = serializers.CourseSerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data).data
+
+
 @api_view(['GET', 'POST'])
 def course_list_create(request):
     if request.method == 'GET':
-        # category, search
-        category = request.query_params.get('category')
-        search = request.query_params.get('search')
-        queryset = models.Course.objects.all()
-
-        # Filter by category ID instead of name
-        if category:
-            queryset = queryset.filter(category_id=category)
-
-        # Use icontains instead of incontains
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search)
+        # ?pagination=cursor opts into keyset pagination (no COUNT, no OFFSET),
+        # and so has no ETag, whose aggregate would scan the whole catalog
+        if request.query_params.get('pagination') == 'cursor':
+            paginator = CourseCursorPagination()
+            paginated_queryset = paginator.paginate_queryset(_course_catalog(request), request)
+
+            serializer = serializers.CourseSerializer(
+                paginated_queryset,
+                many=True,
+                context={'request': request}
             )
-        
-        # Filter based on user role
-        if request.user.is_authenticated:
-            if request.user.role == 'teacher':
-                # Teachers only see their own courses
-                queryset = queryset.filter(instructor=request.user)
-            # Admin and students see all courses
-        
-        queryset = queryset.select_related('instructor', 'category')
+            return paginator.get_paginated_response(serializer.data)
 
-        paginator = PageNumberPagination()
-        paginator.page_size = 10
-        paginated_queryset = paginator.paginate_queryset(queryset, request)
-        
-        serializer = serializers.CourseSerializer(
-            paginated_queryset,
-            many=True,
-            context={'request': request}
-        )
-        return paginator.get_paginated_response(serializer.data)
+        # Pages that look the same to everyone but teachers are shared through the cache
+        shared = catalog_cache.cacheable(request)
+        generation = catalog_cache.get_generation() if shared else None
+        entry = catalog_cache.get_page(request, generation) if shared else None
+        if entry:
+            stats = entry['stats']
+        else:
+            queryset = _course_catalog(request)
+            stats = etags.list_stats(queryset)
+        etag = etags.etag(stats, request)
+        not_modified = etags.not_modified(request, etag)
+        if not_modified:
+            return not_modified
+
+        if entry:
+            data = entry['data']
+        else:
+            data = _catalog_page(request, queryset, stats)
+            if shared:
+                catalog_cache.set_page(request, generation, stats, data)
+        return Response(data, headers={'ETag': etag})
 
     elif request.method == 'POST':
         # Only admins can create courses
@@ -121,6 +204,35 @@ def course_list_create(request):
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+# Course list, async (ASGI); POST and keyset pagination stay with the DRF view
+@async_api.api_view_async(course_list_create)
+async def course_list_create_async(request):
+    if request.query_params.get('pagination') == 'cursor':
+        return await async_api.run_sync(course_list_create, request)
+    shared = catalog_cache.cacheable(request)
+    generation = await catalog_cache.aget_generation() if shared else None
+    entry = await catalog_cache.aget_page(request, generation) if shared else None
+    if entry:
+        stats = entry['stats']
+    else:
+        queryset = _course_catalog(request)
+        stats = await etags.alist_stats(queryset)
+    etag = etags.etag(stats, request)
+    not_modified = etags.not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
+    if entry:
+        data = entry['data']
+    else:
+        data = await _acatalog_page(request, queryset, stats)
+        if shared:
+            await catalog_cache.aset_page(request, generation, stats, data)
+    response = async_api.render(data)
+    response['ETag'] = etag
+    return response
+
 @api_view(['GET', 'POST'])
 def material_list_create(request, course_id):
     try:
@@ -132,9 +244,17 @@ def material_list_create(request, course_id):
         )
     
     if request.method == 'GET':
-        materials = models.Material.objects.filter(course_id=course_id)
-        serializer = serializers.MaterialSerializer(materials, many=True)
-        return Response(serializer.data)
+        materials = models.Material.objects.filter(course_id=course_id).order_by('id')
+        paginator = ListPagination()
+        etag, paginator.count = etags.list_etag(materials, request)
+        not_modified = etags.not_modified(request, etag)
+        if not_modified:
+            return not_modified
+        page = paginator.paginate_queryset(materials, request)
+        serializer = serializers.MaterialSerializer(page, many=True)
+        response = paginator.get_paginated_response(serializer.data)
+        response['ETag'] = etag
+        return response
 
     elif request.method == 'POST':
         if not request.user.is_authenticated or request.user.role != 'teacher':
@@ -166,9 +286,17 @@ def enrollment_list_create(request):
         )
 
     if request.method == 'GET':
-        enrollments = models.Enrollment.objects.filter(student=request.user)
-        serializer = serializers.EnrollmentSerializer(enrollments, many=True)
-        return Response(serializer.data)
+        enrollments = models.Enrollment.objects.filter(
+            student=request.user
+        ).select_related('student', 'course').order_by('id')
+        # ?course=<id>: whether the student is enrolled in one course
+        course_id = request.query_params.get('course', '')
+        if course_id.isdigit():
+            enrollments = enrollments.filter(course_id=course_id)
+        paginator = ListPagination()
+        page = paginator.paginate_queryset(enrollments, request)
+        serializer = serializers.EnrollmentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     elif request.method == 'POST':
         # Check if already enrolled
@@ -186,15 +314,139 @@ def enrollment_list_create(request):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+MAX_BULK_ENROLLMENTS = 10000
+
+
+def _id_list(value):
+    if not isinstance(value, list) or not value:
+        return None
+    try:
+        return [int(v) for v in value]
+    except (TypeError, ValueError):
+        return None
+
+
+def _enrolled_pairs(student_ids, course_ids):
+    # One lookup against the (student, course) unique constraint
+    return set(
+        models.Enrollment.objects.filter(
+            student_id__in=student_ids, course_id__in=course_ids
+        ).values_list('student_id', 'course_id')
+    )
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def enrollment_bulk_create(request):
+    """
+    Enroll many students in one course (admin: {"course", "students", "price"?})
+    or the current student in many courses (student: {"courses"}). Existing
+    enrollments are found with one query and new rows go in with one
+    bulk_create, all in a single transaction.
+    """
+    if request.user.role == 'admin':
+        course_ids = [request.data.get('course')]
+        student_ids = _id_list(request.data.get('students'))
+        if student_ids is None or _id_list(course_ids) is None:
+            return Response(
+                {'detail': 'course and a non-empty list of students are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        course_ids = _id_list(course_ids)
+        pairs = [(student_id, course_ids[0]) for student_id in student_ids]
+    elif request.user.role == 'student':
+        course_ids = _id_list(request.data.get('courses'))
+        if course_ids is None:
+            return Response(
+                {'detail': 'A non-empty list of courses is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        pairs = [(request.user.id, course_id) for course_id in course_ids]
+    else:
+        return Response(
+            {'detail': 'Only admins and students can bulk enroll'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    if len(pairs) > MAX_BULK_ENROLLMENTS:
+        return Response(
+            {'detail': f'At most {MAX_BULK_ENROLLMENTS} enrollments per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    student_set = {student_id for student_id, _ in pairs}
+    course_set = {course_id for _, course_id in pairs}
+    prices = dict(
+        models.Course.objects.filter(id__in=course_set, is_active=True).values_list('id', 'price')
+    )
+    if request.user.role == 'admin':
+        price_serializer = serializers.BulkEnrollmentPriceSerializer(data=request.data)
+        if not price_serializer.is_valid():
+            return Response(price_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        price_override = price_serializer.validated_data.get('price')
+        students = set(
+            models.User.objects.filter(id__in=student_set, role='student').values_list('id', flat=True)
+        )
+    else:
+        students = {request.user.id}
+        price_override = None
+
+    with transaction.atomic():
+        existing = _enrolled_pairs(student_set, course_set)
+
+        results, to_create, seen = [], [], set()
+        for student_id, course_id in pairs:
+            if course_id not in prices:
+                outcome = 'course_not_found'
+            elif student_id not in students:
+                outcome = 'student_not_found'
+            elif (student_id, course_id) in existing or (student_id, course_id) in seen:
+                outcome = 'already_enrolled'
+            else:
+                outcome = 'created'
+                seen.add((student_id, course_id))
+                to_create.append(models.Enrollment(
+                    student_id=student_id, course_id=course_id,
+                    price=price_override if price_override is not None else prices[course_id],
+                ))
+            results.append({'student': student_id, 'course': course_id, 'status': outcome})
+
+        while to_create:
+            try:
+                with transaction.atomic():
+                    models.Enrollment.objects.bulk_create(to_create, batch_size=1000)
+                break
+            except IntegrityError:
+                # A concurrent enrollment won some pairs: report them as existing and retry the rest
+                raced = _enrolled_pairs(student_set, course_set) - existing
+                if not raced:
+                    raise
+                existing |= raced
+                to_create = [e for e in to_create if (e.student_id, e.course_id) not in raced]
+                for result in results:
+                    if result['status'] == 'created' and (result['student'], result['course']) in raced:
+                        result['status'] = 'already_enrolled'
+        created_per_course = Counter(enrollment.course_id for enrollment in to_create)
+        counters.add_enrollments(created_per_course)
+        signals.enrollments_bulk_created.send(sender=models.Enrollment, course_counts=created_per_course)
+
+    return Response({
+        'created': len(to_create),
+        'skipped': len(pairs) - len(to_create),
+        'results': results,
+    }, status=status.HTTP_201_CREATED if to_create else status.HTTP_200_OK)
+
 @api_view(['GET', 'POST'])
 def question_answer_list_create(request, lesson_id):
     if request.method == 'GET':
         questions = models.QuestionAnswer.objects.filter(
             lesson_id=lesson_id,
             is_active=True
-        )
-        serializer = serializers.QuestionAnswerSerializer(questions, many=True)
-        return Response(serializer.data)
+        ).select_related('user', 'lesson').order_by('id')
+        paginator = ListPagination()
+        page = paginator.paginate_queryset(questions, request)
+        serializer = serializers.QuestionAnswerSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     elif request.method == 'POST':
         if not request.user.is_authenticated:
@@ -260,7 +512,7 @@ def course_students(request, course_id):
         'course_id': course.id,
         'course_title': course.title,
         'instructor_name': course.instructor.username,
-        'total_students': len(students_data),
+        'total_students': course.enrolled_count,
         'students': students_data
     }
     
@@ -405,4 +657,205 @@ def material_detail(request, course_id, pk):
                 {'detail': 'Only instructors can delete materials'},status=status.HTTP_403_FORBIDDEN)
         
         material.delete()
-        return Response({'detail': 'Material deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response({'detail': 'Material deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
+
+def _media_object(model, field, course_id, pk, user):
+    """
+    The lesson/material plus whether `user` may download its file, in one
+    query: admins always, teachers for their own courses, students with an
+    active enrollment.
+    """
+    if user.role == 'admin':
+        allowed = Value(True)
+    elif user.role == 'teacher':
+        allowed = ExpressionWrapper(Q(course__instructor_id=user.pk), output_field=BooleanField())
+    else:
+        allowed = Exists(models.Enrollment.objects.filter(
+            course_id=OuterRef('course_id'), student_id=user.pk, is_active=True
+        ))
+    return (
+        model.objects.filter(pk=pk, course_id=course_id)
+        .only('id', 'course_id', 'title', field)
+        .annotate(allowed=allowed)
+        .first()
+    )
+
+
+def _serve_media(request, model, field, course_id, pk, as_attachment):
+    obj = _media_object(model, field, course_id, pk, request.user)
+    if obj is None:
+        return Response({'detail': f'{model.__name__} not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not obj.allowed:
+        return Response(
+            {'detail': 'You must be enrolled in this course to access its files'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    fieldfile = getattr(obj, field)
+    if not fieldfile or not fieldfile.storage.exists(fieldfile.name):
+        return Response({'detail': 'File not found'}, status=status.HTTP_404_NOT_FOUND)
+    # Stored names are content digests; offer the title with the file's extension
+    try:
+        filename = get_valid_filename(obj.title) + os.path.splitext(fieldfile.name)[1]
+    except SuspiciousFileOperation:
+        filename = None
+    return media.serve(request, fieldfile, as_attachment=as_attachment, filename=filename)
+
+
+# Lesson video (streamed, seekable)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def lesson_video(request, course_id, pk):
+    return _serve_media(request, models.Lesson, 'video', course_id, pk, as_attachment=False)
+
+
+# Material file (download)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def material_file(request, course_id, pk):
+    return _serve_media(request, models.Material, 'file', course_id, pk, as_attachment=True)
+
+
+# Lesson progress: GET the student's position and completion,
+# POST a watch-position heartbeat ({"position"}) or {"completed": true}
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def lesson_progress(request, course_id, pk):
+    # The lesson and the student's active enrollment in one query
+    lesson = models.Lesson.objects.filter(pk=pk, course_id=course_id).annotate(
+        enrollment_id=Subquery(models.Enrollment.objects.filter(
+            course_id=OuterRef('course_id'), student_id=request.user.pk, is_active=True
+        ).values('pk')[:1])
+    ).values('pk', 'enrollment_id').first()
+    if lesson is None:
+        return Response({'detail': 'Lesson not found'}, status=status.HTTP_404_NOT_FOUND)
+    if lesson['enrollment_id'] is None:
+        return Response(
+            {'detail': 'You must be enrolled in this course to track progress'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    if request.method == 'GET':
+        record = models.LessonProgress.objects.filter(student_id=request.user.pk, lesson_id=pk).first()
+        data = serializers.LessonProgressSerializer(
+            record or models.LessonProgress(student_id=request.user.pk, lesson_id=pk)
+        ).data
+        pending = progress.pending_position(request.user.pk, pk)
+        if pending is not None:
+            data['position'] = pending
+        return Response(data)
+
+    elif request.method == 'POST':
+        serializer = serializers.LessonProgressUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        if not data['completed']:
+            # Written behind, in bulk
+            progress.heartbeat(request.user.pk, pk, data['position'])
+            return Response({'lesson': pk, 'position': data['position']}, status=status.HTTP_202_ACCEPTED)
+
+        enrollment = progress.complete(lesson['enrollment_id'], pk, data.get('position'))
+        return Response({
+            'lesson': pk,
+            'completed': True,
+            'completed_lessons': enrollment.completed_lessons,
+            'progress': enrollment.progress,
+            'is_completed': enrollment.is_completed,
+        })
+
+
+def _upload_error(error):
+    return Response({'detail': error.detail, **error.extra}, status=error.status_code)
+
+
+def _upload_state(session):
+    return {
+        'id': session.id,
+        'offset': session.received,
+        'size': session.size,
+        'status': session.status,
+    }
+
+
+# Resumable upload: start a session for a lesson video or material file
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_create(request):
+    if request.user.role != 'teacher':
+        return Response(
+            {'detail': 'Only teachers can upload course files'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    serializer = serializers.UploadSessionSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+
+    model, _ = uploads.TARGETS[data['target']]
+    course_instructor = model.objects.filter(pk=data['object_id']).values_list('course__instructor_id', flat=True).first()
+    if course_instructor is None:
+        return Response({'detail': f'{model.__name__} not found'}, status=status.HTTP_404_NOT_FOUND)
+    if course_instructor != request.user.pk:
+        return Response(
+            {'detail': 'Only the course instructor can upload files'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    try:
+        session = uploads.create_session(
+            request.user, data['target'], data['object_id'], data['filename'], data['size'],
+            data.get('checksum', ''),
+        )
+    except uploads.UploadError as e:
+        return _upload_error(e)
+    return Response(
+        {**_upload_state(session), 'chunk_size': settings.UPLOAD_CHUNK_SIZE},
+        status=status.HTTP_201_CREATED
+    )
+
+
+# Resumable upload: GET the offset to resume from, PUT the next chunk, DELETE to abort
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def upload_detail(request, pk):
+    if request.method == 'GET':
+        session = models.UploadSession.objects.filter(pk=pk, owner_id=request.user.pk).first()
+        if session is None:
+            return Response({'detail': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(_upload_state(session))
+
+    elif request.method == 'PUT':
+        # Raw chunk body (application/octet-stream), read from the stream in buffers;
+        # Upload-Offset is where it goes, X-Chunk-SHA256 its checksum
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            return Response({'detail': 'Upload-Offset header is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            staged = uploads.stage_chunk(request.stream, length, request.headers.get('X-Chunk-SHA256', ''))
+            session = uploads.append_chunk(pk, request.user, offset, staged)
+        except uploads.UploadError as e:
+            return _upload_error(e)
+        return Response(_upload_state(session))
+
+    elif request.method == 'DELETE':
+        try:
+            uploads.abort(pk, request.user)
+        except uploads.UploadError as e:
+            return _upload_error(e)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# Resumable upload: verify the assembled file and attach it
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_complete(request, pk):
+    try:
+        obj = uploads.complete(pk, request.user)
+    except uploads.UploadError as e:
+        return _upload_error(e)
+    serializer_class = serializers.LessonSerializer if isinstance(obj, models.Lesson) else serializers.MaterialSerializer
+    return Response(serializer_class(obj).data)
@@ -35,4 +35,11 @@ axiosInstance.interceptors.response.use(
   }
 );
 
+// One page of a paginated list endpoint: { count, next, previous, results }.
+// Pass a page's `next` URL, which carries the query, to get the page after it
+export const getPage = async (url, params = {}, next = null) => {
+  const response = await axiosInstance.get(next || url, next ? {} : { params });
+  return response.data;
+};
+
 export default axiosInstance;
\ No newline at end of file
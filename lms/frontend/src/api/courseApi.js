@@ -1,4 +1,4 @@
-import axiosInstance from './axios';
+import axiosInstance, { getPage } from './axios';
 
 export const courseApi = {
 
@@ -45,10 +45,9 @@ export const courseApi = {
     return response.data;
   },
 
-  // Get enrollments
-  getEnrollments: async () => {
-    const response = await axiosInstance.get('/lms/enrollments/');
-    return response.data;
+  // Get a page of enrollments, optionally of one course
+  getEnrollments: async (params = {}, next) => {
+    return getPage('/lms/enrollments/', params, next);
   },
 
   // Create enrollment
@@ -57,10 +56,9 @@ export const courseApi = {
     return response.data;
   },
 
-  // Get lessons for a course
-  getLessons: async (courseId) => {
-    const response = await axiosInstance.get(`/lms/courses/${courseId}/lessons/`);
-    return response.data;
+  // Get a page of lessons for a course
+  getLessons: async (courseId, next) => {
+    return getPage(`/lms/courses/${courseId}/lessons/`, {}, next);
   },
 
   // Create lesson
@@ -81,10 +79,9 @@ export const courseApi = {
     return response.data;
   },
 
-  // Get materials for a course
-  getMaterials: async (courseId) => {
-    const response = await axiosInstance.get(`/lms/courses/${courseId}/materials/`);
-    return response.data;
+  // Get a page of materials for a course
+  getMaterials: async (courseId, next) => {
+    return getPage(`/lms/courses/${courseId}/materials/`, {}, next);
   },
 
   // Create material
@@ -105,10 +102,9 @@ export const courseApi = {
     return response.data;
   },
 
-  // Get questions for a lesson
-  getQuestions: async (lessonId) => {
-    const response = await axiosInstance.get(`/lms/lessons/${lessonId}/questions/`);
-    return response.data;
+  // Get a page of questions for a lesson
+  getQuestions: async (lessonId, next) => {
+    return getPage(`/lms/lessons/${lessonId}/questions/`, {}, next);
   },
 
   // Create question
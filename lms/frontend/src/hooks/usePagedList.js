@@ -0,0 +1,35 @@
+import { useState } from 'react';
+
+// A paginated list endpoint loaded one page at a time: load() fetches the
+// first page, loadMore() follows the last page's `next` link.
+// fetchPage(next) gets the first page when next is undefined
+const usePagedList = (fetchPage) => {
+  const [items, setItems] = useState([]);
+  const [count, setCount] = useState(0);
+  const [next, setNext] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const load = async () => {
+    const data = await fetchPage();
+    setItems(data.results);
+    setCount(data.count);
+    setNext(data.next);
+  };
+
+  const loadMore = async () => {
+    if (!next || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const data = await fetchPage(next);
+      setItems((current) => [...current, ...data.results]);
+      setCount(data.count);
+      setNext(data.next);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  return { items, count, hasMore: Boolean(next), loadingMore, load, loadMore };
+};
+
+export default usePagedList;
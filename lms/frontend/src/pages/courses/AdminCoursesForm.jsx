@@ -1,10 +1,11 @@
 import React, { useState, useEffect } from 'react';
 import { courseApi } from '../../api/courseApi';
-import axiosInstance from '../../api/axios';
+import { getPage } from '../../api/axios';
+import usePagedList from '../../hooks/usePagedList';
 
 const AdminCourseForm = ({ onSuccess, onCancel }) => {
   const [categories, setCategories] = useState([]);
-  const [instructors, setInstructors] = useState([]);
+  const instructors = usePagedList((next) => getPage('/auth/users/', { role: 'teacher' }, next));
   const [formData, setFormData] = useState({
     title: '',
     description: '',
@@ -27,9 +28,7 @@ const AdminCourseForm = ({ onSuccess, onCancel }) => {
       setCategories(categoriesData);
 
       // Load instructors 
-      const response = await axiosInstance.get('/auth/users/');
-      const teachersData = response.data.filter(user => user.role === 'teacher');
-      setInstructors(teachersData);
+      await instructors.load();
     } catch (error) {
       console.error('Failed to load data:', error);
     }
@@ -152,12 +151,22 @@ const AdminCourseForm = ({ onSuccess, onCancel }) => {
             required
           >
             <option value="">Select an instructor</option>
-            {instructors.map((instructor) => (
+            {instructors.items.map((instructor) => (
               <option key={instructor.id} value={instructor.id}>
                 {instructor.username} ({instructor.email})
               </option>
             ))}
           </select>
+          {instructors.hasMore && (
+            <button
+              type="button"
+              onClick={instructors.loadMore}
+              disabled={instructors.loadingMore}
+              className="text-sm text-blue-600 hover:underline mt-1 disabled:text-gray-400"
+            >
+              {instructors.loadingMore ? 'Loading...' : `Load more instructors (${instructors.items.length} of ${instructors.count})`}
+            </button>
+          )}
           <p className="text-xs text-gray-500 mt-1">Only the assigned instructor can add lessons and materials to this course</p>
         </div>
 
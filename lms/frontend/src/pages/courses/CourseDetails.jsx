@@ -3,6 +3,7 @@ import { ArrowLeft, Clock, DollarSign, User, BookOpen, FileText, MessageCircle,
 import { courseApi } from '../../api/courseApi';
 import { useAuth } from '../auth/AuthContext';
 import Loader from '../../components/Loader';
+import usePagedList from '../../hooks/usePagedList';
 import LessonForm from './LessonForm';
 import MaterialForm from './MaterialForm';
 import EditLessonForm from './EditLessonForm';
@@ -12,8 +13,8 @@ import EditCourseForm from './EditCourseForm';
 const CourseDetails = ({ courseId, onBack }) => {
   const { user } = useAuth();
   const [course, setCourse] = useState(null);
-  const [lessons, setLessons] = useState([]);
-  const [materials, setMaterials] = useState([]);
+  const lessons = usePagedList((next) => courseApi.getLessons(courseId, next));
+  const materials = usePagedList((next) => courseApi.getMaterials(courseId, next));
   const [loading, setLoading] = useState(true);
   const [activeTab, setActiveTab] = useState('overview');
   const [isEnrolled, setIsEnrolled] = useState(false);
@@ -34,18 +35,16 @@ const CourseDetails = ({ courseId, onBack }) => {
       const foundCourse = (coursesData.results || coursesData).find(c => c.id === courseId);
       setCourse(foundCourse);
 
-      // Loading lessons
+      // Loading the first page of lessons; more on demand
       try {
-        const lessonsData = await courseApi.getLessons(courseId);
-        setLessons(lessonsData);
+        await lessons.load();
       } catch (error) {
         console.log('No lessons yet');
       }
 
-      // Loading materials
+      // Loading the first page of materials; more on demand
       try {
-        const materialsData = await courseApi.getMaterials(courseId);
-        setMaterials(materialsData);
+        await materials.load();
       } catch (error) {
         console.log('No materials yet');
       }
@@ -53,9 +52,8 @@ const CourseDetails = ({ courseId, onBack }) => {
       // Check if enrolled (for students)
       if (user?.role === 'student') {
         try {
-          const enrollments = await courseApi.getEnrollments();
-          const enrolled = enrollments.some(e => e.course === courseId);
-          setIsEnrolled(enrolled);
+          const enrollments = await courseApi.getEnrollments({ course: courseId });
+          setIsEnrolled(enrollments.count > 0);
         } catch (error) {
           console.log('Could not check enrollment status');
         }
@@ -267,7 +265,7 @@ const CourseDetails = ({ courseId, onBack }) => {
                 : 'border-transparent text-gray-600 hover:text-gray-900'
                 }`}
             >
-              Lessons ({lessons.length})
+              Lessons ({lessons.count})
             </button>
             <button
               onClick={() => setActiveTab('materials')}
@@ -276,7 +274,7 @@ const CourseDetails = ({ courseId, onBack }) => {
                 : 'border-transparent text-gray-600 hover:text-gray-900'
                 }`}
             >
-              Materials ({materials.length})
+              Materials ({materials.count})
             </button>
           </div>
         </div>
@@ -339,14 +337,14 @@ const CourseDetails = ({ courseId, onBack }) => {
                     You must enroll in this course to view lessons
                   </div>
                 )
-                  : lessons.length === 0 ? (
+                  : lessons.count === 0 ? (
                     <div className="text-center py-12 text-gray-500">
                       <Play className="w-16 h-16 mx-auto mb-4 text-gray-300" />
                       <p>No lessons available yet</p>
                     </div>
                   ) : (
                     <div className="space-y-3">
-                      {lessons.map((lesson, index) => (
+                      {lessons.items.map((lesson, index) => (
                         <div
                           key={lesson.id}
                           className="bg-gray-50 p-4 rounded-lg hover:bg-gray-100 transition-colors"
@@ -388,6 +386,15 @@ const CourseDetails = ({ courseId, onBack }) => {
                           </div>
                         </div>
                       ))}
+                      {lessons.hasMore && (
+                        <button
+                          onClick={lessons.loadMore}
+                          disabled={lessons.loadingMore}
+                          className="w-full py-2 text-blue-600 font-medium rounded-lg hover:bg-blue-50 disabled:text-gray-400"
+                        >
+                          {lessons.loadingMore ? 'Loading...' : `Load more lessons (${lessons.items.length} of ${lessons.count})`}
+                        </button>
+                      )}
                     </div>
                   )}
             </div>
@@ -431,14 +438,14 @@ const CourseDetails = ({ courseId, onBack }) => {
                     You must enroll in this course to view materials
                   </div>
                 )
-                  : materials.length === 0 ? (
+                  : materials.count === 0 ? (
                     <div className="text-center py-12 text-gray-500">
                       <FileText className="w-16 h-16 mx-auto mb-4 text-gray-300" />
                       <p>No materials available yet</p>
                     </div>
                   ) : (
                     <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
-                      {materials.map((material) => (
+                      {materials.items.map((material) => (
                         <div
                           key={material.id}
                           className="bg-gray-50 p-4 rounded-lg hover:shadow-md transition-shadow"
@@ -480,6 +487,15 @@ const CourseDetails = ({ courseId, onBack }) => {
                           </div>
                         </div>
                       ))}
+                      {materials.hasMore && (
+                        <button
+                          onClick={materials.loadMore}
+                          disabled={materials.loadingMore}
+                          className="w-full py-2 text-blue-600 font-medium rounded-lg hover:bg-blue-50 disabled:text-gray-400 md:col-span-2"
+                        >
+                          {materials.loadingMore ? 'Loading...' : `Load more materials (${materials.items.length} of ${materials.count})`}
+                        </button>
+                      )}
                     </div>
                   )}
             </div>
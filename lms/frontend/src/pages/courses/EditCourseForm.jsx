@@ -1,10 +1,11 @@
 import React, { useState, useEffect } from 'react';
 import { courseApi } from '../../api/courseApi';
-import axiosInstance from '../../api/axios';
+import { getPage } from '../../api/axios';
+import usePagedList from '../../hooks/usePagedList';
 
 const EditCourseForm = ({ course, onSuccess, onCancel }) => {
   const [categories, setCategories] = useState([]);
-  const [instructors, setInstructors] = useState([]);
+  const instructors = usePagedList((next) => getPage('/auth/users/', { role: 'teacher' }, next));
   const [formData, setFormData] = useState({
     title: course.title,
     description: course.description,
@@ -27,9 +28,7 @@ const EditCourseForm = ({ course, onSuccess, onCancel }) => {
       setCategories(categoriesData);
 
       // Load instructors (teachers)
-      const response = await axiosInstance.get('/auth/users/');
-      const teachersData = response.data.filter(user => user.role === 'teacher');
-      setInstructors(teachersData);
+      await instructors.load();
     } catch (error) {
       console.error('Failed to load data:', error);
     }
@@ -163,12 +162,26 @@ const EditCourseForm = ({ course, onSuccess, onCancel }) => {
             required
           >
             <option value="">Select an instructor</option>
-            {instructors.map((instructor) => (
+            {/* The current instructor may be on a page not loaded yet */}
+            {course.instructor && !instructors.items.some((instructor) => instructor.id === course.instructor) && (
+              <option value={course.instructor}>{course.instructor_name}</option>
+            )}
+            {instructors.items.map((instructor) => (
               <option key={instructor.id} value={instructor.id}>
                 {instructor.username} ({instructor.email})
               </option>
             ))}
           </select>
+          {instructors.hasMore && (
+            <button
+              type="button"
+              onClick={instructors.loadMore}
+              disabled={instructors.loadingMore}
+              className="text-sm text-blue-600 hover:underline mt-1 disabled:text-gray-400"
+            >
+              {instructors.loadingMore ? 'Loading...' : `Load more instructors (${instructors.items.length} of ${instructors.count})`}
+            </button>
+          )}
         </div>
 
         <div className="flex space-x-3 pt-4">
@@ -2,10 +2,11 @@ import React, { useState, useEffect } from 'react';
 import { CheckCircle, Clock, Eye } from 'lucide-react';
 import { courseApi } from '../../api/courseApi';
 import Loader from '../../components/Loader';
+import usePagedList from '../../hooks/usePagedList';
 import CourseDetails from './CourseDetails';
 
 const Enrollments = () => {
-  const [enrollments, setEnrollments] = useState([]);
+  const enrollments = usePagedList((next) => courseApi.getEnrollments({}, next));
   const [loading, setLoading] = useState(true);
   const [selectedCourseId, setSelectedCourseId] = useState(null);
 
@@ -15,8 +16,8 @@ const Enrollments = () => {
 
   const loadEnrollments = async () => {
     try {
-      const data = await courseApi.getEnrollments();
-      setEnrollments(data);
+      // The first page; more on demand
+      await enrollments.load();
     } catch (error) {
       console.error('Failed to load enrollments:', error);
     } finally {
@@ -48,7 +49,7 @@ const Enrollments = () => {
         </p>
       </div>
 
-      {enrollments.length === 0 ? (
+      {enrollments.count === 0 ? (
         <div className="bg-white rounded-lg shadow p-12 text-center">
           <p className="text-gray-500 text-lg">
             You haven't enrolled in any courses yet
@@ -59,7 +60,7 @@ const Enrollments = () => {
         </div>
       ) : (
         <div className="grid grid-cols-1 gap-4">
-          {enrollments.map((enrollment) => (
+          {enrollments.items.map((enrollment) => (
             <div
               key={enrollment.id}
               className="bg-white rounded-lg shadow hover:shadow-lg transition-shadow p-6"
@@ -141,6 +142,15 @@ const Enrollments = () => {
               </div>
             </div>
           ))}
+          {enrollments.hasMore && (
+            <button
+              onClick={enrollments.loadMore}
+              disabled={enrollments.loadingMore}
+              className="w-full py-2 text-blue-600 font-medium rounded-lg hover:bg-blue-50 disabled:text-gray-400"
+            >
+              {enrollments.loadingMore ? 'Loading...' : `Load more enrollments (${enrollments.items.length} of ${enrollments.count})`}
+            </button>
+          )}
         </div>
       )}
     </div>